@@ -0,0 +1,76 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+from app.domain.entities.raster import RasterDataset, ClassHistogram, ZoneHistogram, TransitionMatrix, RasterPreview
+
+
+class RasterEngine(ABC):
+    """Backend computing LULC raster analytics (PostGIS SQL or local GeoTIFFs)"""
+
+    @abstractmethod
+    def list_datasets(self) -> List[RasterDataset]:
+        """One entry per available year, with tile count, band count and SRID"""
+        pass
+
+    @abstractmethod
+    def dataset_version(self, year: str) -> Optional[str]:
+        """Opaque token that changes whenever the year's raster is replaced; None if the year is unknown"""
+        pass
+
+    @abstractmethod
+    def describe(self, year: str, include_bands: bool = True) -> Optional[RasterDataset]:
+        """Grid metadata, envelope and (unless `include_bands` is False) per-band statistics of a year's raster"""
+        pass
+
+    @abstractmethod
+    def class_histogram(self, year: str) -> Optional[ClassHistogram]:
+        """Pixel count (and area, when known) per class code of a year's raster"""
+        pass
+
+    def class_histograms(self, years: Optional[List[str]] = None) -> Dict[str, ClassHistogram]:
+        """
+        Class histograms of several years (all available years when `years` is None),
+        keyed by year; unknown years are left out. Engines override this when they can
+        fetch every year at once.
+        """
+        if years is None:
+            years = [d.year for d in self.list_datasets()]
+        histograms = {}
+        for year in years:
+            histogram = self.class_histogram(year)
+            if histogram is not None:
+                histograms[str(year)] = histogram
+        return histograms
+
+    @abstractmethod
+    def zonal_histograms(self, year: str, geometries: List[dict]) -> Optional[List[ZoneHistogram]]:
+        """
+        Pixel count and area per class inside each GeoJSON (EPSG:4326) polygon of
+        `geometries`, one histogram per geometry in the same order (pixel centers inside
+        the polygon). None if the year is unknown.
+        """
+        pass
+
+    @abstractmethod
+    def point_classes(self, lons: Sequence[float], lats: Sequence[float], years: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Class code under each EPSG:4326 point, per year (all available years when `years`
+        is None; unknown years are left out): a 1-D numpy int array aligned with the
+        points, -1 where a point is outside the raster or on nodata.
+        """
+        pass
+
+    @abstractmethod
+    def transition_matrix(self, from_year: str, to_year: str) -> Optional[TransitionMatrix]:
+        """
+        Class x class pixel transitions between two years' aligned rasters.
+        Raises ValueError when the two grids are not aligned.
+        """
+        pass
+
+    @abstractmethod
+    def preview(self, year: str, max_size: int) -> Optional[RasterPreview]:
+        """
+        Whole-raster class codes downsampled to at most `max_size` pixels per side,
+        read from the coarsest overview level that still has enough resolution.
+        """
+        pass
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 
@@ -30,6 +31,66 @@ class Settings:
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
     POSTGRES_DB = os.getenv("POSTGRES_DB")
 
+# Connection pool for the direct PostGIS (psycopg2) connections used by the raster router
+    POSTGIS_POOL_MIN_SIZE: int = int(os.getenv("POSTGIS_POOL_MIN_SIZE", "1"))
+    POSTGIS_POOL_MAX_SIZE: int = int(os.getenv("POSTGIS_POOL_MAX_SIZE", "10"))
+    POSTGIS_POOL_TIMEOUT: float = float(os.getenv("POSTGIS_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    POSTGIS_POOL_MAX_IDLE: float = float(os.getenv("POSTGIS_POOL_MAX_IDLE", "300"))  # recycle connections idle longer than this
+    POSTGIS_POOL_HEALTH_CHECK_AFTER: float = float(os.getenv("POSTGIS_POOL_HEALTH_CHECK_AFTER", "30"))  # ping before reuse after this idle time
+
+# Concurrent raster queries per endpoint class (keep the sum <= POSTGIS_POOL_MAX_SIZE)
+    RASTER_METADATA_CONCURRENCY: int = int(os.getenv("RASTER_METADATA_CONCURRENCY", "4"))
+    RASTER_ANALYTICS_CONCURRENCY: int = int(os.getenv("RASTER_ANALYTICS_CONCURRENCY", "4"))
+    RASTER_VECTORIZE_CONCURRENCY: int = int(os.getenv("RASTER_VECTORIZE_CONCURRENCY", "2"))
+
+# Seconds between checks of the raster import ledger for catalog changes
+    RASTER_CATALOG_TTL: float = float(os.getenv("RASTER_CATALOG_TTL", "30"))
+
+# Raster analytics backend: "postgis" (SQL over imported tables) or "local" (GeoTIFFs in RASTER_DIR)
+    RASTER_ENGINE: str = os.getenv("RASTER_ENGINE", "postgis")
+    RASTER_DIR: str = os.getenv("RASTER_DIR", str(Path(__file__).resolve().parents[2] / "raster"))
+
+# Cloud-Optimized GeoTIFF copies (with internal overviews) of the rasters in RASTER_DIR,
+# and the overview factors built for them and for the PostGIS overview tables
+    COG_DIR: str = os.getenv("COG_DIR", str(Path(RASTER_DIR) / "cog"))
+    RASTER_OVERVIEW_FACTORS: str = os.getenv("RASTER_OVERVIEW_FACTORS", "2,4,8,16,32")
+
+# Uncompressed .npy copies of the GeoTIFF class bands, memory-mapped by point queries
+    RASTER_ARRAY_DIR: str = os.getenv("RASTER_ARRAY_DIR", str(Path(RASTER_DIR) / "arrays"))
+
+# Background jobs (scripts/run_job_worker.py)
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "2"))  # seconds between polls of an empty queue
+    JOB_STALE_AFTER: float = float(os.getenv("JOB_STALE_AFTER", "3600"))  # requeue jobs left running longer than this
+    JOB_RETRY_AFTER: int = int(os.getenv("JOB_RETRY_AFTER", "10"))  # Retry-After (s) sent with 202 while a job runs
+
+# On-disk cache of rendered map tiles (empty disables it)
+    TILE_CACHE_DIR: str = os.getenv("TILE_CACHE_DIR", str(Path(__file__).resolve().parents[2] / "tile_cache"))
+
+# In-memory LRU of rendered PNG raster tiles (entries, ~1-60 KB each)
+    PNG_TILE_CACHE_SIZE: int = int(os.getenv("PNG_TILE_CACHE_SIZE", "2048"))
+
+# Cache of per-year raster responses: in-memory LRU entries and optional on-disk tier (empty disables)
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+    RESPONSE_CACHE_DIR: str = os.getenv("RESPONSE_CACHE_DIR", "")
+    RESPONSE_CACHE_DISK_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))  # 0 = unbounded
+
+# Exported GeoJSON assets served under /geojson: content-hashed files (cached as immutable)
+# plus manifest.json, which clients may cache for GEOJSON_MANIFEST_MAX_AGE seconds
+    GEOJSON_DIR: str = os.getenv("GEOJSON_DIR", str(Path(__file__).resolve().parents[2] / "geojson_exports"))
+    GEOJSON_MANIFEST_MAX_AGE: int = int(os.getenv("GEOJSON_MANIFEST_MAX_AGE", "60"))
+
+# Rows per server-side cursor fetch when streaming GeoJSON responses
+    GEOJSON_STREAM_BATCH_SIZE: int = int(os.getenv("GEOJSON_STREAM_BATCH_SIZE", "500"))
+
+# Output directory of scripts/build_change_cube.py (per-pixel change rasters + change_cube.json)
+    CHANGE_CUBE_DIR: str = os.getenv("CHANGE_CUBE_DIR", str(Path(RASTER_DIR) / "change_cube"))
+
+# Most zones accepted by one POST /raster/{year}/zonal-stats request
+    ZONAL_STATS_MAX_ZONES: int = int(os.getenv("ZONAL_STATS_MAX_ZONES", "1000"))
+
+# Most coordinates accepted by one POST /raster/query/points request
+    POINT_QUERY_MAX_POINTS: int = int(os.getenv("POINT_QUERY_MAX_POINTS", "10000"))
+
 
 settings = Settings()
 
@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class RasterGrid:
+    width: int
+    height: int
+    num_bands: int
+    srid: int
+    upper_left_x: float
+    upper_left_y: float
+    scale_x: float
+    scale_y: float
+    skew_x: float = 0.0
+    skew_y: float = 0.0
+
+
+@dataclass
+class RasterBand:
+    band_number: int
+    pixel_type: str
+    nodata_value: Optional[float] = None
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    mean_value: Optional[float] = None
+    std_dev: Optional[float] = None
+
+
+@dataclass
+class RasterDataset:
+    year: str
+    name: str
+    tile_count: int
+    num_bands: Optional[int] = None
+    srid: Optional[int] = None
+    grid: Optional[RasterGrid] = None
+    bands: List[RasterBand] = field(default_factory=list)
+    envelope_wkt: Optional[str] = None
+    envelope_geojson: Optional[dict] = None
+
+
+@dataclass
+class ClassHistogram:
+    year: str
+    counts: Dict[int, int]
+    # Geodesic area per class when the engine knows it; empty otherwise
+    areas_m2: Dict[int, float] = field(default_factory=dict)
+    # Raster table / dataset name the histogram was computed from
+    dataset: Optional[str] = None
+
+    @property
+    def total_pixels(self) -> int:
+        return sum(self.counts.values())
+
+
+@dataclass
+class ZoneHistogram:
+    # Position of the zone in the request
+    zone: int
+    counts: Dict[int, int]
+    areas_m2: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def total_pixels(self) -> int:
+        return sum(self.counts.values())
+
+
+@dataclass
+class TransitionMatrix:
+    from_year: str
+    to_year: str
+    # Row/column labels: class codes present in either year
+    classes: List[int]
+    # counts[i][j]: pixels of classes[i] in from_year that are classes[j] in to_year
+    counts: List[List[int]]
+    areas_m2: List[List[float]] = field(default_factory=list)
+
+
+@dataclass
+class ChangeCube:
+    years: List[str]
+    # One matrix per consecutive year pair, in year order
+    transitions: List[TransitionMatrix]
+    # Pixels / m² by the year of their first class change (0 = never changed)
+    first_change_counts: Dict[int, int]
+    first_change_areas_m2: Dict[int, float]
+    # Pixels / m² by number of class changes across all years
+    change_count_counts: Dict[int, int]
+    change_count_areas_m2: Dict[int, float]
+    # year -> (file name, mtime_ns, size) of the GeoTIFF each layer was read from
+    sources: Dict[str, List] = field(default_factory=dict)
+    built_at: Optional[str] = None
+
+
+@dataclass
+class RasterPreview:
+    year: str
+    # 2-D numpy array of class codes, at most the requested size on its longer side
+    values: Any
+    nodata: Optional[float] = None
+    # Overview level the values were read from (1 = full resolution)
+    overview_factor: int = 1
@@ -0,0 +1,15 @@
+# ESRI 10m LULC class colors (same as mapanalysis), EXCLUDING class 0 (No Data)
+LULC_COLORS = {
+    1: "#419bdf",  # Water
+    2: "#397d49",  # Trees
+    4: "#7a87c6",  # Flooded Vegetation
+    5: "#e49635",  # Crops
+    7: "#c4281b",  # Built Area
+    8: "#a59b8f",  # Bare Ground
+    9: "#a8ebff",  # Snow/Ice
+    10: "#616161", # Clouds
+    11: "#e3e2c3", # Rangeland
+}
+
+# Color of class codes missing from LULC_COLORS
+UNKNOWN_CLASS_COLOR = "#d9d9d9"
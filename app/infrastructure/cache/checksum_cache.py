@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import xxhash
+except ImportError:  # optional: the fast prefilter then uses zlib's CRC-32
+    xxhash = None
+
+
+CACHE_FILE_NAME = ".checksums.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def _stat_key(path: Path) -> List[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class _FastHash:
+    """Non-cryptographic content hash used to confirm unchanged files after a stat change"""
+
+    def __init__(self) -> None:
+        if xxhash is not None:
+            self.name, self._h = "xxh3_64", xxhash.xxh3_64()
+        else:
+            self.name, self._crc = "crc32", 0
+
+    def update(self, chunk: bytes) -> None:
+        if xxhash is not None:
+            self._h.update(chunk)
+        else:
+            self._crc = zlib.crc32(chunk, self._crc)
+
+    def hexdigest(self) -> str:
+        value = self._h.hexdigest() if xxhash is not None else f"{self._crc:08x}"
+        return f"{self.name}:{value}"
+
+
+class ChecksumCache:
+    """
+    SHA-256 digests of data files, remembered across runs in a JSON file next to the data.
+
+    An entry is keyed by the file path(s) and reused while every file keeps its
+    (size, mtime, inode), so unchanged archives are not read at all. With `prefilter`,
+    a file whose stat changed but whose size did not (copied, touched, restored from
+    backup) is first read with a fast non-cryptographic hash (xxhash when installed,
+    else CRC-32): if that matches the stored one, the stored SHA-256 is kept.
+    Thread-safe; call `save()` once done.
+    """
+
+    def __init__(self, cache_file: Path, prefilter: bool = False) -> None:
+        self.cache_file = Path(cache_file)
+        self.prefilter = prefilter
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.prefilter_hits = 0
+        self.misses = 0
+        try:
+            self._entries: Dict[str, dict] = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self._entries = {}
+
+    @classmethod
+    def for_directory(cls, directory, prefilter: bool = False) -> "ChecksumCache":
+        return cls(Path(directory) / CACHE_FILE_NAME, prefilter)
+
+    def _key(self, paths: Sequence[Path]) -> str:
+        names = []
+        for path in paths:
+            path = Path(path).resolve()
+            try:
+                names.append(str(path.relative_to(self.cache_file.parent.resolve())))
+            except ValueError:
+                names.append(str(path))
+        return "|".join(names)
+
+    @staticmethod
+    def _hash(paths: Sequence[Path], full: bool) -> Tuple[Optional[str], str]:
+        """(sha256 or None, fast hash) of the concatenated files, in one read pass"""
+        sha = hashlib.sha256() if full else None
+        fast = _FastHash()
+        for path in paths:
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    fast.update(chunk)
+                    if sha is not None:
+                        sha.update(chunk)
+        return (sha.hexdigest() if sha is not None else None), fast.hexdigest()
+
+    def digest(self, *paths) -> str:
+        """SHA-256 of the files' concatenated contents, in the given order"""
+        paths = [Path(p) for p in paths]
+        key = self._key(paths)
+        stats = [_stat_key(p) for p in paths]
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is not None and entry["stats"] == stats:
+            with self._lock:
+                self.hits += 1
+            return entry["sha256"]
+
+        if (
+            self.prefilter
+            and entry is not None
+            and entry.get("fast")
+            and [s[0] for s in entry["stats"]] == [s[0] for s in stats]
+        ):
+            _, fast = self._hash(paths, full=False)
+            if fast == entry["fast"]:
+                with self._lock:
+                    self._entries[key] = dict(entry, stats=stats)
+                    self._dirty = True
+                    self.prefilter_hits += 1
+                return entry["sha256"]
+
+        sha, fast = self._hash(paths, full=True)
+        with self._lock:
+            self._entries[key] = {"stats": stats, "sha256": sha, "fast": fast}
+            self._dirty = True
+            self.misses += 1
+        return sha
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            # Forget files that no longer exist
+            entries = {
+                key: entry for key, entry in self._entries.items()
+                if all((self.cache_file.parent / name).exists() for name in key.split("|"))
+            }
+            body = json.dumps(entries, indent=1, sort_keys=True)
+            self._dirty = False
+        fd, tmp = tempfile.mkstemp(dir=self.cache_file.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(tmp, self.cache_file)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "prefilter_hits": self.prefilter_hits, "misses": self.misses}
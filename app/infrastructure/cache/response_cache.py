@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.config.settings import settings
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str            # strong, quoted: hash of the body
+    last_modified: float  # epoch seconds the body was computed
+
+
+def cache_key(endpoint: str, year: str, params: dict, version: str) -> str:
+    """Stable key of one response: any change of the data version yields a new key"""
+    raw = json.dumps([endpoint, str(year), sorted((str(k), str(v)) for k, v in params.items()), version])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest() + '"'
+
+
+class ResponseCache:
+    """
+    Serialized response bodies keyed by `cache_key`: an in-memory LRU of `max_entries`
+    in front of an optional on-disk tier (`disk_dir`) that survives restarts and is
+    shared by workers. Keys embed the raster checksum, so entries of a re-imported
+    year are never hit again and simply age out.
+
+    The disk tier is bounded to `max_disk_bytes`: once a write takes it past the cap,
+    the least recently used files (by access time, refreshed on every disk hit) are
+    removed until it is back under 90% of it.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: Optional[Path] = None, max_disk_bytes: int = 0) -> None:
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        # Estimated size of the disk tier: scanned on the first write, then counted up
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.body"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            try:
+                body = path.read_bytes()
+                st = path.stat()
+                entry = CachedResponse(body=body, etag=body_etag(body), last_modified=st.st_mtime)
+                # Access time orders disk eviction; mtime stays the Last-Modified of the body
+                os.utime(path, (time.time(), st.st_mtime))
+            except FileNotFoundError:
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+                with self._lock:
+                    self.hits += 1
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body=body, etag=body_etag(body), last_modified=time.time())
+        self._remember(key, entry)
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+            self._count_disk_bytes(len(body))
+        return entry
+
+    def _count_disk_bytes(self, added: int) -> None:
+        if not self.max_disk_bytes:
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += added
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._prune_disk()
+
+    def _disk_files(self):
+        """(atime, size, path) of every body on disk"""
+        files = []
+        for path in self.disk_dir.glob("*/*.body"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_atime, st.st_size, path))
+        return files
+
+    def _prune_disk(self) -> None:
+        """Remove the least recently used bodies until the disk tier is under 90% of its cap"""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, path in files:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def _remember(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(len(e.body) for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_dir": str(self.disk_dir) if self.disk_dir else None,
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes,
+            }
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_DIR or None, settings.RESPONSE_CACHE_DISK_MAX_BYTES
+)
@@ -0,0 +1,58 @@
+import uuid
+from typing import Iterator, Optional
+
+from app.config.settings import settings
+from app.infrastructure.db.postgis_pool import PostgisConnectionPool, get_postgis_pool
+
+
+FEATURE_COLLECTION_HEADER = b'{"type":"FeatureCollection","features":['
+FEATURE_COLLECTION_FOOTER = b"]}"
+
+
+def stream_feature_collection(
+    query,
+    params=None,
+    batch_size: int = settings.GEOJSON_STREAM_BATCH_SIZE,
+    pool: Optional[PostgisConnectionPool] = None,
+) -> Iterator[bytes]:
+    """
+    Yield a GeoJSON FeatureCollection chunk by chunk.
+
+    `query` must return two text columns, `properties` (a JSON object) and `geometry`
+    (`ST_AsGeoJSON` output); both are written verbatim, never parsed in Python.
+    Rows are read through a server-side cursor `batch_size` at a time, so memory stays
+    bounded by one batch whatever the layer size.
+
+    The generator checks out its own pooled connection on first iteration (the response
+    outlives the request handler) and returns it when exhausted or closed.
+    """
+    pool = pool or get_postgis_pool()
+    conn = pool.getconn()
+    try:
+        # Named cursor = server-side portal; needs the transaction putconn() rolls back
+        cur = conn.cursor(name=f"geojson_{uuid.uuid4().hex}")
+        cur.execute(query, params)
+        yield FEATURE_COLLECTION_HEADER
+        first = True
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            parts = []
+            for properties, geometry in rows:
+                if geometry is None:
+                    continue
+                parts.append(
+                    ('{"type":"Feature","properties":' if first else ',{"type":"Feature","properties":')
+                    + (properties or "{}")
+                    + ',"geometry":'
+                    + geometry
+                    + "}"
+                )
+                first = False
+            if parts:
+                yield "".join(parts).encode("utf-8")
+        yield FEATURE_COLLECTION_FOOTER
+        cur.close()
+    finally:
+        pool.putconn(conn)
@@ -0,0 +1,275 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+
+from app.config.settings import settings
+
+
+class PoolTimeout(Exception):
+    """Raised when no PostGIS connection became available within the pool timeout"""
+
+
+class PostgisConnectionPool:
+    """
+    Bounded, thread-safe pool of psycopg2 connections for the PostGIS raster queries.
+
+    - At most `max_size` connections are open at once; callers block (up to `timeout`
+      seconds) for a free connection instead of opening a new one.
+    - Connections idle for longer than `max_idle` seconds are closed and reopened on the
+      next checkout, keeping at least `min_size` connections around.
+    - Connections idle for longer than `health_check_after` seconds are pinged with
+      `SELECT 1` before being handed out; broken ones are replaced transparently.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        max_idle: float = 300.0,
+        health_check_after: float = 30.0,
+        **connect_kwargs,
+    ) -> None:
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Invalid pool size: require 0 <= min_size <= max_size and max_size >= 1")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[extensions.connection, float]] = []
+        self._size = 0
+        self._closed = False
+        self._warmed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._recycled = 0
+        self._broken = 0
+
+    def _connect(self) -> extensions.connection:
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._cond:
+            self._opened += 1
+        return conn
+
+    def _warm_up(self) -> None:
+        """Open `min_size` connections on first use rather than at import time"""
+        with self._cond:
+            if self._warmed:
+                return
+            self._warmed = True
+            missing = max(self.min_size - self._size, 0)
+            self._size += missing
+        for filled in range(missing):
+            try:
+                conn = self._connect()
+            except Exception:
+                # Give back every slot not filled yet and retry on the next checkout
+                with self._cond:
+                    self._size -= missing - filled
+                    self._warmed = False
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _is_healthy(self, conn: extensions.connection) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn: extensions.connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _prune_idle(self) -> List[extensions.connection]:
+        """Pop idle connections past `max_idle` beyond `min_size`. Caller holds the lock."""
+        now = time.monotonic()
+        expired = []
+        keep = []
+        # Oldest connections sit at the start of the LIFO stack
+        for conn, last_used in self._idle:
+            if now - last_used > self.max_idle and self._size - len(expired) > self.min_size:
+                expired.append(conn)
+            else:
+                keep.append((conn, last_used))
+        self._idle = keep
+        self._size -= len(expired)
+        self._recycled += len(expired)
+        return expired
+
+    def getconn(self) -> extensions.connection:
+        """Check a connection out of the pool, waiting up to `timeout` seconds"""
+        if self._closed:
+            raise RuntimeError("PostGIS connection pool is closed")
+        self._warm_up()
+
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn: Optional[extensions.connection] = None
+        last_used = 0.0
+        waited = False
+        with self._cond:
+            expired = self._prune_idle()
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No PostGIS connection available after {self.timeout:.1f}s "
+                        f"(max_size={self.max_size})"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            wait = time.monotonic() - start
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+
+        for stale in expired:
+            self._discard(stale)
+
+        if conn is not None:
+            idle_for = time.monotonic() - last_used
+            if conn.closed or idle_for > self.max_idle:
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._recycled += 1
+            elif idle_for > self.health_check_after and not self._is_healthy(conn):
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._broken += 1
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def putconn(self, conn: extensions.connection) -> None:
+        """Return a connection to the pool, rolling back any open transaction"""
+        reusable = not conn.closed and not self._closed
+        if reusable and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                reusable = False
+
+        with self._cond:
+            if reusable:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._size -= 1
+                if not self._closed:
+                    self._broken += 1
+            self._cond.notify()
+
+        if not reusable:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle = []
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, float]:
+        """Snapshot of pool occupancy and wait metrics"""
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "open": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_total_s": round(self._wait_total, 6),
+                "wait_avg_s": round(self._wait_total / self._waits, 6) if self._waits else 0.0,
+                "wait_max_s": round(self._wait_max, 6),
+                "timeouts": self._timeouts,
+                "opened": self._opened,
+                "recycled": self._recycled,
+                "broken": self._broken,
+            }
+
+
+_pool: Optional[PostgisConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_postgis_pool() -> PostgisConnectionPool:
+    """Process-wide PostGIS pool, created lazily from settings"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PostgisConnectionPool(
+                    min_size=settings.POSTGIS_POOL_MIN_SIZE,
+                    max_size=settings.POSTGIS_POOL_MAX_SIZE,
+                    timeout=settings.POSTGIS_POOL_TIMEOUT,
+                    max_idle=settings.POSTGIS_POOL_MAX_IDLE,
+                    health_check_after=settings.POSTGIS_POOL_HEALTH_CHECK_AFTER,
+                    host=settings.POSTGRES_HOST,
+                    port=settings.POSTGRES_PORT,
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    database=settings.POSTGRES_DB,
+                )
+    return _pool
+
+
+def close_postgis_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,172 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: exports are then precompressed with gzip only
+    brotli = None
+
+
+MANIFEST_NAME = "manifest.json"
+
+# Hex digits of the sha256 kept in asset file names
+HASH_LENGTH = 16
+
+# "<stem>.<hash>.<ext>", e.g. lulc_classes_2024.3f9a0c1be27d4a55.geojson
+HASHED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<suffix>\.[^.]+)$" % HASH_LENGTH)
+
+
+# Content-Encoding -> suffix of the precompressed sibling, in server preference order
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def hashed_name(logical_name: str, digest: str) -> str:
+    """lulc_classes_2024.geojson -> lulc_classes_2024.<hash>.geojson"""
+    stem, suffix = os.path.splitext(logical_name)
+    return f"{stem}.{digest[:HASH_LENGTH]}{suffix}"
+
+
+def asset_hash(file_name: str) -> Optional[str]:
+    """Content hash embedded in a hashed asset name, None for any other file"""
+    match = HASHED_NAME.match(file_name)
+    return match["hash"] if match else None
+
+
+def _write_atomic(path: Path, body: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        # mkstemp creates 0600 files; assets are served to everyone
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _link_atomic(source: Path, target: Path) -> None:
+    """Point `target` at the bytes of `source` (hard link, copy where links are unsupported)"""
+    if target.exists() and os.path.samefile(source, target):
+        # rename() onto another link of the same file is a no-op that would leave tmp behind
+        return
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp)
+    except OSError:
+        tmp.write_bytes(source.read_bytes())
+    os.replace(tmp, target)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # mtime=0: identical input gives identical bytes (stable ETags across exports)
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=11)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def available_encodings():
+    return [e for e in PRECOMPRESSED if e != "br" or brotli is not None]
+
+
+def write_precompressed(path: Path, body: Optional[bytes] = None) -> Dict[str, int]:
+    """
+    Write the missing `<path>.gz` / `<path>.br` siblings of an asset (compressed once,
+    at export time, so the server never compresses per request). Returns encoding -> size.
+    """
+    sizes = {}
+    for encoding in available_encodings():
+        variant = path.with_name(path.name + PRECOMPRESSED[encoding])
+        if not variant.exists():
+            if body is None:
+                body = path.read_bytes()
+            _write_atomic(variant, compress(body, encoding))
+        sizes[encoding] = variant.stat().st_size
+    return sizes
+
+
+def _glob_escape(text: str) -> str:
+    return re.sub(r"([*?\[])", r"[\1]", text)
+
+
+def load_manifest(directory) -> dict:
+    """{"generated_at": ..., "assets": {logical name: {"file", "sha256", "bytes", "encodings"}}}"""
+    path = Path(directory) / MANIFEST_NAME
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        manifest = {}
+    manifest.setdefault("assets", {})
+    return manifest
+
+
+def write_manifest(directory, assets: Dict[str, dict]) -> dict:
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "assets": dict(sorted(assets.items())),
+    }
+    body = json.dumps(manifest, indent=2).encode("utf-8")
+    _write_atomic(Path(directory) / MANIFEST_NAME, body)
+    return manifest
+
+
+def publish_asset(directory, logical_name: str, body: bytes, precompress: bool = True) -> dict:
+    """
+    Write `body` under its content-hashed name, repoint the plain `logical_name`
+    at it (for clients that do not read the manifest) and record it in the manifest.
+
+    Hashed files are never rewritten, so they can be cached forever. The previous
+    version of the asset is kept so clients holding the old manifest can still load
+    it; older versions are removed. `precompress` also writes gzip / brotli siblings
+    (leave it off for binary formats read with Range requests).
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    digest = content_hash(body)
+    name = hashed_name(logical_name, digest)
+    path = directory / name
+    if not path.exists():
+        _write_atomic(path, body)
+    encodings = write_precompressed(path, body) if precompress else {}
+    _link_atomic(path, directory / logical_name)
+    for encoding in encodings:
+        ext = PRECOMPRESSED[encoding]
+        _link_atomic(path.with_name(name + ext), directory / (logical_name + ext))
+
+    manifest = load_manifest(directory)
+    assets = manifest["assets"]
+    previous = assets.get(logical_name, {}).get("file")
+    assets[logical_name] = {"file": name, "sha256": digest, "bytes": len(body), "encodings": encodings}
+    write_manifest(directory, assets)
+
+    stem, suffix = os.path.splitext(logical_name)
+    for old in directory.glob(f"{_glob_escape(stem)}.*{suffix}"):
+        match = HASHED_NAME.match(old.name)
+        if match and match["stem"] == stem and old.name not in (name, previous):
+            old.unlink(missing_ok=True)
+            for ext in PRECOMPRESSED.values():
+                old.with_name(old.name + ext).unlink(missing_ok=True)
+    return assets[logical_name]
+
+
+def publish_existing(directory, pattern: str = "*.geojson") -> Dict[str, dict]:
+    """Publish plain files already in `directory` (e.g. hand-made boundaries) that are not hashed yet"""
+    published = {}
+    for path in sorted(Path(directory).glob(pattern)):
+        if asset_hash(path.name) is None:
+            published[path.name] = publish_asset(directory, path.name, path.read_bytes())
+    return published
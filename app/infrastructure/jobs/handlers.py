@@ -0,0 +1,46 @@
+from typing import Callable, Dict
+
+from app.infrastructure.raster.boundary_stats import boundary_layers, compute_boundary_histograms, stale_pairs
+from app.infrastructure.raster.catalog import RasterCatalog
+from app.infrastructure.raster.vectorize import build_class_polygons
+
+
+# Job kinds
+VECTORIZE_CLASSES = "vectorize_classes"
+BOUNDARY_HISTOGRAMS = "boundary_histograms"
+
+
+def vectorize_classes(conn, job: dict) -> None:
+    """key: year; params: {"rebuild": bool}"""
+    # Fresh catalog read: the raster may have been imported moments ago
+    entry = RasterCatalog(ttl=0).get(conn, job["key"])
+    if entry is None:
+        raise ValueError(f"No raster table found for year {job['key']}")
+    build_class_polygons(conn, entry.year, entry.raster_table, rebuild=bool(job["params"].get("rebuild")))
+
+
+def boundary_histograms(conn, job: dict) -> None:
+    """
+    key: boundary table; params: {"years": [...] (default all), "force": bool}.
+    Recomputes the layer x year pairs whose shapefile or raster checksum changed since
+    they were computed (all requested pairs with force), committing each pair.
+    """
+    layer = job["key"]
+    layers = boundary_layers(conn)
+    if layer not in layers:
+        raise ValueError(f"No imported boundary table {layer}")
+    entries = RasterCatalog(ttl=0).entries(conn)
+    years = job["params"].get("years")
+    if job["params"].get("force"):
+        pairs = [(layer, e) for y, e in sorted(entries.items()) if not years or y in years]
+    else:
+        pairs = stale_pairs(conn, entries, {layer: layers[layer]}, years)
+    for _, entry in pairs:
+        compute_boundary_histograms(conn, layer, layers[layer], entry)
+        conn.commit()
+
+
+JOB_HANDLERS: Dict[str, Callable[[object, dict], None]] = {
+    VECTORIZE_CLASSES: vectorize_classes,
+    BOUNDARY_HISTOGRAMS: boundary_histograms,
+}
@@ -0,0 +1,156 @@
+import json
+import threading
+from typing import List, Optional
+
+from psycopg2.extras import RealDictCursor
+
+
+JOBS_TABLE = "raster_jobs"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+
+def ensure_job_table(conn) -> None:
+    """
+    Create the job queue table if it does not exist yet. At most one queued or
+    running job per (kind, key), enforced by a partial unique index.
+    """
+    global _table_ready
+    with _table_lock:
+        if _table_ready:
+            return
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+                    id BIGSERIAL PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    params JSONB NOT NULL DEFAULT '{{}}'::jsonb,
+                    status TEXT NOT NULL DEFAULT '{QUEUED}',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    started_at TIMESTAMPTZ,
+                    finished_at TIMESTAMPTZ
+                );
+                CREATE UNIQUE INDEX IF NOT EXISTS {JOBS_TABLE}_active_idx
+                    ON {JOBS_TABLE} (kind, key) WHERE status IN ('{QUEUED}', '{RUNNING}');
+                CREATE INDEX IF NOT EXISTS {JOBS_TABLE}_queued_idx
+                    ON {JOBS_TABLE} (id) WHERE status = '{QUEUED}';
+                """
+            )
+        conn.commit()
+        _table_ready = True
+
+
+def enqueue_job(conn, kind: str, key: str, params: Optional[dict] = None) -> dict:
+    """
+    Queue a job unless one for the same (kind, key) is already queued or running;
+    returns the new or the existing active job. Runs in the caller's transaction.
+    """
+    ensure_job_table(conn)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    while True:
+        cur.execute(
+            f"""
+            INSERT INTO {JOBS_TABLE} (kind, key, params)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (kind, key) WHERE status IN ('{QUEUED}', '{RUNNING}') DO NOTHING
+            RETURNING *;
+            """,
+            (kind, key, json.dumps(params or {})),
+        )
+        job = cur.fetchone() or active_job(conn, kind, key)
+        # None: the conflicting job finished between the two statements, so insert again
+        if job is not None:
+            return job
+
+
+def claim_job(conn, kinds: Optional[List[str]] = None) -> Optional[dict]:
+    """Mark the oldest queued job as running and return it (committed), or None"""
+    ensure_job_table(conn)
+    kind_filter = "AND kind = ANY(%(kinds)s)" if kinds else ""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        f"""
+        UPDATE {JOBS_TABLE}
+        SET status = '{RUNNING}', started_at = NOW(), attempts = attempts + 1, error = NULL
+        WHERE id = (
+            SELECT id FROM {JOBS_TABLE}
+            WHERE status = '{QUEUED}' {kind_filter}
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING *;
+        """,
+        {"kinds": kinds},
+    )
+    job = cur.fetchone()
+    conn.commit()
+    return job
+
+
+def finish_job(conn, job_id: int, error: Optional[str] = None) -> None:
+    """Record the outcome of a running job (committed)"""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"UPDATE {JOBS_TABLE} SET status = %s, error = %s, finished_at = NOW() WHERE id = %s;",
+            (FAILED if error else DONE, error, job_id),
+        )
+    conn.commit()
+
+
+def requeue_stale_jobs(conn, older_than_s: float) -> int:
+    """Put back jobs left running by a worker that died; returns how many (committed)"""
+    ensure_job_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {JOBS_TABLE} SET status = '{QUEUED}'
+            WHERE status = '{RUNNING}' AND started_at < NOW() - make_interval(secs => %s);
+            """,
+            (older_than_s,),
+        )
+        count = cur.rowcount
+    conn.commit()
+    return count
+
+
+def get_job(conn, job_id: int) -> Optional[dict]:
+    ensure_job_table(conn)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(f"SELECT * FROM {JOBS_TABLE} WHERE id = %s;", (job_id,))
+    return cur.fetchone()
+
+
+def active_job(conn, kind: str, key: str) -> Optional[dict]:
+    """The queued or running job for (kind, key), if any"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        f"SELECT * FROM {JOBS_TABLE} WHERE kind = %s AND key = %s AND status IN ('{QUEUED}', '{RUNNING}');",
+        (kind, key),
+    )
+    return cur.fetchone()
+
+
+def list_jobs(conn, kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[dict]:
+    ensure_job_table(conn)
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        f"""
+        SELECT * FROM {JOBS_TABLE}
+        WHERE (%(kind)s IS NULL OR kind = %(kind)s) AND (%(status)s IS NULL OR status = %(status)s)
+        ORDER BY id DESC
+        LIMIT %(limit)s;
+        """,
+        {"kind": kind, "status": status, "limit": limit},
+    )
+    return cur.fetchall()
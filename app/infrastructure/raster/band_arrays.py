@@ -0,0 +1,47 @@
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import rasterio
+
+
+def array_path(array_dir: Path, tif_path: Path, mtime_ns: int, size: int, band: int = 1) -> Path:
+    """Name of a band's .npy copy; embeds the GeoTIFF's mtime and size, so a replaced file gets a new copy"""
+    return Path(array_dir) / f"{Path(tif_path).stem}.{mtime_ns}.{size}.b{band}.npy"
+
+
+def _write_band(tif_path: Path, dst: Path, band: int) -> None:
+    with rasterio.open(tif_path) as src:
+        values = src.read(band)
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, suffix=".npy.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, values)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    # Older copies of the same GeoTIFF
+    for old in dst.parent.glob(f"{Path(tif_path).stem}.*.b{band}.npy"):
+        if old != dst:
+            old.unlink(missing_ok=True)
+
+
+@lru_cache(maxsize=32)
+def band_array(signature, array_dir: str, band: int = 1) -> np.ndarray:
+    """
+    Read-only memory map of a GeoTIFF band (signature: local_engine.file_signature).
+
+    The compressed GeoTIFF is decoded once into an uncompressed .npy copy under
+    `array_dir`; afterwards pixels are read straight from the OS page cache (shared by
+    worker processes), so indexing thousands of points costs one fancy-index.
+    """
+    path, mtime_ns, size = signature
+    dst = array_path(Path(array_dir), Path(path), mtime_ns, size, band)
+    if not dst.exists():
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        _write_band(Path(path), dst, band)
+    return np.load(dst, mmap_mode="r")
@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Tuple
+
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
+
+from app.infrastructure.raster.catalog import RasterCatalogEntry
+from app.infrastructure.raster.histograms import zone_class_areas
+
+
+# Long table: one row per (boundary layer, feature, year, class)
+BOUNDARY_HISTOGRAM_TABLE = "boundary_class_histograms"
+# Checksums each (layer, year) pair was computed from, to find the pairs to recompute
+BOUNDARY_SOURCES_TABLE = "boundary_histogram_sources"
+
+
+def ensure_boundary_tables(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {BOUNDARY_HISTOGRAM_TABLE} (
+                layer TEXT NOT NULL,
+                feature_id INTEGER NOT NULL,
+                year TEXT NOT NULL,
+                class_code INTEGER NOT NULL,
+                pixel_count BIGINT NOT NULL,
+                area_m2 DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (layer, feature_id, year, class_code)
+            );
+            CREATE INDEX IF NOT EXISTS {BOUNDARY_HISTOGRAM_TABLE}_year_idx
+                ON {BOUNDARY_HISTOGRAM_TABLE} (layer, year);
+            CREATE TABLE IF NOT EXISTS {BOUNDARY_SOURCES_TABLE} (
+                layer TEXT NOT NULL,
+                year TEXT NOT NULL,
+                shapefile_checksum TEXT NOT NULL,
+                raster_checksum TEXT,
+                features INTEGER NOT NULL,
+                computed_at TIMESTAMPTZ DEFAULT NOW(),
+                PRIMARY KEY (layer, year)
+            );
+            """
+        )
+
+
+def boundary_layers(conn) -> Dict[str, str]:
+    """Imported boundary tables (from the `shapefile_imports` ledger) -> checksum of their latest import"""
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('public.shapefile_imports') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return {}
+    cur.execute(
+        """
+        SELECT DISTINCT ON (table_name) table_name, checksum
+        FROM shapefile_imports
+        WHERE to_regclass('public.' || quote_ident(table_name)) IS NOT NULL
+        ORDER BY table_name, created_at DESC, id DESC;
+        """
+    )
+    return dict(cur.fetchall())
+
+
+def computed_sources(conn, layer: Optional[str] = None) -> Dict[Tuple[str, str], dict]:
+    """(layer, year) -> {shapefile_checksum, raster_checksum, features, computed_at}"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS ready;", (f"public.{BOUNDARY_SOURCES_TABLE}",))
+    if not cur.fetchone()["ready"]:
+        return {}
+    cur.execute(
+        f"""
+        SELECT layer, year, shapefile_checksum, raster_checksum, features, computed_at
+        FROM {BOUNDARY_SOURCES_TABLE}
+        WHERE %(layer)s::text IS NULL OR layer = %(layer)s;
+        """,
+        {"layer": layer},
+    )
+    return {(r.pop("layer"), r.pop("year")): r for r in cur.fetchall()}
+
+
+def stale_pairs(
+    conn, entries: Dict[str, RasterCatalogEntry], layers: Dict[str, str], years: Optional[List[str]] = None
+) -> List[Tuple[str, RasterCatalogEntry]]:
+    """(layer, raster entry) pairs never computed, or computed from another shapefile or raster checksum"""
+    sources = computed_sources(conn)
+    pairs = []
+    for layer, shapefile_checksum in sorted(layers.items()):
+        for year, entry in sorted(entries.items()):
+            if years and year not in years:
+                continue
+            source = sources.get((layer, year))
+            if (
+                source is None
+                or source["shapefile_checksum"] != shapefile_checksum
+                or source["raster_checksum"] != entry.checksum
+            ):
+                pairs.append((layer, entry))
+    return pairs
+
+
+def compute_boundary_histograms(conn, layer: str, shapefile_checksum: str, entry: RasterCatalogEntry) -> int:
+    """
+    (Re)compute the class histogram of every feature of boundary table `layer` for the
+    raster of `entry`, replacing the pair's rows and recording the checksums they come
+    from. Runs in the caller's transaction; returns the number of rows written.
+    """
+    ensure_boundary_tables(conn)
+    zones = sql.SQL(
+        "SELECT id AS zone, ST_Transform(geom, %(srid)s) AS geom FROM public.{} WHERE geom IS NOT NULL"
+    ).format(sql.Identifier(layer)).as_string(conn)
+    rows = zone_class_areas(conn, entry.raster_table, zones, {"srid": entry.srid}, entry.srid)
+
+    with conn.cursor() as cur:
+        cur.execute(
+            f"DELETE FROM {BOUNDARY_HISTOGRAM_TABLE} WHERE layer = %s AND year = %s;",
+            (layer, entry.year),
+        )
+        execute_values(
+            cur,
+            f"""
+            INSERT INTO {BOUNDARY_HISTOGRAM_TABLE} (layer, feature_id, year, class_code, pixel_count, area_m2)
+            VALUES %s;
+            """,
+            [(layer, zone, entry.year, code, count, area) for zone, code, count, area in rows],
+        )
+        cur.execute(
+            f"""
+            INSERT INTO {BOUNDARY_SOURCES_TABLE} (layer, year, shapefile_checksum, raster_checksum, features)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (layer, year) DO UPDATE SET
+                shapefile_checksum = EXCLUDED.shapefile_checksum,
+                raster_checksum = EXCLUDED.raster_checksum,
+                features = EXCLUDED.features,
+                computed_at = NOW();
+            """,
+            (layer, entry.year, shapefile_checksum, entry.checksum, len({zone for zone, _, _, _ in rows})),
+        )
+    return len(rows)
+
+
+def load_boundary_histograms(
+    conn, layer: str, years: Optional[List[str]] = None, feature_ids: Optional[List[int]] = None
+) -> List[dict]:
+    """Stored rows (feature_id, year, class_code, pixel_count, area_m2) of a layer, optionally filtered"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS ready;", (f"public.{BOUNDARY_HISTOGRAM_TABLE}",))
+    if not cur.fetchone()["ready"]:
+        return []
+    cur.execute(
+        f"""
+        SELECT feature_id, year, class_code, pixel_count, area_m2
+        FROM {BOUNDARY_HISTOGRAM_TABLE}
+        WHERE layer = %(layer)s
+          AND (%(years)s::text[] IS NULL OR year = ANY(%(years)s::text[]))
+          AND (%(features)s::int[] IS NULL OR feature_id = ANY(%(features)s::int[]))
+        ORDER BY feature_id, year, class_code;
+        """,
+        {"layer": layer, "years": years or None, "features": feature_ids or None},
+    )
+    return cur.fetchall()
@@ -0,0 +1,196 @@
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from app.config.settings import settings
+from app.infrastructure.raster.histograms import HISTOGRAM_TABLE
+
+
+YEAR_SUFFIX = re.compile(r"(\d{4})$")
+ALL_YEARS_TABLE = "lulc_classes_all_years"
+
+
+def vector_table_name(year: str) -> str:
+    """Per-year class polygon table built from the raster by `classes-geojson`"""
+    return f"lulc_classes_{year}"
+
+
+@dataclass(frozen=True)
+class RasterCatalogEntry:
+    year: str
+    raster_table: str
+    srid: Optional[int] = None
+    num_bands: Optional[int] = None
+    filename: Optional[str] = None
+    checksum: Optional[str] = None
+    vector_table: Optional[str] = None
+    # raster2pgsql -l overview tables: reduction factor -> table
+    overviews: Dict[int, str] = field(default_factory=dict)
+    # Other derived tables holding data for this year, keyed by purpose
+    precomputed_tables: Dict[str, str] = field(default_factory=dict)
+
+
+class RasterCatalog:
+    """
+    In-memory year -> tables map built from `raster_columns` and `raster_imports`.
+
+    The map is rebuilt lazily when a cheap fingerprint of the import ledger and of
+    the raster/vector tables changes (checked at most every `ttl` seconds), so a
+    new import by `scripts/seed_rasters_auto.py` shows up without restarting the API.
+    `invalidate()` forces a rebuild on the next lookup.
+    """
+
+    def __init__(self, ttl: float = 30.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, RasterCatalogEntry] = {}
+        self._fingerprint: Optional[Tuple] = None
+        self._checked_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._fingerprint = None
+            self._checked_at = 0.0
+
+    def entries(self, conn) -> Dict[str, RasterCatalogEntry]:
+        now = time.monotonic()
+        with self._lock:
+            if self._fingerprint is not None and now - self._checked_at < self.ttl:
+                return self._entries
+            fingerprint = self._read_fingerprint(conn)
+            if fingerprint != self._fingerprint:
+                self._entries = self._build(conn)
+                self._fingerprint = fingerprint
+            self._checked_at = now
+            return self._entries
+
+    def get(self, conn, year: str) -> Optional[RasterCatalogEntry]:
+        return self.entries(conn).get(str(year))
+
+    @staticmethod
+    def _read_fingerprint(conn) -> Tuple:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT
+                    (SELECT COUNT(*) FROM raster_columns) AS rasters,
+                    (SELECT COUNT(*) FROM pg_class
+                      WHERE relname LIKE 'lulc\\_classes\\_%' AND relkind IN ('r', 'm')) AS vectors,
+                    to_regclass('public.raster_imports') IS NOT NULL AS has_ledger,
+                    to_regclass('public.{HISTOGRAM_TABLE}') IS NOT NULL AS has_histograms;
+                """
+            )
+            rasters, vectors, has_ledger, has_histograms = cur.fetchone()
+            ledger = (0, None)
+            if has_ledger:
+                cur.execute("SELECT COUNT(*), MAX(id) FROM raster_imports;")
+                ledger = tuple(cur.fetchone())
+        conn.rollback()
+        return (rasters, vectors, has_histograms) + ledger
+
+    @staticmethod
+    def _build(conn) -> Dict[str, RasterCatalogEntry]:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(
+            "SELECT to_regclass('public.raster_imports') IS NOT NULL AS has_ledger, "
+            "to_regclass(%s) IS NOT NULL AS has_histograms;",
+            (f"public.{HISTOGRAM_TABLE}",),
+        )
+        flags = cur.fetchone()
+        has_ledger, has_histograms = flags["has_ledger"], flags["has_histograms"]
+
+        ledger_join = """
+            LEFT JOIN LATERAL (
+                SELECT filename, checksum, id
+                FROM raster_imports
+                WHERE table_name = rc.r_table_name
+                ORDER BY id DESC
+                LIMIT 1
+            ) ri ON TRUE
+        """ if has_ledger else ""
+        ledger_cols = "ri.filename, ri.checksum, ri.id AS import_id" if has_ledger else \
+            "NULL AS filename, NULL AS checksum, NULL AS import_id"
+
+        # Overview tables (o_2_<table>, ...) are registered in raster_columns too; skip them
+        cur.execute(f"""
+            SELECT rc.r_table_name AS table_name, rc.srid, rc.num_bands, {ledger_cols}
+            FROM raster_columns rc
+            {ledger_join}
+            WHERE rc.r_table_schema = 'public'
+              AND NOT EXISTS (
+                  SELECT 1 FROM raster_overviews ro
+                  WHERE ro.o_table_schema = rc.r_table_schema
+                    AND ro.o_table_name = rc.r_table_name
+              )
+            ORDER BY rc.r_table_name;
+        """)
+        rasters = cur.fetchall()
+
+        cur.execute("""
+            SELECT r_table_name, overview_factor, o_table_name
+            FROM raster_overviews
+            WHERE r_table_schema = 'public' AND o_table_schema = 'public';
+        """)
+        overviews: Dict[str, Dict[int, str]] = {}
+        for row in cur.fetchall():
+            overviews.setdefault(row["r_table_name"], {})[int(row["overview_factor"])] = row["o_table_name"]
+
+        cur.execute("""
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = 'public'
+              AND table_name LIKE 'lulc\\_classes\\_%';
+        """)
+        vector_tables = {row["table_name"] for row in cur.fetchall()}
+
+        all_years = set()
+        if ALL_YEARS_TABLE in vector_tables:
+            cur.execute(f"SELECT DISTINCT year::text AS year FROM {ALL_YEARS_TABLE};")
+            all_years = {row["year"] for row in cur.fetchall()}
+        conn.rollback()
+
+        chosen: Dict[str, dict] = {}
+        for row in rasters:
+            match = YEAR_SUFFIX.search(row["table_name"])
+            if not match:
+                continue
+            year = match.group(1)
+            current = chosen.get(year)
+            if current is not None:
+                # Prefer the table with the most recent recorded import
+                logging.warning(
+                    "Multiple raster tables for year %s: %s, %s",
+                    year, current["table_name"], row["table_name"],
+                )
+                if (row["import_id"] or 0) <= (current["import_id"] or 0):
+                    continue
+            chosen[year] = row
+
+        entries = {}
+        for year, row in chosen.items():
+            vector_table = vector_table_name(year)
+            precomputed = {}
+            if year in all_years:
+                precomputed["classes_all_years"] = ALL_YEARS_TABLE
+            if has_histograms:
+                precomputed["class_histogram"] = HISTOGRAM_TABLE
+            entries[year] = RasterCatalogEntry(
+                year=year,
+                raster_table=row["table_name"],
+                srid=row["srid"],
+                num_bands=row["num_bands"],
+                filename=row["filename"],
+                checksum=row["checksum"],
+                vector_table=vector_table if vector_table in vector_tables else None,
+                overviews=overviews.get(row["table_name"], {}),
+                precomputed_tables=precomputed,
+            )
+        return entries
+
+
+raster_catalog = RasterCatalog(ttl=settings.RASTER_CATALOG_TTL)
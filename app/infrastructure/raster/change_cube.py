@@ -0,0 +1,159 @@
+import json
+import os
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from app.domain.entities.raster import ChangeCube, TransitionMatrix
+from app.infrastructure.raster.local_engine import class_code_bound, file_signature
+from app.infrastructure.raster.pixel_area import dataset_row_areas
+
+
+CUBE_MANIFEST = "change_cube.json"
+FIRST_CHANGE_RASTER = "first_change_year.tif"
+CHANGE_COUNT_RASTER = "change_count.tif"
+
+
+def _source_signatures(paths: Dict[str, Path]) -> Dict[str, list]:
+    return {year: [Path(sig[0]).name, sig[1], sig[2]] for year, sig in ((y, file_signature(p)) for y, p in paths.items())}
+
+
+def _int_keys(d: dict) -> dict:
+    # JSON object keys come back as strings
+    return {int(k): v for k, v in d.items()}
+
+
+def build_change_cube(paths: Dict[str, Path], out_dir: Path, block_rows: int = 256) -> ChangeCube:
+    """
+    Stack every year's class raster into a (years, rows, W) array one row block at a
+    time and, in that single pass, accumulate:
+
+    - the transition matrix (pixel counts and m²) of each consecutive year pair,
+      as one np.bincount over `from * K + to` per pair;
+    - per pixel, the year of its first class change and its number of changes,
+      written to `first_change_year.tif` / `change_count.tif` in `out_dir`.
+
+    Rasters must share one pixel grid. The summary is persisted as
+    `change_cube.json` (written last, atomically) so readers never see a partial cube.
+    """
+    years = sorted(paths)
+    if len(years) < 2:
+        raise ValueError("A change cube needs at least two years")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    sources = [rasterio.open(paths[y]) for y in years]
+    try:
+        ref = sources[0]
+        for year, src in zip(years[1:], sources[1:]):
+            if (src.shape, src.crs) != (ref.shape, ref.crs) or not src.transform.almost_equals(ref.transform):
+                raise ValueError(f"{paths[year].name} is not on the same pixel grid as {paths[years[0]].name}")
+
+        k = class_code_bound([file_signature(paths[y]) for y in years])
+        n_pairs = len(years) - 1
+        pair_counts = np.zeros((n_pairs, k * k), dtype=np.int64)
+        pair_areas = np.zeros((n_pairs, k * k), dtype=np.float64)
+        # Index 0 = never changed, i = first change in years[i]
+        first_counts = np.zeros(len(years), dtype=np.int64)
+        first_areas = np.zeros(len(years), dtype=np.float64)
+        change_counts = np.zeros(len(years), dtype=np.int64)
+        change_areas = np.zeros(len(years), dtype=np.float64)
+
+        year_values = np.array([0] + [int(y) for y in years[1:]], dtype=np.uint16)
+        row_areas = dataset_row_areas(ref)
+        nodata = [src.nodata for src in sources]
+
+        profile = ref.profile.copy()
+        profile.update(count=1, tiled=True, blockxsize=256, blockysize=256, compress="lzw", nodata=None)
+        first_path, count_path = out_dir / FIRST_CHANGE_RASTER, out_dir / CHANGE_COUNT_RASTER
+        with rasterio.open(first_path, "w", **{**profile, "dtype": "uint16"}) as first_dst, \
+                rasterio.open(count_path, "w", **{**profile, "dtype": "uint8"}) as count_dst:
+            for row_off in range(0, ref.height, block_rows):
+                window = Window(0, row_off, ref.width, min(block_rows, ref.height - row_off))
+                stack = np.stack([src.read(1, window=window) for src in sources])
+
+                valid = np.ones(stack.shape[1:], dtype=bool)
+                for layer, nd in zip(stack, nodata):
+                    if nd is not None:
+                        valid &= layer != nd
+                weights = np.broadcast_to(
+                    row_areas[row_off:row_off + window.height, None], valid.shape
+                )[valid]
+
+                for i in range(n_pairs):
+                    pairs = stack[i][valid].astype(np.int64) * k + stack[i + 1][valid]
+                    pair_counts[i] += np.bincount(pairs, minlength=k * k)
+                    pair_areas[i] += np.bincount(pairs, weights=weights, minlength=k * k)
+
+                changed = (stack[1:] != stack[:-1]) & valid
+                n_changes = changed.sum(axis=0)
+                # argmax finds the first True; pixels that never change map to index 0
+                first = np.where(n_changes > 0, changed.argmax(axis=0) + 1, 0)
+
+                first_counts += np.bincount(first[valid], minlength=len(years))
+                first_areas += np.bincount(first[valid], weights=weights, minlength=len(years))
+                change_counts += np.bincount(n_changes[valid], minlength=len(years))
+                change_areas += np.bincount(n_changes[valid], weights=weights, minlength=len(years))
+
+                first_dst.write(np.where(valid, year_values[first], 0).astype(np.uint16), 1, window=window)
+                count_dst.write(np.where(valid, n_changes, 0).astype(np.uint8), 1, window=window)
+    finally:
+        for src in sources:
+            src.close()
+
+    transitions = []
+    for i in range(n_pairs):
+        counts, areas = pair_counts[i].reshape(k, k), pair_areas[i].reshape(k, k)
+        codes = np.nonzero(counts.sum(axis=1) + counts.sum(axis=0))[0]
+        sub = np.ix_(codes, codes)
+        transitions.append(TransitionMatrix(
+            from_year=years[i],
+            to_year=years[i + 1],
+            classes=[int(c) for c in codes],
+            counts=counts[sub].tolist(),
+            areas_m2=areas[sub].tolist(),
+        ))
+
+    cube = ChangeCube(
+        years=years,
+        transitions=transitions,
+        first_change_counts={int(year_values[i]): int(c) for i, c in enumerate(first_counts) if c},
+        first_change_areas_m2={int(year_values[i]): float(a) for i, a in enumerate(first_areas) if first_counts[i]},
+        change_count_counts={n: int(c) for n, c in enumerate(change_counts) if c},
+        change_count_areas_m2={n: float(a) for n, a in enumerate(change_areas) if change_counts[n]},
+        sources=_source_signatures({y: paths[y] for y in years}),
+        built_at=datetime.now(timezone.utc).isoformat(),
+    )
+    manifest = out_dir / CUBE_MANIFEST
+    tmp = manifest.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(asdict(cube)))
+    os.replace(tmp, manifest)
+    return cube
+
+
+def load_change_cube(out_dir: Path) -> Optional[ChangeCube]:
+    """The persisted change cube in `out_dir`, or None if it was never built"""
+    manifest = Path(out_dir) / CUBE_MANIFEST
+    if not manifest.exists():
+        return None
+    data = json.loads(manifest.read_text())
+    return ChangeCube(
+        years=data["years"],
+        transitions=[TransitionMatrix(**t) for t in data["transitions"]],
+        first_change_counts=_int_keys(data["first_change_counts"]),
+        first_change_areas_m2=_int_keys(data["first_change_areas_m2"]),
+        change_count_counts=_int_keys(data["change_count_counts"]),
+        change_count_areas_m2=_int_keys(data["change_count_areas_m2"]),
+        sources=data.get("sources", {}),
+        built_at=data.get("built_at"),
+    )
+
+
+def is_stale(cube: ChangeCube, paths: Dict[str, Path]) -> bool:
+    """True when the set of years or any source GeoTIFF changed since the cube was built"""
+    return cube.sources != _source_signatures(paths)
@@ -0,0 +1,84 @@
+from typing import Optional
+
+from app.infrastructure.raster.vector_tiles import simplify_tolerance
+
+
+TIERS_TABLE = "lulc_class_tiers"
+
+# Zoom levels with a precomputed simplification of every class polygon, each simplified by
+# half a screen pixel at that zoom. The finest tier (z14, ~4.8 m) is already below half a
+# pixel of the 10 m LULC rasters, so nothing finer is ever needed.
+TIER_ZOOMS = (6, 8, 10, 12, 14)
+
+# Equatorial metres per degree, to turn a ground resolution into a tolerance in degrees
+METERS_PER_DEGREE = 111320.0
+
+
+def snap_zoom(zoom: Optional[float] = None, resolution: Optional[float] = None, tolerance: Optional[float] = None) -> int:
+    """
+    Tier for a request, given (by precedence) a map zoom, a ground resolution in metres
+    per screen pixel, or a raw simplification tolerance in degrees: the coarsest tier
+    that is not coarser than requested (finest tier when nothing is given).
+    """
+    if zoom is not None:
+        target = simplify_tolerance(zoom)
+    elif resolution is not None:
+        target = resolution / METERS_PER_DEGREE / 2
+    elif tolerance is not None:
+        target = tolerance
+    else:
+        return TIER_ZOOMS[-1]
+    for tier in TIER_ZOOMS:
+        if simplify_tolerance(tier) <= target:
+            return tier
+    return TIER_ZOOMS[-1]
+
+
+def ensure_tiers_table(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TIERS_TABLE} (
+                year       TEXT NOT NULL,
+                zoom       SMALLINT NOT NULL,
+                class_code INTEGER NOT NULL,
+                geom       geometry(MultiPolygon, 4326),
+                PRIMARY KEY (year, zoom, class_code)
+            );
+        """)
+
+
+def build_class_tiers(conn, year: str, source_table: str, year_column: Optional[str] = None) -> int:
+    """
+    Replace the year's rows in `lulc_class_tiers` with one simplified copy of every class
+    polygon of `source_table` per tier zoom (`year_column` filters a multi-year source).
+    Runs in the caller's transaction, so a rebuilt polygon table and its tiers are
+    published together. Returns the number of rows written.
+    """
+    ensure_tiers_table(conn)
+    where = f"WHERE geom IS NOT NULL AND {year_column}::text = %(year)s" if year_column else "WHERE geom IS NOT NULL"
+    rows = 0
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {TIERS_TABLE} WHERE year = %s;", (str(year),))
+        for zoom in TIER_ZOOMS:
+            cur.execute(f"""
+                INSERT INTO {TIERS_TABLE} (year, zoom, class_code, geom)
+                SELECT %(year)s, %(zoom)s, class_code,
+                       ST_Multi(ST_SimplifyPreserveTopology(ST_Union(geom), %(tolerance)s))::geometry(MultiPolygon, 4326)
+                FROM {source_table}
+                {where}
+                GROUP BY class_code;
+            """, {"year": str(year), "zoom": zoom, "tolerance": simplify_tolerance(zoom)})
+            rows += cur.rowcount
+    return rows
+
+
+def has_tiers(conn, year: Optional[str] = None) -> bool:
+    """Whether tiers exist at all (`year` None) or for one year"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"public.{TIERS_TABLE}",))
+        if not cur.fetchone()[0]:
+            return False
+        if year is None:
+            return True
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {TIERS_TABLE} WHERE year = %s);", (str(year),))
+        return cur.fetchone()[0]
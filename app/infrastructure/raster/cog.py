@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+import rasterio
+import rasterio.shutil
+
+from app.config.settings import settings
+
+
+# Reduction factors of the overview levels built for COG copies and by `raster2pgsql -l`
+OVERVIEW_FACTORS = tuple(int(f) for f in settings.RASTER_OVERVIEW_FACTORS.split(",") if f.strip())
+
+
+def cog_path(cog_dir: Path, src_path: Path) -> Path:
+    return Path(cog_dir) / src_path.name
+
+
+def is_fresh(src_path: Path, derived_path: Path) -> bool:
+    """True if `derived_path` exists and is newer than its source"""
+    try:
+        return derived_path.stat().st_mtime_ns >= src_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def make_cog(src_path: Path, dst_path: Path) -> Path:
+    """
+    Write a Cloud-Optimized GeoTIFF copy of a class raster with internal overviews.
+
+    Overviews use MODE resampling (majority class), the only sensible choice for
+    categorical data; levels go down until the smallest fits in one 256px block,
+    which covers OVERVIEW_FACTORS for rasters of this size. Written to a temp file
+    and renamed, so readers never open a partial COG.
+    """
+    dst_path = Path(dst_path)
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst_path.with_name(dst_path.name + ".tmp")
+    rasterio.shutil.copy(
+        str(src_path),
+        str(tmp),
+        driver="COG",
+        COMPRESS="LZW",
+        BLOCKSIZE=256,
+        OVERVIEW_RESAMPLING="MODE",
+    )
+    os.replace(tmp, dst_path)
+    return dst_path
+
+
+def ensure_cog(src_path: Path, cog_dir: Path) -> Optional[Path]:
+    """COG copy of `src_path` in `cog_dir`, (re)built if missing or older than the source"""
+    dst = cog_path(cog_dir, src_path)
+    if is_fresh(src_path, dst):
+        return None
+    return make_cog(src_path, dst)
+
+
+def overview_factor(native_size: int, target_size: int, factors: Iterable[int] = OVERVIEW_FACTORS) -> int:
+    """
+    Coarsest available overview factor that still has at least `target_size` pixels
+    along an axis of `native_size` pixels (1 = full resolution).
+    """
+    usable = [f for f in factors if native_size / f >= target_size]
+    return max(usable, default=1)
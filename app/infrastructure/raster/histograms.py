@@ -0,0 +1,187 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg2.extras import RealDictCursor, execute_values
+
+from app.infrastructure.raster.pixel_area import GridSignature, cell_areas, class_areas, is_geographic_srid, row_pixel_areas
+
+
+HISTOGRAM_TABLE = "lulc_class_histograms"
+
+
+def ensure_histogram_table(conn) -> None:
+    """Create the per-year class histogram table if it does not exist yet"""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {HISTOGRAM_TABLE} (
+                year TEXT NOT NULL,
+                class_code INTEGER NOT NULL,
+                pixel_count BIGINT NOT NULL,
+                area_m2 DOUBLE PRECISION NOT NULL,
+                raster_table TEXT NOT NULL,
+                checksum TEXT,
+                computed_at TIMESTAMPTZ DEFAULT NOW(),
+                PRIMARY KEY (year, class_code)
+            );
+            """
+        )
+
+
+def row_value_counts(conn, raster_table: str) -> Tuple[Optional[GridSignature], np.ndarray, np.ndarray]:
+    """
+    (grid signature, class codes, (rows, codes) pixel counts) of a raster table.
+
+    Each tile is cut into one-pixel-high strips (ST_Tile) and counted with ST_ValueCount,
+    so the counts keep the row they come from. Nodata is excluded.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT ST_UpperLeftY(t.strip), ST_ScaleX(t.strip), ST_ScaleY(t.strip), ST_SRID(t.strip),
+                   (t.vc).value::int, (t.vc).count
+            FROM (
+                SELECT s.strip, ST_ValueCount(s.strip) AS vc
+                FROM (SELECT ST_Tile(rast, ST_Width(rast), 1) AS strip FROM {raster_table}) s
+            ) t
+            WHERE (t.vc).value IS NOT NULL;
+            """
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return None, np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.int64)
+
+    _, scale_x, scale_y, srid = rows[0][:4]
+    ys = np.array([r[0] for r in rows])
+    # Rows are numbered from the first strip holding data; areas only depend on their latitude
+    top = ys.max() if scale_y < 0 else ys.min()
+    row_index = np.rint((ys - top) / scale_y).astype(np.intp)
+    codes, code_index = np.unique(np.array([r[4] for r in rows]), return_inverse=True)
+    counts = np.zeros((int(row_index.max()) + 1, codes.size), dtype=np.int64)
+    np.add.at(counts, (row_index, code_index), np.array([r[5] for r in rows], dtype=np.int64))
+
+    signature = GridSignature(float(top), scale_x, scale_y, 0.0, 0.0, counts.shape[0], is_geographic_srid(srid))
+    return signature, codes, counts
+
+
+def zone_class_areas(conn, raster_table: str, zones_sql: str, params: dict, srid: int) -> List[Tuple[int, int, int, float]]:
+    """
+    (zone, class_code, pixel_count, area_m2) of the pixels of `raster_table` inside each
+    zone. `zones_sql` is a SELECT of (zone int, geom) with geometries in the raster's SRID.
+
+    One statement for all zones: the tile index pre-filters tiles (rast && geom), only
+    intersecting tiles are clipped (pixel centers inside the zone), and each clip is
+    counted per one-pixel-high ST_Tile strip so areas follow the rows' latitude.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            WITH zones AS ({zones_sql}),
+            clipped AS (
+                SELECT z.zone, ST_Clip(r.rast, 1, z.geom, true) AS rast
+                FROM zones z
+                JOIN {raster_table} r ON r.rast && z.geom AND ST_Intersects(r.rast, z.geom)
+            ),
+            strips AS (
+                SELECT zone, ST_Tile(rast, ST_Width(rast), 1) AS strip
+                FROM clipped
+                WHERE rast IS NOT NULL
+            )
+            SELECT zone, ST_UpperLeftY(strip), ST_ScaleX(strip), ST_ScaleY(strip),
+                   (vc).value::int, (vc).count
+            FROM (SELECT zone, strip, ST_ValueCount(strip) AS vc FROM strips) t
+            WHERE (vc).value IS NOT NULL AND (vc).count > 0;
+            """,
+            params,
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return []
+
+    zone, top, scale_x, scale_y, code, count = (np.array(col) for col in zip(*rows))
+    areas = count * cell_areas(top, float(scale_x[0]), float(scale_y[0]), is_geographic_srid(srid))
+    # Sum the per-row counts and areas by (zone, class)
+    k = int(code.max()) + 1
+    keys, index = np.unique(zone.astype(np.int64) * k + code, return_inverse=True)
+    counts = np.bincount(index, weights=count)
+    areas = np.bincount(index, weights=areas)
+    return [(int(key // k), int(key % k), int(n), float(a)) for key, n, a in zip(keys, counts, areas)]
+
+
+def compute_histogram(conn, year: str, raster_table: str, checksum: Optional[str] = None) -> int:
+    """
+    (Re)compute the class histogram of `raster_table` for `year`.
+
+    Areas are the per-row class counts (row_value_counts) dotted with the grid's
+    ellipsoidal per-row pixel areas, so no reprojection is involved and pixels are
+    weighted by their own latitude. Runs in the caller's transaction; returns the
+    number of classes written.
+    """
+    signature, codes, row_counts = row_value_counts(conn, raster_table)
+    areas = class_areas(row_counts, row_pixel_areas(signature)) if signature is not None else []
+    with conn.cursor() as cur:
+        cur.execute(f"DELETE FROM {HISTOGRAM_TABLE} WHERE year = %s;", (year,))
+        execute_values(
+            cur,
+            f"""
+            INSERT INTO {HISTOGRAM_TABLE} (year, class_code, pixel_count, area_m2, raster_table, checksum)
+            VALUES %s;
+            """,
+            [
+                (year, int(code), int(count), float(area), raster_table, checksum)
+                for code, count, area in zip(codes, row_counts.sum(axis=0), areas)
+            ],
+        )
+    return len(codes)
+
+
+def load_histogram(conn, year: str, checksum: Optional[str] = None) -> Optional[List[dict]]:
+    """
+    Stored histogram rows (class_code, pixel_count, area_m2) for `year`, ordered by class.
+
+    Returns None when nothing is stored, or when it was computed from a raster
+    whose checksum differs from `checksum` (i.e. it is stale).
+    """
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        f"""
+        SELECT class_code, pixel_count, area_m2, checksum
+        FROM {HISTOGRAM_TABLE}
+        WHERE year = %s
+        ORDER BY class_code;
+        """,
+        (year,),
+    )
+    rows = cur.fetchall()
+    if not rows:
+        return None
+    if checksum and any(r["checksum"] and r["checksum"] != checksum for r in rows):
+        return None
+    return rows
+
+
+def load_histograms(conn, checksums: Dict[str, Optional[str]]) -> Dict[str, List[dict]]:
+    """
+    Stored histogram rows of many years in one query, keyed by year (same rows as
+    `load_histogram`). Years with no rows, or computed from a raster whose checksum
+    differs from `checksums[year]`, are left out.
+    """
+    if not checksums:
+        return {}
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute(
+        f"""
+        SELECT year, class_code, pixel_count, area_m2, checksum
+        FROM {HISTOGRAM_TABLE}
+        WHERE year = ANY(%s)
+        ORDER BY year, class_code;
+        """,
+        (list(checksums),),
+    )
+    by_year: Dict[str, List[dict]] = {}
+    for row in cur.fetchall():
+        by_year.setdefault(row["year"], []).append(row)
+    return {
+        year: rows for year, rows in by_year.items()
+        if not (checksums[year] and any(r["checksum"] and r["checksum"] != checksums[year] for r in rows))
+    }
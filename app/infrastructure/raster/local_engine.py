@@ -0,0 +1,388 @@
+import logging
+import math
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.errors import WindowError
+from rasterio.features import geometry_mask, geometry_window
+from rasterio.warp import transform as warp_transform, transform_geom
+
+from app.application.ports.raster_engine import RasterEngine
+from app.domain.entities.raster import RasterBand, RasterDataset, RasterGrid, ClassHistogram, ZoneHistogram, TransitionMatrix, RasterPreview
+from app.infrastructure.raster.band_arrays import band_array
+from app.infrastructure.raster.catalog import YEAR_SUFFIX
+from app.infrastructure.raster.cog import cog_path, is_fresh, overview_factor
+from app.infrastructure.raster.pixel_area import class_areas, dataset_row_areas
+
+
+# rasterio dtype -> PostGIS pixel type, so both engines report the same band info
+PIXEL_TYPES = {
+    "uint8": "8BUI",
+    "int8": "8BSI",
+    "uint16": "16BUI",
+    "int16": "16BSI",
+    "uint32": "32BUI",
+    "int32": "32BSI",
+    "float32": "32BF",
+    "float64": "64BF",
+}
+
+FileSignature = Tuple[str, int, int]
+
+
+def file_signature(path: Path) -> FileSignature:
+    """(path, mtime_ns, size): changes whenever the GeoTIFF is replaced"""
+    st = path.stat()
+    return str(path), st.st_mtime_ns, st.st_size
+
+
+@lru_cache(maxsize=64)
+def band_histogram(signature: FileSignature, band: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-value pixel counts and areas (m²) of an integer class band, read block by block
+    so memory stays bounded to one internal tile. Each block is counted per (row, value)
+    with one np.bincount, and its areas are the dot product of those row counts with the
+    grid's cached per-row pixel areas (pixel_area.py).
+    Cached by file signature: a replaced GeoTIFF gets a fresh histogram.
+    """
+    path = signature[0]
+    with rasterio.open(path) as src:
+        dtype = np.dtype(src.dtypes[band - 1])
+        if dtype.kind != "u" or dtype.itemsize > 2:
+            raise ValueError(f"{Path(path).name}: local engine supports 8/16-bit unsigned class rasters, got {dtype}")
+        size = 256 if dtype.itemsize == 1 else 65536
+        counts = np.zeros(size, dtype=np.int64)
+        areas = np.zeros(size, dtype=np.float64)
+        row_areas = dataset_row_areas(src)
+        all_values = np.arange(size)
+        index = np.zeros(size, dtype=np.intp)
+
+        for _, window in src.block_windows(band):
+            block = src.read(band, window=window)
+            if size == 256:
+                present, codes = all_values, block
+            else:
+                # 16-bit: dense indices of the values present keep the (row, value) table small
+                present = np.flatnonzero(np.bincount(block.ravel(), minlength=size))
+                index[present] = np.arange(present.size)
+                codes = index[block]
+            rows = np.arange(block.shape[0], dtype=np.intp)[:, None] * present.size
+            row_counts = np.bincount(
+                (rows + codes).ravel(), minlength=block.shape[0] * present.size
+            ).reshape(block.shape[0], present.size)
+            counts[present] += row_counts.sum(axis=0)
+            areas[present] += class_areas(row_counts, row_areas[window.row_off:window.row_off + window.height])
+
+        if src.nodata is not None and 0 <= src.nodata < size:
+            counts[int(src.nodata)] = 0
+            areas[int(src.nodata)] = 0.0
+    return counts, areas
+
+
+def class_code_bound(signatures: Sequence[FileSignature], band: int = 1) -> int:
+    """
+    K = highest class value in any of the rasters + 1. Nodata is left out of the
+    histograms, so only (from, to) pairs of valid pixels are guaranteed to fit K * K bins.
+    """
+    return 1 + max(int(np.nonzero(band_histogram(sig, band)[0])[0].max(initial=0)) for sig in signatures)
+
+
+@lru_cache(maxsize=64)
+def transition_histogram(
+    from_signature: FileSignature, to_signature: FileSignature, band: int = 1
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (K, K) pixel counts and areas (m²) of value transitions between two aligned
+    integer class rasters (K: class_code_bound). Each block pair is folded into a
+    single np.bincount over `from * K + to`; a nodata pixel in either year is not
+    a transition. Cached per signature pair.
+    """
+    k = class_code_bound((from_signature, to_signature), band)
+    with rasterio.open(from_signature[0]) as src_from, rasterio.open(to_signature[0]) as src_to:
+        if (src_from.shape, src_from.crs) != (src_to.shape, src_to.crs) or not src_from.transform.almost_equals(src_to.transform):
+            raise ValueError(
+                f"{Path(from_signature[0]).name} and {Path(to_signature[0]).name} are not on the same pixel grid"
+            )
+        counts = np.zeros(k * k, dtype=np.int64)
+        areas = np.zeros(k * k, dtype=np.float64)
+        row_areas = dataset_row_areas(src_from)
+
+        for _, window in src_from.block_windows(band):
+            a = src_from.read(band, window=window)
+            b = src_to.read(band, window=window)
+            valid = np.ones(a.shape, dtype=bool)
+            for values, nodata in ((a, src_from.nodata), (b, src_to.nodata)):
+                if nodata is not None:
+                    valid &= values != nodata
+            pairs = a[valid].astype(np.int64) * k + b[valid]
+            weights = np.broadcast_to(
+                row_areas[window.row_off:window.row_off + window.height, None], a.shape
+            )[valid]
+            counts += np.bincount(pairs, minlength=k * k)
+            areas += np.bincount(pairs, weights=weights, minlength=k * k)
+    return counts.reshape(k, k), areas.reshape(k, k)
+
+
+def band_stats(counts: np.ndarray) -> Dict[str, Optional[float]]:
+    """min/max/mean/population stddev of a band from its value histogram"""
+    total = counts.sum()
+    if total == 0:
+        return {"min": None, "max": None, "mean": None, "std": None}
+    values = np.nonzero(counts)[0]
+    levels = np.arange(counts.size, dtype=np.float64)
+    mean = float((levels * counts).sum() / total)
+    var = float((((levels - mean) ** 2) * counts).sum() / total)
+    return {"min": float(values[0]), "max": float(values[-1]), "mean": mean, "std": math.sqrt(var)}
+
+
+def envelope(bounds) -> Tuple[str, dict]:
+    """Bounds as WKT and GeoJSON polygons, vertex order matching PostGIS ST_Envelope"""
+    ring = [
+        [bounds.left, bounds.bottom],
+        [bounds.left, bounds.top],
+        [bounds.right, bounds.top],
+        [bounds.right, bounds.bottom],
+        [bounds.left, bounds.bottom],
+    ]
+    wkt = "POLYGON((" + ",".join(f"{x} {y}" for x, y in ring) + "))"
+    return wkt, {"type": "Polygon", "coordinates": [ring]}
+
+
+class LocalRasterEngine(RasterEngine):
+    """
+    Raster analytics computed in-process from the source GeoTIFFs (`RASTER_DIR`),
+    without a database. Years come from the trailing 4 digits of each file name.
+    Downsampled reads go to the COG copy in `cog_dir` (internal overviews) when it
+    is up to date; point queries index memory-mapped band copies in `array_dir`.
+    """
+
+    def __init__(self, raster_dir: Path, cog_dir: Optional[Path] = None, array_dir: Optional[Path] = None) -> None:
+        self.raster_dir = Path(raster_dir)
+        self.cog_dir = Path(cog_dir) if cog_dir else None
+        self.array_dir = Path(array_dir) if array_dir else self.raster_dir / "arrays"
+        self._lock = threading.Lock()
+        self._files: Dict[str, Path] = {}
+        self._scanned_mtime: Optional[int] = None
+
+    def files(self) -> Dict[str, Path]:
+        """year -> GeoTIFF path, rescanned when the directory changes"""
+        try:
+            mtime = self.raster_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if mtime != self._scanned_mtime:
+                files = {}
+                for path in sorted(self.raster_dir.glob("*.tif")):
+                    match = YEAR_SUFFIX.search(path.stem)
+                    if not match:
+                        continue
+                    if match.group(1) in files:
+                        logging.warning("Multiple GeoTIFFs for year %s, using %s", match.group(1), files[match.group(1)].name)
+                        continue
+                    files[match.group(1)] = path
+                self._files = files
+                self._scanned_mtime = mtime
+            return self._files
+
+    def path_for(self, year: str) -> Optional[Path]:
+        return self.files().get(str(year))
+
+    def read_path_for(self, year: str) -> Optional[Path]:
+        """The year's COG copy if it is up to date, else the source GeoTIFF"""
+        path = self.path_for(year)
+        if path is not None and self.cog_dir is not None:
+            cog = cog_path(self.cog_dir, path)
+            if is_fresh(path, cog):
+                return cog
+        return path
+
+    @staticmethod
+    def _dataset_name(path: Path) -> str:
+        # Same name seed_rasters_auto gives the PostGIS table
+        return path.stem.lower().replace("-", "_").replace(" ", "_")
+
+    def list_datasets(self) -> List[RasterDataset]:
+        datasets = []
+        for year, path in sorted(self.files().items()):
+            with rasterio.open(path) as src:
+                datasets.append(RasterDataset(
+                    year=year,
+                    name=self._dataset_name(path),
+                    tile_count=1,
+                    num_bands=src.count,
+                    srid=src.crs.to_epsg() if src.crs else None,
+                ))
+        return datasets
+
+    def dataset_version(self, year: str) -> Optional[str]:
+        path = self.path_for(year)
+        if path is None:
+            return None
+        _, mtime_ns, size = file_signature(path)
+        return f"{path.name}:{mtime_ns}:{size}"
+
+    def describe(self, year: str, include_bands: bool = True) -> Optional[RasterDataset]:
+        path = self.path_for(year)
+        if path is None:
+            return None
+        with rasterio.open(path) as src:
+            t = src.transform
+            grid = RasterGrid(
+                width=src.width,
+                height=src.height,
+                num_bands=src.count,
+                srid=(src.crs.to_epsg() or 0) if src.crs else 0,
+                upper_left_x=t.c,
+                upper_left_y=t.f,
+                scale_x=t.a,
+                scale_y=t.e,
+                skew_x=t.b,
+                skew_y=t.d,
+            )
+            dtypes, nodata, bounds = src.dtypes, src.nodata, src.bounds
+
+        bands = []
+        if include_bands:
+            signature = file_signature(path)
+            for band_num in range(1, grid.num_bands + 1):
+                stats = band_stats(band_histogram(signature, band_num)[0])
+                bands.append(RasterBand(
+                    band_number=band_num,
+                    pixel_type=PIXEL_TYPES.get(dtypes[band_num - 1], dtypes[band_num - 1]),
+                    nodata_value=nodata,
+                    min_value=stats["min"],
+                    max_value=stats["max"],
+                    mean_value=stats["mean"],
+                    std_dev=stats["std"],
+                ))
+
+        wkt, geojson = envelope(bounds)
+        return RasterDataset(
+            year=str(year),
+            name=self._dataset_name(path),
+            tile_count=1,
+            num_bands=grid.num_bands,
+            srid=grid.srid,
+            grid=grid,
+            bands=bands,
+            envelope_wkt=wkt,
+            envelope_geojson=geojson,
+        )
+
+    def class_histogram(self, year: str) -> Optional[ClassHistogram]:
+        path = self.path_for(year)
+        if path is None:
+            return None
+        counts, areas = band_histogram(file_signature(path), 1)
+        codes = np.nonzero(counts)[0]
+        return ClassHistogram(
+            year=str(year),
+            counts={int(c): int(counts[c]) for c in codes},
+            areas_m2={int(c): float(areas[c]) for c in codes},
+            dataset=self._dataset_name(path),
+        )
+
+    def class_histograms(self, years: Optional[List[str]] = None) -> Dict[str, ClassHistogram]:
+        return super().class_histograms(years if years is not None else sorted(self.files()))
+
+    def zonal_histograms(self, year: str, geometries: List[dict]) -> Optional[List[ZoneHistogram]]:
+        path = self.path_for(year)
+        if path is None:
+            return None
+        histograms = []
+        with rasterio.open(path) as src:
+            row_areas = dataset_row_areas(src)
+            reproject = src.crs is not None and src.crs != CRS.from_epsg(4326)
+            for zone, geometry in enumerate(geometries):
+                if reproject:
+                    geometry = transform_geom("EPSG:4326", src.crs, geometry)
+                # Only the window covering the zone is read, then masked to the polygon
+                try:
+                    window = geometry_window(src, [geometry]).round_offsets().round_lengths()
+                except WindowError:
+                    histograms.append(ZoneHistogram(zone=zone, counts={}))
+                    continue
+                values = src.read(1, window=window)
+                inside = geometry_mask(
+                    [geometry], out_shape=values.shape, transform=src.window_transform(window), invert=True
+                )
+                if src.nodata is not None:
+                    inside &= values != src.nodata
+                rows, zone_values = np.nonzero(inside)[0], values[inside]
+                codes = np.flatnonzero(np.bincount(zone_values))
+                index = np.zeros(codes[-1] + 1 if codes.size else 1, dtype=np.intp)
+                index[codes] = np.arange(codes.size)
+                row_counts = np.bincount(
+                    rows * codes.size + index[zone_values], minlength=values.shape[0] * codes.size
+                ).reshape(values.shape[0], codes.size)
+                areas = class_areas(row_counts, row_areas[window.row_off:window.row_off + window.height])
+                histograms.append(ZoneHistogram(
+                    zone=zone,
+                    counts={int(c): int(n) for c, n in zip(codes, row_counts.sum(axis=0))},
+                    areas_m2={int(c): float(a) for c, a in zip(codes, areas)},
+                ))
+        return histograms
+
+    def point_classes(self, lons: Sequence[float], lats: Sequence[float], years: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        lons, lats = np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+        files = self.files()
+        classes = {}
+        for year in (years if years is not None else sorted(files)):
+            path = files.get(str(year))
+            if path is None:
+                continue
+            with rasterio.open(path) as src:
+                transform, crs, nodata, height, width = src.transform, src.crs, src.nodata, src.height, src.width
+            xs, ys = lons, lats
+            if crs is not None and crs != CRS.from_epsg(4326):
+                xs, ys = (np.asarray(v) for v in warp_transform("EPSG:4326", crs, lons, lats))
+            # All points to pixel indices in one step, then one fancy-index into the memory map
+            inverse = ~transform
+            cols = np.floor(inverse.a * xs + inverse.b * ys + inverse.c).astype(np.int64)
+            rows = np.floor(inverse.d * xs + inverse.e * ys + inverse.f).astype(np.int64)
+            inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+            values = np.full(lons.shape, -1, dtype=np.int64)
+            values[inside] = band_array(file_signature(path), str(self.array_dir))[rows[inside], cols[inside]]
+            if nodata is not None:
+                values[inside & (values == nodata)] = -1
+            classes[str(year)] = values
+        return classes
+
+    def transition_matrix(self, from_year: str, to_year: str) -> Optional[TransitionMatrix]:
+        from_path, to_path = self.path_for(from_year), self.path_for(to_year)
+        if from_path is None or to_path is None:
+            return None
+        counts, areas = transition_histogram(file_signature(from_path), file_signature(to_path), 1)
+        codes = np.nonzero(counts.sum(axis=1) + counts.sum(axis=0))[0]
+        sub = np.ix_(codes, codes)
+        return TransitionMatrix(
+            from_year=str(from_year),
+            to_year=str(to_year),
+            classes=[int(c) for c in codes],
+            counts=counts[sub].tolist(),
+            areas_m2=areas[sub].tolist(),
+        )
+
+    def preview(self, year: str, max_size: int) -> Optional[RasterPreview]:
+        path = self.read_path_for(year)
+        if path is None:
+            return None
+        with rasterio.open(path) as src:
+            native = max(src.width, src.height)
+            factors = src.overviews(1)
+            factor = overview_factor(native, max_size, factors)
+            scale = max(1.0, native / max_size)
+            out_shape = (max(1, round(src.height / scale)), max(1, round(src.width / scale)))
+            nodata = src.nodata
+        # Open the chosen overview level directly instead of leaving the pick to GDAL
+        level = {"overview_level": factors.index(factor)} if factor in factors else {}
+        with rasterio.open(path, **level) as src:
+            values = src.read(1, out_shape=out_shape, resampling=Resampling.nearest)
+        return RasterPreview(year=str(year), values=values, nodata=nodata, overview_factor=factor)
@@ -0,0 +1,101 @@
+import math
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.errors import CRSError
+
+from app.domain.entities.raster import RasterGrid
+
+
+# WGS 84 ellipsoid
+WGS84_A = 6_378_137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+
+class GridSignature(NamedTuple):
+    """What the pixel areas of a raster's rows depend on (not its width or x origin)"""
+    upper_left_y: float
+    scale_x: float
+    scale_y: float
+    skew_x: float
+    skew_y: float
+    height: int
+    geographic: bool
+
+
+@lru_cache(maxsize=256)
+def is_geographic_srid(srid: Optional[int]) -> bool:
+    if not srid:
+        return False
+    try:
+        return CRS.from_epsg(int(srid)).is_geographic
+    except CRSError:
+        return False
+
+
+def _band_area_per_radian(lat_rad: np.ndarray) -> np.ndarray:
+    """
+    Area (m²) of the WGS 84 ellipsoid between the equator and `lat_rad`, per radian of
+    longitude (closed form of the authalic-latitude integral)
+    """
+    e = math.sqrt(WGS84_E2)
+    s = np.sin(lat_rad)
+    b2 = WGS84_A ** 2 * (1 - WGS84_E2)
+    return b2 / 2 * (s / (1 - WGS84_E2 * s ** 2) + np.arctanh(e * s) / e)
+
+
+def cell_areas(top_ys: np.ndarray, scale_x: float, scale_y: float, geographic: bool) -> np.ndarray:
+    """Area in m² of one pixel in rows whose top edges are at `top_ys` (north-up grids)"""
+    top_ys = np.asarray(top_ys, dtype=np.float64)
+    if not geographic:
+        return np.full(top_ys.shape, abs(scale_x * scale_y))
+    top = _band_area_per_radian(np.radians(top_ys))
+    bottom = _band_area_per_radian(np.radians(top_ys + scale_y))
+    return np.abs(top - bottom) * math.radians(abs(scale_x))
+
+
+@lru_cache(maxsize=64)
+def _row_areas(signature: GridSignature) -> np.ndarray:
+    if not signature.geographic:
+        area = abs(signature.scale_x * signature.scale_y - signature.skew_x * signature.skew_y)
+        areas = np.full(signature.height, area)
+    else:
+        edges = np.radians(signature.upper_left_y + np.arange(signature.height + 1) * signature.scale_y)
+        areas = np.abs(np.diff(_band_area_per_radian(edges))) * math.radians(abs(signature.scale_x))
+    areas.setflags(write=False)
+    return areas
+
+
+def row_pixel_areas(signature: GridSignature) -> np.ndarray:
+    """
+    Area in m² of one pixel in each raster row (read-only, cached per grid signature).
+    Geographic grids use the exact area of the lat/lon cell on the WGS 84 ellipsoid;
+    projected grids the constant cell area in map units.
+    """
+    return _row_areas(signature)
+
+
+def grid_signature(grid: RasterGrid) -> GridSignature:
+    return GridSignature(
+        grid.upper_left_y, grid.scale_x, grid.scale_y, grid.skew_x, grid.skew_y, grid.height,
+        is_geographic_srid(grid.srid),
+    )
+
+
+def transform_signature(transform, height: int, is_geographic: bool) -> GridSignature:
+    """Signature of a rasterio (affine) grid"""
+    return GridSignature(transform.f, transform.a, transform.e, transform.b, transform.d, height, is_geographic)
+
+
+def dataset_row_areas(src) -> np.ndarray:
+    """Per-row pixel areas of an open rasterio dataset"""
+    geographic = src.crs is not None and src.crs.is_geographic
+    return row_pixel_areas(transform_signature(src.transform, src.height, geographic))
+
+
+def class_areas(row_counts: np.ndarray, row_areas: np.ndarray) -> np.ndarray:
+    """Area per class (m²) from (rows, classes) pixel counts and the rows' pixel areas"""
+    return row_areas @ row_counts
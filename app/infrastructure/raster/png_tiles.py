@@ -0,0 +1,123 @@
+import hashlib
+import math
+import warnings
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.errors import NotGeoreferencedWarning
+from rasterio.io import MemoryFile
+from rasterio.warp import transform as warp_transform
+from rasterio.windows import Window
+
+from app.config.settings import settings
+from app.domain.value_objects.lulc_palette import LULC_COLORS, UNKNOWN_CLASS_COLOR
+from app.infrastructure.raster.local_engine import FileSignature
+
+
+TILE_SIZE = 256
+WEB_MERCATOR_HALF_WORLD = math.pi * 6378137.0
+
+
+def palette_lut(colors: Dict[int, str], unknown: str = UNKNOWN_CLASS_COLOR) -> np.ndarray:
+    """(256, 4) uint8 RGBA lookup table: class 0 transparent, unlisted codes `unknown`"""
+    def rgba(hex_color: str):
+        h = hex_color.lstrip("#")
+        return [int(h[i:i + 2], 16) for i in (0, 2, 4)] + [255]
+
+    lut = np.tile(np.array(rgba(unknown), dtype=np.uint8), (256, 1))
+    lut[0] = 0
+    for code, color in colors.items():
+        lut[code] = rgba(color)
+    return lut
+
+
+LULC_LUT = palette_lut(LULC_COLORS)
+# Changes whenever the palette does, so it can be part of tile ETags
+PALETTE_VERSION = hashlib.sha1(LULC_LUT.tobytes()).hexdigest()[:8]
+
+
+def tile_etag(signature: FileSignature, z: int, x: int, y: int) -> str:
+    """Strong ETag of a PNG tile, derived without rendering it"""
+    key = f"{signature}|{z}/{x}/{y}|{PALETTE_VERSION}".encode()
+    return '"' + hashlib.sha1(key).hexdigest() + '"'
+
+
+def _tile_pixel_centers_lonlat(z: int, x: int, y: int) -> Tuple[np.ndarray, np.ndarray]:
+    size = 2 * WEB_MERCATOR_HALF_WORLD / 2 ** z
+    offsets = (np.arange(TILE_SIZE) + 0.5) * size / TILE_SIZE
+    mx = -WEB_MERCATOR_HALF_WORLD + x * size + offsets
+    my = WEB_MERCATOR_HALF_WORLD - y * size - offsets
+    lon = np.degrees(mx / 6378137.0)
+    lat = np.degrees(2 * np.arctan(np.exp(my / 6378137.0)) - math.pi / 2)
+    return np.meshgrid(lon, lat)
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """(H, W, 4) uint8 RGBA array as PNG bytes"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", NotGeoreferencedWarning)
+        with MemoryFile() as mem:
+            with mem.open(driver="PNG", width=rgba.shape[1], height=rgba.shape[0], count=4, dtype="uint8") as dst:
+                dst.write(np.moveaxis(rgba, -1, 0))
+            return mem.read()
+
+
+def colorize(values: np.ndarray, nodata: Optional[float] = None, lut: np.ndarray = LULC_LUT) -> np.ndarray:
+    """Class codes -> (H, W, 4) RGBA through `lut`, nodata transparent"""
+    rgba = lut[values]
+    if nodata is not None:
+        rgba[values == nodata] = 0
+    return rgba
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def render_png_tile(path: str, z: int, x: int, y: int, lut: np.ndarray = LULC_LUT) -> bytes:
+    """
+    256px Web Mercator tile of an integer class GeoTIFF, colorized through `lut`.
+
+    Each output pixel center is mapped back to a source pixel (nearest neighbour);
+    only the source window under the tile is read, decimated by GDAL when it is
+    much larger than the tile; GDAL serves such reads from the internal overview
+    matching the output resolution, so pass the COG copy where there is one.
+    Tiles outside the raster are fully transparent.
+    """
+    lon, lat = _tile_pixel_centers_lonlat(z, x, y)
+    with rasterio.open(path) as src:
+        if src.crs is not None and src.crs.to_epsg() != 4326:
+            xs, ys = warp_transform("EPSG:4326", src.crs, lon.ravel(), lat.ravel())
+            xs, ys = np.asarray(xs).reshape(lon.shape), np.asarray(ys).reshape(lat.shape)
+        else:
+            xs, ys = lon, lat
+        cols, rows = ~src.transform * (xs, ys)
+        cols, rows = np.floor(cols).astype(np.int64), np.floor(rows).astype(np.int64)
+        inside = (cols >= 0) & (cols < src.width) & (rows >= 0) & (rows < src.height)
+        if not inside.any():
+            return EMPTY_TILE
+
+        row_off, col_off = int(rows[inside].min()), int(cols[inside].min())
+        win_h, win_w = int(rows[inside].max()) - row_off + 1, int(cols[inside].max()) - col_off + 1
+        out_h, out_w = min(win_h, 2 * TILE_SIZE), min(win_w, 2 * TILE_SIZE)
+        data = src.read(
+            1,
+            window=Window(col_off, row_off, win_w, win_h),
+            out_shape=(out_h, out_w),
+            resampling=Resampling.nearest,
+        )
+        nodata = src.nodata
+
+    ri = np.clip((rows - row_off) * out_h // win_h, 0, out_h - 1)
+    ci = np.clip((cols - col_off) * out_w // win_w, 0, out_w - 1)
+    rgba = colorize(data[ri, ci], nodata, lut)
+    rgba[~inside] = 0
+    return encode_png(rgba)
+
+
+@lru_cache(maxsize=settings.PNG_TILE_CACHE_SIZE)
+def cached_png_tile(signature: FileSignature, z: int, x: int, y: int) -> bytes:
+    """LRU of rendered tiles, keyed by file signature so a replaced GeoTIFF re-renders"""
+    return render_png_tile(signature[0], z, x, y)
@@ -0,0 +1,357 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+from rasterio.enums import Resampling
+from rasterio.io import MemoryFile
+
+from app.application.ports.raster_engine import RasterEngine
+from app.domain.entities.raster import RasterBand, RasterDataset, RasterGrid, ClassHistogram, ZoneHistogram, TransitionMatrix, RasterPreview
+from app.infrastructure.db.postgis_pool import PostgisConnectionPool, get_postgis_pool
+from app.infrastructure.raster.catalog import RasterCatalog, RasterCatalogEntry, raster_catalog
+from app.infrastructure.raster.cog import overview_factor
+from app.infrastructure.raster.histograms import (
+    HISTOGRAM_TABLE,
+    compute_histogram,
+    ensure_histogram_table,
+    load_histogram,
+    load_histograms,
+    zone_class_areas,
+)
+
+
+# Year pairs whose transition matrix is kept in memory
+TRANSITION_CACHE_SIZE = 64
+
+
+class PostgisRasterEngine(RasterEngine):
+    """Raster analytics computed in PostGIS over the tables imported by `seed_rasters_auto`"""
+
+    def __init__(self, pool: Optional[PostgisConnectionPool] = None, catalog: RasterCatalog = raster_catalog) -> None:
+        self._pool = pool
+        self.catalog = catalog
+        self._transitions: "OrderedDict[tuple, TransitionMatrix]" = OrderedDict()
+        self._transitions_lock = threading.Lock()
+
+    @property
+    def pool(self) -> PostgisConnectionPool:
+        return self._pool or get_postgis_pool()
+
+    def list_datasets(self) -> List[RasterDataset]:
+        with self.pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            datasets = []
+            for entry in sorted(self.catalog.entries(conn).values(), key=lambda e: e.year):
+                cur.execute(f"SELECT COUNT(*) as tile_count FROM {entry.raster_table};")
+                datasets.append(RasterDataset(
+                    year=entry.year,
+                    name=entry.raster_table,
+                    tile_count=cur.fetchone()["tile_count"],
+                    # Band count and SRID come from the raster_columns constraints
+                    num_bands=entry.num_bands,
+                    srid=entry.srid,
+                ))
+            return datasets
+
+    def dataset_version(self, year: str) -> Optional[str]:
+        with self.pool.connection() as conn:
+            entry = self.catalog.get(conn, year)
+            return None if entry is None else f"{entry.raster_table}:{entry.checksum}"
+
+    def describe(self, year: str, include_bands: bool = True) -> Optional[RasterDataset]:
+        with self.pool.connection() as conn:
+            entry = self.catalog.get(conn, year)
+            if entry is None:
+                return None
+            table = entry.raster_table
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute(f"SELECT COUNT(*) as tile_count FROM {table};")
+            tile_count = cur.fetchone()["tile_count"]
+
+            cur.execute(f"""
+                SELECT (md).width, (md).height, (md).numbands, (md).srid,
+                       (md).upperleftx, (md).upperlefty,
+                       (md).scalex, (md).scaley, (md).skewx, (md).skewy,
+                       envelope_wkt, envelope_geojson
+                FROM (
+                    SELECT ST_MetaData(rast) AS md,
+                           ST_AsText(ST_Envelope(rast)) AS envelope_wkt,
+                           ST_AsGeoJSON(ST_Envelope(rast)) AS envelope_geojson
+                    FROM {table}
+                    LIMIT 1
+                ) foo;
+            """)
+            md = cur.fetchone()
+            if not md:
+                raise RuntimeError(f"Could not retrieve metadata for {table}")
+
+            grid = RasterGrid(
+                width=md["width"],
+                height=md["height"],
+                num_bands=md["numbands"],
+                srid=md["srid"],
+                upper_left_x=md["upperleftx"],
+                upper_left_y=md["upperlefty"],
+                scale_x=md["scalex"],
+                scale_y=md["scaley"],
+                skew_x=md["skewx"],
+                skew_y=md["skewy"],
+            )
+
+            # Band statistics over the whole raster from its coarsest overview when there is
+            # one (a few hundred pixels wide); otherwise from the first tile only
+            stats_sql = f"ST_SummaryStats(rast, %(band)s) FROM {table} LIMIT 1"
+            if entry.overviews:
+                stats_sql = f"ST_SummaryStatsAgg(rast, %(band)s, true) FROM {entry.overviews[max(entry.overviews)]}"
+
+            bands = []
+            for band_num in range(1, grid.num_bands + 1 if include_bands else 1):
+                cur.execute(f"""
+                    SELECT
+                        (SELECT ST_BandPixelType(rast, %(band)s) FROM {table} LIMIT 1) as pixel_type,
+                        (SELECT ST_BandNoDataValue(rast, %(band)s) FROM {table} LIMIT 1) as nodata_value,
+                        (SELECT {stats_sql})::text as stats;
+                """, {"band": band_num})
+                band_row = cur.fetchone()
+                if band_row and band_row["stats"]:
+                    # (count, sum, mean, stddev, min, max)
+                    stats = [float(x.strip()) for x in band_row["stats"].strip("()").split(",")]
+                    bands.append(RasterBand(
+                        band_number=band_num,
+                        pixel_type=band_row["pixel_type"],
+                        nodata_value=band_row["nodata_value"],
+                        min_value=stats[4] if len(stats) > 4 else None,
+                        max_value=stats[5] if len(stats) > 5 else None,
+                        mean_value=stats[2] if len(stats) > 2 else None,
+                        std_dev=stats[3] if len(stats) > 3 else None,
+                    ))
+
+            return RasterDataset(
+                year=entry.year,
+                name=table,
+                tile_count=tile_count,
+                num_bands=grid.num_bands,
+                srid=grid.srid,
+                grid=grid,
+                bands=bands,
+                envelope_wkt=md["envelope_wkt"],
+                envelope_geojson=json.loads(md["envelope_geojson"]) if md["envelope_geojson"] else None,
+            )
+
+    def class_histogram(self, year: str) -> Optional[ClassHistogram]:
+        with self.pool.connection() as conn:
+            entry = self.catalog.get(conn, year)
+            if entry is None:
+                return None
+            rows = self._load_fresh_histogram(conn, entry)
+            if rows is not None:
+                return self._histogram_from_rows(entry, rows)
+            return self._store_histogram(conn, entry)
+
+    def class_histograms(self, years: Optional[List[str]] = None) -> Dict[str, ClassHistogram]:
+        with self.pool.connection() as conn:
+            entries = self.catalog.entries(conn)
+            wanted = [entries[str(y)] for y in (years if years is not None else sorted(entries)) if str(y) in entries]
+            # All stored histograms in one query; only missing or stale years are computed (and stored)
+            stored = load_histograms(
+                conn, {e.year: e.checksum for e in wanted if "class_histogram" in e.precomputed_tables}
+            )
+            return {
+                e.year: self._histogram_from_rows(e, stored[e.year]) if e.year in stored else self._store_histogram(conn, e)
+                for e in wanted
+            }
+
+    @staticmethod
+    def _histogram_from_rows(entry: RasterCatalogEntry, rows) -> ClassHistogram:
+        return ClassHistogram(
+            year=entry.year,
+            counts={int(r["class_code"]): int(r["pixel_count"]) for r in rows},
+            areas_m2={int(r["class_code"]): float(r["area_m2"]) for r in rows},
+            dataset=entry.raster_table,
+        )
+
+    def _store_histogram(self, conn, entry: RasterCatalogEntry) -> ClassHistogram:
+        """
+        Histogram missing or stale: compute it once (compute_histogram: per-row
+        ST_ValueCount, areas from the per-row pixel areas), store it and read it back,
+        so later requests load it instead of rescanning the raster. A transaction-level
+        advisory lock on the year makes concurrent requests wait for one computation.
+        """
+        ensure_histogram_table(conn)
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (f"{HISTOGRAM_TABLE}:{entry.year}",))
+        rows = load_histogram(conn, entry.year, entry.checksum)
+        if rows is None:
+            compute_histogram(conn, entry.year, entry.raster_table, entry.checksum)
+            rows = load_histogram(conn, entry.year, entry.checksum) or []
+        conn.commit()
+        return self._histogram_from_rows(entry, rows)
+
+    def zonal_histograms(self, year: str, geometries: List[dict]) -> Optional[List[ZoneHistogram]]:
+        with self.pool.connection() as conn:
+            entry = self.catalog.get(conn, year)
+            if entry is None:
+                return None
+            rows = zone_class_areas(
+                conn,
+                entry.raster_table,
+                """
+                SELECT z.zone, ST_Transform(ST_SetSRID(ST_GeomFromGeoJSON(z.geojson), 4326), %(srid)s) AS geom
+                FROM unnest(%(zones)s::int[], %(geojson)s::text[]) AS z(zone, geojson)
+                """,
+                {
+                    "srid": entry.srid,
+                    "zones": list(range(len(geometries))),
+                    "geojson": [json.dumps(g) for g in geometries],
+                },
+                entry.srid,
+            )
+
+        histograms = [ZoneHistogram(zone=i, counts={}) for i in range(len(geometries))]
+        for zone, code, count, area in rows:
+            histograms[zone].counts[code] = count
+            histograms[zone].areas_m2[code] = area
+        return histograms
+
+    def point_classes(self, lons: Sequence[float], lats: Sequence[float], years: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        with self.pool.connection() as conn:
+            entries = self.catalog.entries(conn)
+            wanted = [entries[str(y)] for y in (years if years is not None else sorted(entries)) if str(y) in entries]
+            classes = {e.year: np.full(len(lons), -1, dtype=np.int64) for e in wanted}
+            if not wanted or not len(lons):
+                return classes
+            # One statement for every year: the points are sent once as arrays and each
+            # year's table is probed through its tile index (rast && point)
+            per_year = sql.SQL(" UNION ALL ").join(
+                sql.SQL("""
+                    SELECT {year} AS year, p.i, ST_Value(r.rast, p.geom)
+                    FROM (SELECT i, ST_Transform(geom, {srid}) AS geom FROM points) p
+                    JOIN {table} r ON r.rast && p.geom AND ST_Intersects(r.rast, p.geom)
+                """).format(
+                    year=sql.Literal(e.year), srid=sql.Literal(e.srid), table=sql.Identifier(e.raster_table)
+                )
+                for e in wanted
+            )
+            cur = conn.cursor()
+            cur.execute(sql.SQL("""
+                WITH points AS (
+                    SELECT p.i - 1 AS i, ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326) AS geom
+                    FROM unnest(%s::float8[], %s::float8[]) WITH ORDINALITY AS p(lon, lat, i)
+                )
+                {per_year};
+            """).format(per_year=per_year), ([float(v) for v in lons], [float(v) for v in lats]))
+            for year, i, value in cur.fetchall():
+                if value is not None:
+                    classes[year][i] = int(value)
+            return classes
+
+    def transition_matrix(self, from_year: str, to_year: str) -> Optional[TransitionMatrix]:
+        with self.pool.connection() as conn:
+            from_entry, to_entry = self.catalog.get(conn, from_year), self.catalog.get(conn, to_year)
+            if from_entry is None or to_entry is None:
+                return None
+
+            # Keyed by import checksum so a re-imported year is recomputed
+            key = (from_entry.raster_table, from_entry.checksum, to_entry.raster_table, to_entry.checksum)
+            with self._transitions_lock:
+                if key in self._transitions:
+                    self._transitions.move_to_end(key)
+                    return self._transitions[key]
+
+            k = 1 + max(
+                max(self._class_codes(conn, entry), default=0) for entry in (from_entry, to_entry)
+            )
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            # Tiles of aligned rasters share extents, so pair them with the same-bbox operator
+            # and fold each pixel pair into one code (from * K + to) counted by ST_ValueCount
+            cur.execute(f"""
+                SELECT (vc).value::bigint AS pair,
+                       SUM((vc).count) AS pixel_count,
+                       SUM((vc).count * pixel_area) AS area_m2
+                FROM (
+                    SELECT ST_ValueCount(
+                               ST_MapAlgebra(a.rast, 1, b.rast, 1, '[rast1] * {k} + [rast2]', '32BUI', 'INTERSECTION')
+                           ) AS vc,
+                           ST_Area(ST_Envelope(a.rast)::geography) / (ST_Width(a.rast) * ST_Height(a.rast)) AS pixel_area
+                    FROM {from_entry.raster_table} a
+                    JOIN {to_entry.raster_table} b ON a.rast ~= b.rast
+                ) pairs
+                GROUP BY 1;
+            """)
+            rows = cur.fetchall()
+            if not rows:
+                raise ValueError(
+                    f"{from_entry.raster_table} and {to_entry.raster_table} have no aligned tiles"
+                )
+
+            counts, areas = {}, {}
+            for r in rows:
+                cell = divmod(int(r["pair"]), k)
+                counts[cell] = int(r["pixel_count"])
+                areas[cell] = float(r["area_m2"])
+            classes = sorted({c for cell in counts for c in cell})
+            matrix = TransitionMatrix(
+                from_year=from_entry.year,
+                to_year=to_entry.year,
+                classes=classes,
+                counts=[[counts.get((i, j), 0) for j in classes] for i in classes],
+                areas_m2=[[areas.get((i, j), 0.0) for j in classes] for i in classes],
+            )
+
+        with self._transitions_lock:
+            self._transitions[key] = matrix
+            while len(self._transitions) > TRANSITION_CACHE_SIZE:
+                self._transitions.popitem(last=False)
+        return matrix
+
+    def preview(self, year: str, max_size: int) -> Optional[RasterPreview]:
+        with self.pool.connection() as conn:
+            entry = self.catalog.get(conn, year)
+            if entry is None:
+                return None
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(f"""
+                SELECT (SELECT ABS(ST_ScaleX(rast)) FROM {entry.raster_table} LIMIT 1) AS scale_x,
+                       (SELECT ABS(ST_ScaleY(rast)) FROM {entry.raster_table} LIMIT 1) AS scale_y,
+                       ST_XMax(ext) - ST_XMin(ext) AS span_x,
+                       ST_YMax(ext) - ST_YMin(ext) AS span_y
+                FROM (SELECT ST_Extent(ST_Envelope(rast)) AS ext FROM {entry.raster_table}) e;
+            """)
+            md = cur.fetchone()
+            if not md or md["scale_x"] is None:
+                return None
+            width, height = round(md["span_x"] / md["scale_x"]), round(md["span_y"] / md["scale_y"])
+
+            # Read the coarsest overview table that still covers the requested size
+            factor = overview_factor(max(width, height), max_size, entry.overviews)
+            table = entry.overviews.get(factor, entry.raster_table)
+            cur.execute(f"SELECT ST_AsGDALRaster(ST_Union(rast), 'GTiff') AS tif FROM {table};")
+            tif = cur.fetchone()["tif"]
+
+        scale = max(1.0, max(width, height) / max_size)
+        out_shape = (max(1, round(height / scale)), max(1, round(width / scale)))
+        with MemoryFile(bytes(tif)) as mem, mem.open() as src:
+            values = src.read(1, out_shape=out_shape, resampling=Resampling.nearest)
+            nodata = src.nodata
+        return RasterPreview(year=entry.year, values=np.asarray(values), nodata=nodata, overview_factor=factor)
+
+    def _class_codes(self, conn, entry: RasterCatalogEntry) -> List[int]:
+        rows = self._load_fresh_histogram(conn, entry)
+        if rows is not None:
+            return [int(r["class_code"]) for r in rows]
+        cur = conn.cursor()
+        cur.execute(f"SELECT MAX((ST_SummaryStats(rast)).max) FROM {entry.raster_table};")
+        top = cur.fetchone()[0]
+        return [] if top is None else [int(top)]
+
+    @staticmethod
+    def _load_fresh_histogram(conn, entry: RasterCatalogEntry):
+        """Stored class histogram for the entry's raster, or None if missing or stale"""
+        if "class_histogram" not in entry.precomputed_tables:
+            return None
+        return load_histogram(conn, entry.year, entry.checksum)
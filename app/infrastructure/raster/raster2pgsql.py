@@ -0,0 +1,112 @@
+import os
+import re
+import subprocess
+import tempfile
+from typing import Iterator, List, Optional
+
+
+RASTER2PGSQL_PATH = os.getenv("RASTER2PGSQL_PATH", "raster2pgsql")
+
+COPY_FROM_STDIN = re.compile(r"^COPY\s.+\sFROM\s+stdin\s*;$", re.IGNORECASE | re.DOTALL)
+# Transaction control is ours: the whole load (and the caller's bookkeeping) is one transaction
+SKIPPED_STATEMENTS = {"BEGIN;", "END;", "COMMIT;"}
+
+# Bytes handed to COPY per read (raster2pgsql writes one hex-encoded tile per line)
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class _CopyData:
+    """File-like view of the data lines of one COPY block, up to the `\\.` terminator"""
+
+    def __init__(self, lines: Iterator[bytes]) -> None:
+        self._lines = lines
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._done = False
+
+    def _fill(self, size: int) -> None:
+        while not self._done and (size < 0 or self._size < size):
+            line = next(self._lines, None)
+            if line is None:
+                raise RuntimeError("raster2pgsql output ended inside COPY data")
+            if line.rstrip(b"\r\n") == b"\\.":
+                self._done = True
+                break
+            self._chunks.append(line)
+            self._size += len(line)
+
+    def read(self, size: int = -1) -> bytes:
+        self._fill(size)
+        data = b"".join(self._chunks)
+        if 0 <= size < len(data):
+            data, rest = data[:size], data[size:]
+            self._chunks, self._size = [rest], len(rest)
+        else:
+            self._chunks, self._size = [], 0
+        return data
+
+    def drain(self) -> None:
+        """Skip to the end of the block (when COPY stopped reading early)"""
+        while not self._done:
+            self._chunks, self._size = [], 0
+            self._fill(COPY_BUFFER_SIZE)
+        self._chunks, self._size = [], 0
+
+
+def raster2pgsql_command(tif_path, table: str, srid: int = 4326, overview_factors=(), extra_args=()) -> List[str]:
+    """raster2pgsql arguments emitting COPY statements (-Y), GIST index, constraints, overviews"""
+    cmd = [RASTER2PGSQL_PATH, "-s", str(srid), "-I", "-C", "-M", "-Y"]
+    if overview_factors:
+        cmd += ["-l", ",".join(str(f) for f in overview_factors)]
+    cmd += list(extra_args) + [str(tif_path), table]
+    return cmd
+
+
+def load_raster2pgsql(conn, cmd: List[str], env: Optional[dict] = None) -> int:
+    """
+    Run raster2pgsql and execute its output on `conn` without psql: SQL statements go
+    through the cursor, COPY blocks are streamed to `copy_expert` as they are produced
+    (never held in memory). BEGIN/END are dropped and VACUUM ANALYZE becomes ANALYZE so
+    everything runs in the caller's transaction; nothing is committed here.
+    Returns the number of COPY blocks loaded.
+    """
+    # stderr to a file: a full stderr pipe would block raster2pgsql while we read stdout
+    errors = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors, env=env)
+    copies = 0
+    try:
+        lines = iter(proc.stdout.readline, b"")
+        statement: List[str] = []
+        with conn.cursor() as cur:
+            for raw in lines:
+                line = raw.decode("utf-8").strip()
+                if not line and not statement:
+                    continue
+                statement.append(line)
+                if not line.endswith(";"):
+                    continue
+                sql = "\n".join(statement)
+                statement = []
+
+                if sql.upper() in SKIPPED_STATEMENTS:
+                    continue
+                if COPY_FROM_STDIN.match(sql):
+                    data = _CopyData(lines)
+                    cur.copy_expert(sql, data, size=COPY_BUFFER_SIZE)
+                    data.drain()
+                    copies += 1
+                    continue
+                if sql.upper().startswith("VACUUM ANALYZE"):
+                    sql = sql[len("VACUUM "):]
+                cur.execute(sql)
+
+        if proc.wait() != 0:
+            errors.seek(0)
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=errors.read().decode("utf-8", "replace"))
+        return copies
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        errors.close()
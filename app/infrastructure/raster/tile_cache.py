@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from app.config.settings import settings
+
+
+class TileCache:
+    """
+    On-disk XYZ tile cache: `{root}/{layer}/{year}/{version}/{z}/{x}/{y}.{ext}`.
+
+    `version` identifies the source data (e.g. the import checksum), so a re-imported
+    year is served from a fresh directory; the first tile written under a new version
+    removes the year's superseded version directories.
+    Writes go through a temp file + rename, so concurrent readers never see a partial
+    tile. A cache without a root is disabled.
+    """
+
+    def __init__(self, root: Optional[Path]) -> None:
+        self.root = Path(root) if root else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def path(self, layer: str, year: str, version: str, z: int, x: int, y: int, ext: str) -> Path:
+        return self.root / layer / str(year) / version / str(z) / str(x) / f"{y}.{ext}"
+
+    def get(self, layer: str, year: str, version: str, z: int, x: int, y: int, ext: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        try:
+            return self.path(layer, year, version, z, x, y, ext).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, layer: str, year: str, version: str, z: int, x: int, y: int, ext: str, data: bytes) -> None:
+        if not self.enabled:
+            return
+        target = self.path(layer, year, version, z, x, y, ext)
+        version_dir = self.root / layer / str(year) / version
+        new_version = not version_dir.exists()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        if new_version:
+            self._prune(version_dir)
+
+    @staticmethod
+    def _prune(version_dir: Path) -> None:
+        """Remove the other version directories of the same layer and year"""
+        for old in version_dir.parent.iterdir():
+            if old != version_dir and old.is_dir():
+                shutil.rmtree(old, ignore_errors=True)
+
+
+tile_cache = TileCache(settings.TILE_CACHE_DIR or None)
@@ -0,0 +1,87 @@
+import threading
+from typing import Optional
+
+from app.infrastructure.raster.catalog import ALL_YEARS_TABLE
+
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+MVT_LAYER = "lulc_classes"
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+
+_index_ready = False
+_index_lock = threading.Lock()
+
+
+def ensure_tile_index(conn) -> None:
+    """
+    Tiles filter `lulc_classes_all_years` by year and tile bbox; without a GIST index
+    on geom every tile scans the whole table. Created once per process if missing.
+    """
+    global _index_ready
+    with _index_lock:
+        if _index_ready:
+            return
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {ALL_YEARS_TABLE}_geom_gist ON {ALL_YEARS_TABLE} USING GIST (geom);")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {ALL_YEARS_TABLE}_year_idx ON {ALL_YEARS_TABLE} (year);")
+        conn.commit()
+        _index_ready = True
+
+
+def simplify_tolerance(z: int) -> float:
+    """Half a screen pixel (256 px tiles) at zoom `z`, in degrees"""
+    return 360.0 / (512 * 2 ** z)
+
+
+def render_vector_tile(conn, source_table: str, z: int, x: int, y: int, year: Optional[str] = None) -> bytes:
+    """
+    One Mapbox Vector Tile (layer `lulc_classes`, attribute `code`) of the class polygons
+    in `source_table` (a year's `lulc_classes_{year}`, or `lulc_classes_all_years`
+    filtered by `year`). Each class multipolygon is cut to the buffered tile box before
+    it is simplified for the zoom level and quantized by ST_AsMVTGeom, so low zooms
+    stay cheap and high zooms keep full detail. Empty tiles are b"".
+    """
+    if year is not None:
+        ensure_tile_index(conn)
+    year_filter = "c.year::text = %(year)s AND" if year is not None else ""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            WITH bounds AS (
+                SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env,
+                       ST_Transform(
+                           ST_TileEnvelope(%(z)s, %(x)s, %(y)s, margin => %(margin)s), 4326
+                       ) AS env_4326
+            )
+            SELECT ST_AsMVT(tile, %(layer)s, %(extent)s, 'geom')
+            FROM (
+                SELECT c.class_code AS code,
+                       ST_AsMVTGeom(
+                           ST_Transform(
+                               ST_SimplifyPreserveTopology(ST_ClipByBox2D(c.geom, b.env_4326::box2d), %(tolerance)s),
+                               3857
+                           ),
+                           b.env, %(extent)s, %(buffer)s, true
+                       ) AS geom
+                FROM {source_table} c, bounds b
+                WHERE {year_filter} c.class_code <> 0
+                  AND c.geom && b.env_4326
+            ) tile
+            WHERE geom IS NOT NULL;
+            """,
+            {
+                "z": z,
+                "x": x,
+                "y": y,
+                "year": None if year is None else str(year),
+                "layer": MVT_LAYER,
+                "extent": MVT_EXTENT,
+                "buffer": MVT_BUFFER,
+                "margin": MVT_BUFFER / MVT_EXTENT,
+                "tolerance": simplify_tolerance(z),
+            },
+        )
+        data = cur.fetchone()[0]
+    conn.rollback()
+    return bytes(data) if data else b""
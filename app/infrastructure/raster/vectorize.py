@@ -0,0 +1,48 @@
+from app.infrastructure.raster.catalog import vector_table_name
+from app.infrastructure.raster.class_tiers import build_class_tiers
+
+
+def build_class_polygons(conn, year: str, raster_table: str, rebuild: bool = False) -> bool:
+    """
+    Polygonize `raster_table` into `lulc_classes_{year}` (one dissolved MultiPolygon
+    per class code).
+
+    Holds a transaction-level advisory lock on the year for the whole build, so
+    concurrent builders of the same year serialize and the later one finds the
+    table already there (unless `rebuild`). The polygons go into a staging table
+    that replaces the published one at commit, so readers never see a partial
+    table; its `lulc_class_tiers` rows are rebuilt in the same transaction.
+    Runs in the caller's transaction; returns False if nothing was built.
+    """
+    target = vector_table_name(year)
+    staging = f"{target}_build"
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (target,))
+
+        if not rebuild:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"public.{target}",))
+            if cur.fetchone()[0]:
+                return False
+
+        cur.execute(f"DROP TABLE IF EXISTS {staging};")
+        cur.execute(f"""
+            CREATE TABLE {staging} AS
+            WITH polys AS (
+              SELECT
+                (gv).val AS class_code,
+                ST_MakeValid(ST_Union((gv).geom))::geometry(MultiPolygon, 4326) AS geom
+              FROM (
+                SELECT ST_DumpAsPolygons(rast) AS gv
+                FROM {raster_table}
+              ) foo
+              GROUP BY (gv).val
+            )
+            SELECT class_code, geom
+            FROM polys
+            WHERE geom IS NOT NULL;
+        """)
+        cur.execute(f"DROP TABLE IF EXISTS {target};")
+        cur.execute(f"ALTER TABLE {staging} RENAME TO {target};")
+    # Pre-simplified copies per zoom tier, published in the same transaction
+    build_class_tiers(conn, year, target)
+    return True
@@ -0,0 +1,111 @@
+import datetime
+from itertools import islice
+from typing import Iterator, Optional, Tuple
+
+from psycopg2 import sql
+
+from app.infrastructure.shapefiles.reader import ShapefileReader
+
+
+# Features encoded per chunk handed to COPY
+COPY_BATCH_SIZE = 5000
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value) -> str:
+    """One field in COPY text format"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _FeatureCopyData:
+    """File-like COPY input: `batch_size` features encoded per read, tab-separated, hex EWKB last"""
+
+    def __init__(self, records: Iterator[Tuple[list, Optional[bytes]]], batch_size: int) -> None:
+        self._records = records
+        self._batch_size = batch_size
+        self.rows = 0
+
+    def read(self, size: int = -1) -> bytes:
+        lines = []
+        for values, ewkb in islice(self._records, self._batch_size):
+            fields = [_copy_value(v) for v in values]
+            fields.append(ewkb.hex() if ewkb is not None else "\\N")
+            lines.append("\t".join(fields))
+        self.rows += len(lines)
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+
+def already_imported(cur, filename: str, checksum: str) -> bool:
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM shapefile_imports WHERE filename = %s AND checksum = %s);",
+        (filename, checksum),
+    )
+    return cur.fetchone()[0]
+
+
+def import_shapefile(
+    conn,
+    reader: ShapefileReader,
+    table_name: str,
+    checksum: str,
+    batch_size: int = COPY_BATCH_SIZE,
+) -> Optional[int]:
+    """
+    Load one shapefile into public.<table_name> in a single transaction: the table is
+    (re)created, features are streamed through COPY (geometry as hex EWKB), the GIST index
+    is built once the rows are in, and the `shapefile_imports` ledger row is written
+    before the commit, so a failure leaves neither a partial table nor a ledger entry.
+    Returns the number of features loaded, or None if this checksum was already imported.
+    """
+    filename = reader.shp_path.name
+    table = sql.Identifier(table_name)
+    columns = [sql.Identifier(f.name) for f in reader.fields]
+    try:
+        with conn.cursor() as cur:
+            # Serialize concurrent seeders on the same table, then re-check under the lock
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (f"shapefile_import:{table_name}",))
+            if already_imported(cur, filename, checksum):
+                conn.rollback()
+                return None
+
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS public.{} CASCADE;").format(table))
+            definitions = [sql.SQL("id SERIAL PRIMARY KEY")]
+            definitions += [sql.SQL("{} {}").format(col, sql.SQL(f.pg_type)) for col, f in zip(columns, reader.fields)]
+            definitions.append(
+                sql.SQL("geom geometry({}, {})").format(sql.SQL(reader.pg_geometry_type), sql.Literal(reader.srid))
+            )
+            cur.execute(sql.SQL("CREATE TABLE public.{} ({});").format(table, sql.SQL(", ").join(definitions)))
+
+            data = _FeatureCopyData(reader.records(), batch_size)
+            copy = sql.SQL("COPY public.{} ({}) FROM STDIN").format(
+                table, sql.SQL(", ").join(columns + [sql.Identifier("geom")])
+            )
+            cur.copy_expert(copy.as_string(conn), data)
+
+            # Index after the load: one sort instead of per-row index maintenance
+            cur.execute(
+                sql.SQL("CREATE INDEX {} ON public.{} USING GIST (geom);").format(
+                    sql.Identifier(f"{table_name}_geom_idx"), table
+                )
+            )
+            cur.execute(sql.SQL("ANALYZE public.{};").format(table))
+            cur.execute(
+                """
+                INSERT INTO shapefile_imports (filename, checksum, layer_name, table_name)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (filename, checksum) DO NOTHING;
+                """,
+                (filename, checksum, reader.shp_path.stem, table_name),
+            )
+        conn.commit()
+        return data.rows
+    except BaseException:
+        conn.rollback()
+        raise
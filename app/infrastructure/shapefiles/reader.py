@@ -0,0 +1,279 @@
+import datetime
+import re
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+# Shape type -> (PostGIS geometry type after PROMOTE_TO_MULTI, has Z)
+SHAPE_TYPES = {
+    1: ("Point", False), 11: ("Point", True), 21: ("Point", False),
+    3: ("MultiLineString", False), 13: ("MultiLineString", True), 23: ("MultiLineString", False),
+    5: ("MultiPolygon", False), 15: ("MultiPolygon", True), 25: ("MultiPolygon", False),
+    8: ("MultiPoint", False), 18: ("MultiPoint", True), 28: ("MultiPoint", False),
+}
+
+WKB_TYPES = {"Point": 1, "LineString": 2, "Polygon": 3, "MultiPoint": 4, "MultiLineString": 5, "MultiPolygon": 6}
+EWKB_Z = 0x80000000
+EWKB_SRID = 0x20000000
+
+
+@dataclass(frozen=True)
+class DbfField:
+    name: str         # laundered column name (lower case, [a-z0-9_])
+    type: str         # dBASE type code: C, N, F, L, D, ...
+    length: int
+    decimals: int
+
+    @property
+    def pg_type(self) -> str:
+        if self.type in ("N", "F"):
+            if self.decimals > 0 or self.type == "F":
+                return "double precision"
+            return "integer" if self.length < 10 else "bigint"
+        if self.type == "L":
+            return "boolean"
+        if self.type == "D":
+            return "date"
+        return "text"
+
+
+def launder(name: str) -> str:
+    """Column name the way ogr2ogr's PostgreSQL driver launders it"""
+    cleaned = re.sub(r"[^a-z0-9_]", "_", name.strip().lower())
+    return cleaned or "field"
+
+
+def srid_from_prj(prj_path: Path) -> Optional[int]:
+    """EPSG code of the common .prj definitions (WGS 84 geographic, WGS 84 / UTM); None otherwise"""
+    try:
+        wkt = prj_path.read_text(encoding="utf-8", errors="replace")
+    except FileNotFoundError:
+        return None
+    authority = re.search(r'AUTHORITY\["EPSG",\s*"?(\d+)"?\]\s*\]\s*$', wkt)
+    if authority:
+        return int(authority.group(1))
+    if wkt.startswith("GEOGCS") and "WGS_1984" in wkt:
+        return 4326
+    utm = re.search(r"WGS_1984_UTM_Zone_(\d+)([NS])", wkt)
+    if utm:
+        return (32600 if utm.group(2) == "N" else 32700) + int(utm.group(1))
+    return None
+
+
+def _signed_area(ring: Sequence[Tuple[float, ...]]) -> float:
+    return sum(x0 * y1 - x1 * y0 for (x0, y0, *_), (x1, y1, *_) in zip(ring, ring[1:])) / 2.0
+
+
+def _in_ring(point: Tuple[float, ...], ring: Sequence[Tuple[float, ...]]) -> bool:
+    """Even-odd ray casting test of a point against a closed ring"""
+    x, y = point[0], point[1]
+    inside = False
+    for (x0, y0, *_), (x1, y1, *_) in zip(ring, ring[1:]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def _assign_holes(rings: List[list]) -> List[List[list]]:
+    """
+    Group shapefile rings into polygons: clockwise rings are outer rings and each
+    counter-clockwise ring becomes a hole of the smallest outer ring containing its
+    first vertex, since the spec does not require holes to follow their outer ring.
+    A hole inside no outer ring is kept as a polygon of its own.
+    """
+    outers, holes = [], []
+    for ring in rings:
+        (outers if _signed_area(ring) < 0 else holes).append(ring)
+    polygons = [[ring] for ring in outers]
+    bounds = [
+        (min(x for x, *_ in r), min(y for _, y, *_ in r), max(x for x, *_ in r), max(y for _, y, *_ in r))
+        for r in outers
+    ]
+    by_size = sorted(range(len(outers)), key=lambda i: abs(_signed_area(outers[i])))
+    for hole in holes:
+        x, y = hole[0][0], hole[0][1]
+        owner = next(
+            (
+                i for i in by_size
+                if bounds[i][0] <= x <= bounds[i][2] and bounds[i][1] <= y <= bounds[i][3] and _in_ring(hole[0], outers[i])
+            ),
+            None,
+        )
+        if owner is None:
+            polygons.append([hole])
+        else:
+            polygons[owner].append(hole)
+    return polygons
+
+
+class _Ewkb:
+    """Little-endian EWKB writer"""
+
+    def __init__(self, has_z: bool) -> None:
+        self.has_z = has_z
+        self.parts: List[bytes] = []
+        self._coord = struct.Struct("<ddd" if has_z else "<dd")
+
+    def header(self, geom_type: str, srid: Optional[int] = None) -> None:
+        code = WKB_TYPES[geom_type] | (EWKB_Z if self.has_z else 0) | (EWKB_SRID if srid is not None else 0)
+        self.parts.append(struct.pack("<BI", 1, code))
+        if srid is not None:
+            self.parts.append(struct.pack("<I", srid))
+
+    def count(self, n: int) -> None:
+        self.parts.append(struct.pack("<I", n))
+
+    def points(self, coords: Sequence[Tuple[float, ...]]) -> None:
+        pack = self._coord.pack
+        self.parts.append(b"".join(pack(*c) for c in coords))
+
+
+class ShapefileReader:
+    """
+    Streaming reader of a shapefile set (.shp + .dbf): yields one (attributes, EWKB) pair
+    per record, reading both files sequentially, so memory does not grow with the layer.
+    Polygons and lines are promoted to multi geometries; polygon rings are grouped by
+    orientation (clockwise outer rings, counter-clockwise holes, as the format specifies).
+    """
+
+    def __init__(self, shp_path: Path, srid: int, encoding: Optional[str] = None) -> None:
+        self.shp_path = Path(shp_path)
+        self.dbf_path = self.shp_path.with_suffix(".dbf")
+        self.srid = srid
+        cpg = self.shp_path.with_suffix(".cpg")
+        self.encoding = encoding or (cpg.read_text().strip() if cpg.exists() else "utf-8")
+
+        with open(self.shp_path, "rb") as f:
+            header = f.read(100)
+        if struct.unpack(">i", header[:4])[0] != 9994:
+            raise ValueError(f"{self.shp_path} is not a shapefile")
+        shape_type = struct.unpack("<i", header[32:36])[0]
+        if shape_type not in SHAPE_TYPES:
+            raise ValueError(f"Unsupported shape type {shape_type} in {self.shp_path}")
+        self.geometry_type, self.has_z = SHAPE_TYPES[shape_type]
+
+        with open(self.dbf_path, "rb") as f:
+            head = f.read(32)
+            self.num_records, self._header_len, self._record_len = struct.unpack("<IHH", head[4:12])
+            descriptors = f.read(self._header_len - 32)
+        fields, seen = [], set()
+        for i in range(0, len(descriptors) - 1, 32):
+            desc = descriptors[i:i + 32]
+            if desc[0] == 0x0D:
+                break
+            name = launder(desc[:11].split(b"\x00")[0].decode("ascii", "replace"))
+            while name in seen or name in ("id", "geom"):
+                name += "_"
+            seen.add(name)
+            fields.append(DbfField(name, chr(desc[11]), desc[16], desc[17]))
+        self.fields = fields
+
+    @property
+    def pg_geometry_type(self) -> str:
+        return f"{self.geometry_type}Z" if self.has_z else self.geometry_type
+
+    def _dbf_records(self) -> Iterator[Optional[list]]:
+        with open(self.dbf_path, "rb") as f:
+            f.seek(self._header_len)
+            for _ in range(self.num_records):
+                raw = f.read(self._record_len)
+                if len(raw) < self._record_len:
+                    return
+                if raw[:1] == b"*":
+                    yield None  # deleted record: the .shp still holds its shape
+                    continue
+                values, pos = [], 1
+                for fld in self.fields:
+                    values.append(self._value(fld, raw[pos:pos + fld.length]))
+                    pos += fld.length
+                yield values
+
+    def _value(self, fld: DbfField, raw: bytes):
+        text = raw.decode(self.encoding, "replace").strip().strip("\x00")
+        if not text or set(text) <= {"*", "?"}:
+            return None
+        try:
+            if fld.type in ("N", "F"):
+                return float(text) if fld.pg_type == "double precision" else int(float(text))
+            if fld.type == "L":
+                return text.upper() in ("Y", "T")
+            if fld.type == "D":
+                return datetime.date(int(text[:4]), int(text[4:6]), int(text[6:8]))
+        except ValueError:
+            return None
+        return text
+
+    def _geometry(self, content: bytes) -> Optional[bytes]:
+        shape_type = struct.unpack("<i", content[:4])[0]
+        if shape_type == 0:
+            return None
+        w = _Ewkb(self.has_z)
+
+        if self.geometry_type == "Point":
+            x, y = struct.unpack("<dd", content[4:20])
+            coords = (x, y, struct.unpack("<d", content[20:28])[0]) if self.has_z else (x, y)
+            w.header("Point", self.srid)
+            w.points([coords])
+            return b"".join(w.parts)
+
+        if self.geometry_type == "MultiPoint":
+            n = struct.unpack("<i", content[36:40])[0]
+            xy = struct.unpack(f"<{2 * n}d", content[40:40 + 16 * n])
+            coords = list(zip(xy[0::2], xy[1::2]))
+            if self.has_z:
+                z_at = 40 + 16 * n + 16
+                coords = [c + (z,) for c, z in zip(coords, struct.unpack(f"<{n}d", content[z_at:z_at + 8 * n]))]
+            w.header("MultiPoint", self.srid)
+            w.count(n)
+            for c in coords:
+                w.header("Point")
+                w.points([c])
+            return b"".join(w.parts)
+
+        num_parts, num_points = struct.unpack("<ii", content[36:44])
+        starts = list(struct.unpack(f"<{num_parts}i", content[44:44 + 4 * num_parts])) + [num_points]
+        xy_at = 44 + 4 * num_parts
+        xy = struct.unpack(f"<{2 * num_points}d", content[xy_at:xy_at + 16 * num_points])
+        coords = list(zip(xy[0::2], xy[1::2]))
+        if self.has_z:
+            z_at = xy_at + 16 * num_points + 16
+            coords = [c + (z,) for c, z in zip(coords, struct.unpack(f"<{num_points}d", content[z_at:z_at + 8 * num_points]))]
+        parts = [coords[starts[i]:starts[i + 1]] for i in range(num_parts)]
+
+        if self.geometry_type == "MultiLineString":
+            w.header("MultiLineString", self.srid)
+            w.count(len(parts))
+            for part in parts:
+                w.header("LineString")
+                w.count(len(part))
+                w.points(part)
+            return b"".join(w.parts)
+
+        polygons = _assign_holes([ring for ring in parts if len(ring) >= 4])
+        w.header("MultiPolygon", self.srid)
+        w.count(len(polygons))
+        for rings in polygons:
+            w.header("Polygon")
+            w.count(len(rings))
+            for ring in rings:
+                w.count(len(ring))
+                w.points(ring)
+        return b"".join(w.parts)
+
+    def records(self) -> Iterator[Tuple[list, Optional[bytes]]]:
+        """(attribute values in `fields` order, EWKB or None) per live record"""
+        attributes = self._dbf_records()
+        with open(self.shp_path, "rb") as shp:
+            shp.seek(100)
+            while True:
+                head = shp.read(8)
+                if len(head) < 8:
+                    return
+                _, words = struct.unpack(">ii", head)
+                content = shp.read(2 * words)
+                values = next(attributes, [None] * len(self.fields))
+                if values is None:
+                    continue
+                yield values, self._geometry(content)
@@ -3,18 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.interfaces.api.routers import auth, users, admin, raster
 from app.infrastructure.db.session import engine
 from app.infrastructure.db.models import Base
+from app.infrastructure.db.postgis_pool import close_postgis_pool
 
-from fastapi.staticfiles import StaticFiles
+from app.config.settings import settings
+from app.interfaces.static_assets import AssetStaticFiles
 from pathlib import Path
 
 
 app = FastAPI()
 
-# Resolve absolute path to project root and geojson directory to avoid CWD issues
-PROJECT_ROOT = Path(__file__).resolve().parents[3]
-GEOJSON_DIR = PROJECT_ROOT / "geojson_exports"
-
-app.mount("/geojson", StaticFiles(directory=str(GEOJSON_DIR), check_dir=True), name="geojson")
+# Absolute path (settings.GEOJSON_DIR) to avoid CWD issues
+GEOJSON_DIR = Path(settings.GEOJSON_DIR)
 
 #Base.metadata.create_all(bind=engine)
 
@@ -24,8 +23,9 @@ app.add_middleware(
     allow_origin_regex=r"^https?://(localhost|127\.0\.0\.1)(:\d+)?$",
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type", "X-Requested-With"],
-    expose_headers=["WWW-Authenticate", "Authorization"],
+    allow_headers=["Authorization", "Content-Type", "X-Requested-With", "Range", "If-None-Match"],
+    # Range reads of FlatGeobuf / GeoParquet exports need the range headers exposed
+    expose_headers=["WWW-Authenticate", "Authorization", "Accept-Ranges", "Content-Range", "Content-Length", "ETag"],
 )
 
 
@@ -35,6 +35,11 @@ app.include_router(admin.router)
 app.include_router(raster.router)
 
 
+@app.on_event("shutdown")
+def shutdown_postgis_pool():
+    close_postgis_pool()
+
+
 @app.get("/")
 async def root():
     return {
@@ -51,6 +56,7 @@ async def root():
                 "delete_user": "/admin/users/{user_id}",
                 "update_role": "/admin/users/{user_id}/role",
             },
+            "geojson_manifest": "/geojson/manifest.json",
             "raster_endpoints": {
                 "get_all_rasters": "/raster/",
                 "get_raster_summary": "/raster/summary",
@@ -86,14 +92,7 @@ async def geojson_debug():
 
 
 
-# Add no-cache headers for static geojson to avoid stale data
-from starlette.requests import Request
-
-@app.middleware("http")
-async def no_cache_geojson(request: Request, call_next):
-    response = await call_next(request)
-    if request.url.path.startswith("/geojson/"):
-        response.headers["Cache-Control"] = "no-store"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
-    return response
\ No newline at end of file
+# Mounted after the routes above so /geojson/_debug is not shadowed by the static files.
+# Exported files are content-hashed (see manifest.json) and cached as immutable;
+# plain names and the manifest are revalidated (app/interfaces/static_assets.py).
+app.mount("/geojson", AssetStaticFiles(directory=str(GEOJSON_DIR), check_dir=True), name="geojson")
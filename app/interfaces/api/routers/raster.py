@@ -3,14 +3,34 @@ from app.config.settings import settings
 import json
 import base64
 from fastapi import Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import Response, JSONResponse
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Request
 from fastapi.responses import StreamingResponse
 from typing import List, Optional
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from psycopg2 import sql
 import logging
+from pathlib import Path
+from app.infrastructure.db.postgis_pool import get_postgis_pool
+from app.infrastructure.db.geojson_stream import stream_feature_collection
+from app.domain.entities.raster import TransitionMatrix
+from app.infrastructure.raster.catalog import raster_catalog, RasterCatalogEntry, ALL_YEARS_TABLE
+from app.infrastructure.raster.boundary_stats import boundary_layers, computed_sources, load_boundary_histograms, stale_pairs
+from app.infrastructure.jobs.handlers import BOUNDARY_HISTOGRAMS, VECTORIZE_CLASSES
+from app.infrastructure.jobs.queue import enqueue_job, get_job, list_jobs
+from app.infrastructure.raster.change_cube import load_change_cube, is_stale
+from app.infrastructure.raster.local_engine import file_signature
+from app.infrastructure.raster.pixel_area import grid_signature, row_pixel_areas
+from app.infrastructure.raster.png_tiles import cached_png_tile, colorize, encode_png, tile_etag
+from app.infrastructure.raster.tile_cache import tile_cache
+from app.infrastructure.raster.vector_tiles import MVT_MEDIA_TYPE, render_vector_tile, simplify_tolerance
+from app.infrastructure.raster.class_tiers import TIERS_TABLE, has_tiers, snap_zoom
+from app.infrastructure.cache.response_cache import response_cache
+from app.interfaces.http_cache import etag_matches, serve_cached, version_etag
+from app.interfaces.dependencies import get_postgis_executor, get_raster_engine, get_geotiff_source
+from app.interfaces.postgis_executor import METADATA, ANALYTICS, VECTORIZE
 from app.interfaces.schemas.raster import (
     RasterInfo, 
     RasterSummaryResponse,
@@ -19,6 +39,17 @@ from app.interfaces.schemas.raster import (
     RasterSpatialExtent,
     AnalysisRequest,
     AnalysisResponse,
+    MultiYearAnalysisResponse,
+    ZonalStatsRequest,
+    ZonalStatsResponse,
+    ZoneStats,
+    BoundaryClassArea,
+    BoundaryYearStatus,
+    BoundaryClassAreasResponse,
+    PointClass,
+    PointQueryResponse,
+    PointBatchRequest,
+    PointBatchResponse,
     ClassPixelCount,
     FileAnalysisResponse,
     FileClassCount,
@@ -26,8 +57,12 @@ from app.interfaces.schemas.raster import (
     DBClassCount,
     AvailableYearsResponse,
     RasterOverlayResponse,
-    
-    
+    ClassTransition,
+    TransitionMatrixResponse,
+    ChangeCubeResponse,
+    FirstChangeBucket,
+    ChangeCountBucket,
+    JobResponse,
 )
 import numpy as np
 import rasterio
@@ -36,44 +71,90 @@ from rasterio.io import MemoryFile
 router = APIRouter(prefix="/raster", tags=["raster"])
 
 
+def _get_catalog_entry(conn, year: str) -> RasterCatalogEntry:
+    """Resolve a year to its tables via the cached raster catalog, or 404"""
+    entry = raster_catalog.get(conn, year)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No raster table found for year {year}")
+    return entry
 
-def get_postgres_connection():
-    """Get direct PostgreSQL connection for PostGIS queries"""
+
+async def _serve_cached_year(
+    request: Request, endpoint: str, year: str, engine, db, compute, response_version: Optional[str] = None
+):
+    """
+    Per-year response through the response cache, versioned by the engine's dataset version
+    plus `response_version`, bumped when the body's format changes so old cached bodies are not served
+    """
+    version = await db.call(METADATA, engine.dataset_version, year)
+    if version is None:
+        # Unknown year: let the handler produce its own 404
+        return await compute()
+    if response_version:
+        version = f"{version}:{response_version}"
+    return await serve_cached(request, endpoint, year, version, compute)
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """Streaming response that closes its source stream however the response ends (done, client gone, error)"""
+
+    def __init__(self, content, source, **kwargs) -> None:
+        super().__init__(content, **kwargs)
+        self._source = source
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._source.aclose()
+
+
+async def _stream_geojson(db, query, params, headers: Optional[dict] = None) -> StreamingResponse:
+    """FeatureCollection streamed batch by batch from a server-side cursor (see stream_feature_collection)"""
+    chunks = db.stream(VECTORIZE, stream_feature_collection, query, params)
     try:
-        conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            database=settings.POSTGRES_DB
-        )
-        return conn
+        # First chunk before the 200 goes out: connection / SQL errors still get a status code
+        first = await chunks.__anext__()
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating GeoJSON: {str(e)}")
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    # The executor slot is only released once `chunks` is closed
+    return _ClosingStreamingResponse(body(), chunks, media_type="application/geo+json", headers=headers)
+
+
+@router.get("/pool/stats")
+async def get_pool_stats(db=Depends(get_postgis_executor)):
+    """
+    Occupancy and wait metrics of the shared PostGIS connection pool
+    and of the per-endpoint-class query limiters
+    """
+    return {
+        "pool": get_postgis_pool().stats(),
+        "limiters": db.stats(),
+        "response_cache": response_cache.stats(),
+    }
 
 
 @router.get("/summary", response_model=RasterSummaryResponse)
-async def get_raster_summary():
+async def get_raster_summary(engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
     """
     Get a summary of all raster datasets
     """
-    conn = None
+    return await db.call(METADATA, _raster_summary, engine)
+
+
+def _raster_summary(engine):
     try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Find all raster tables
-        cur.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND (table_name LIKE '%islamabad%' OR table_name LIKE '%lulc%')
-            AND table_name NOT IN ('raster_columns', 'raster_overviews')
-            ORDER BY table_name;
-        """)
-        tables = [row['table_name'] for row in cur.fetchall()]
+        datasets = engine.list_datasets()
         
-        if not tables:
+        if not datasets:
             return RasterSummaryResponse(
                 total_datasets=0,
                 years_covered=[],
@@ -81,42 +162,16 @@ async def get_raster_summary():
                 total_tiles=0
             )
         
-        years_covered = []
-        total_tiles = 0
-        band_counts = []
-        srids = []
-        
-        for table in tables:
-            year = table.split('_')[-1]
-            years_covered.append(year)
-            
-            # Get tile count
-            cur.execute(f"SELECT COUNT(*) as tile_count FROM {table};")
-            tile_count = cur.fetchone()['tile_count']
-            total_tiles += tile_count
-            
-            # Get band count and SRID
-            cur.execute(f"""
-                SELECT 
-                    ST_NumBands(rast) as num_bands,
-                    ST_SRID(rast) as srid
-                FROM {table} 
-                LIMIT 1;
-            """)
-            
-            metadata = cur.fetchone()
-            if metadata:
-                band_counts.append(metadata['num_bands'])
-                srids.append(metadata['srid'])
+        years_covered = [d.year for d in datasets]
+        total_tiles = sum(d.tile_count for d in datasets)
+        band_counts = [d.num_bands for d in datasets if d.num_bands is not None]
+        srids = [d.srid for d in datasets if d.srid is not None]
         
         # Check data consistency
         data_consistency = len(set(band_counts)) <= 1 and len(set(srids)) <= 1
         
-        # Check NDVI capability
-        ndvi_capable = all(band_count >= 2 for band_count in band_counts) if band_counts else False
-        
         return RasterSummaryResponse(
-            total_datasets=len(tables),
+            total_datasets=len(datasets),
             years_covered=sorted(years_covered),
             data_consistency=data_consistency,
             total_tiles=total_tiles
@@ -124,89 +179,423 @@ async def get_raster_summary():
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching raster summary: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+
+
+
+@router.get("/transitions", response_model=TransitionMatrixResponse)
+async def get_transitions(
+    from_year: str = Query(..., alias="from"),
+    to_year: str = Query(..., alias="to"),
+    engine=Depends(get_raster_engine),
+    db=Depends(get_postgis_executor),
+):
+    """
+    Class x class transition matrix between two years (pixel counts and km²),
+    computed pixel by pixel over the aligned rasters and cached per year pair.
+    """
+    return await db.call(ANALYTICS, _transitions, engine, from_year, to_year)
+
+
+def _transitions(engine, from_year: str, to_year: str):
+    try:
+        matrix = engine.transition_matrix(from_year, to_year)
+        if matrix is None:
+            raise HTTPException(status_code=404, detail=f"No raster table found for year {from_year} or {to_year}")
+        return _transition_response(matrix)
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing transitions {from_year} -> {to_year}: {str(e)}")
+
+
+def _transition_response(matrix: TransitionMatrix) -> TransitionMatrixResponse:
+    area_km2 = [[round(a / 1e6, 6) for a in row] for row in matrix.areas_m2]
+    transitions = sorted(
+        (
+            ClassTransition(
+                from_class=src,
+                to_class=dst,
+                pixel_count=matrix.counts[i][j],
+                area_km2=area_km2[i][j],
+            )
+            for i, src in enumerate(matrix.classes)
+            for j, dst in enumerate(matrix.classes)
+            if matrix.counts[i][j]
+        ),
+        key=lambda t: t.pixel_count,
+        reverse=True,
+    )
+    changed = [t for t in transitions if t.from_class != t.to_class]
+
+    return TransitionMatrixResponse(
+        from_year=matrix.from_year,
+        to_year=matrix.to_year,
+        classes=matrix.classes,
+        pixel_counts=matrix.counts,
+        area_km2=area_km2,
+        transitions=transitions,
+        changed_pixels=sum(t.pixel_count for t in changed),
+        changed_area_km2=round(sum(t.area_km2 for t in changed), 6),
+    )
+
+
+@router.get("/change-cube", response_model=ChangeCubeResponse)
+async def get_change_cube(db=Depends(get_postgis_executor)):
+    """
+    Every consecutive-year transition matrix plus first-change-year and
+    number-of-changes distributions, as persisted by scripts/build_change_cube.py.
+    """
+    return await db.call(METADATA, _change_cube)
+
+
+def _change_cube():
+    try:
+        cube = load_change_cube(Path(settings.CHANGE_CUBE_DIR))
+        if cube is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Change cube not built yet; run scripts/build_change_cube.py",
+            )
+        files = get_geotiff_source().files()
+        paths = {y: files[y] for y in cube.years if y in files}
+
+        return ChangeCubeResponse(
+            years=cube.years,
+            built_at=cube.built_at,
+            stale=len(paths) != len(cube.years) or is_stale(cube, paths),
+            pairs=[_transition_response(m) for m in cube.transitions],
+            first_change_year=[
+                FirstChangeBucket(
+                    year=str(year) if year else None,
+                    pixel_count=count,
+                    area_km2=round(cube.first_change_areas_m2.get(year, 0.0) / 1e6, 6),
+                )
+                for year, count in sorted(cube.first_change_counts.items())
+            ],
+            change_count=[
+                ChangeCountBucket(
+                    changes=n,
+                    pixel_count=count,
+                    area_km2=round(cube.change_count_areas_m2.get(n, 0.0) / 1e6, 6),
+                )
+                for n, count in sorted(cube.change_count_counts.items())
+            ],
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading change cube: {str(e)}")
+
+
+@router.get("/jobs", response_model=List[JobResponse])
+async def list_raster_jobs(
+    kind: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db=Depends(get_postgis_executor),
+):
+    """Most recent background jobs, newest first"""
+    return await db.run(METADATA, _list_jobs, kind, status, limit)
+
+
+def _list_jobs(conn, kind: Optional[str], status: Optional[str], limit: int):
+    try:
+        return [JobResponse(**job) for job in list_jobs(conn, kind, status, limit)]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error listing jobs: {str(e)}")
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_raster_job(job_id: int, db=Depends(get_postgis_executor)):
+    """Status of one background job (see the Location header of 202 responses)"""
+    return await db.run(METADATA, _get_job, job_id)
+
+
+def _get_job(conn, job_id: int):
+    try:
+        job = get_job(conn, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return JobResponse(**job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching job {job_id}: {str(e)}")
+
+
+@router.get("/query/point", response_model=PointQueryResponse)
+async def query_point(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    year: Optional[List[str]] = Query(None, description="Only these years (repeatable)"),
+    engine=Depends(get_raster_engine),
+    db=Depends(get_postgis_executor),
+):
+    """Class of the pixel under (lon, lat) in every year"""
+    classes = await db.call(METADATA, _point_classes, engine, [lon], [lat], year)
+    return PointQueryResponse(
+        lon=lon,
+        lat=lat,
+        classes=[
+            PointClass(
+                year=y,
+                class_code=codes[0],
+                label=CLASS_LABELS.get(codes[0], f"Class {codes[0]}") if codes[0] is not None else None,
+            )
+            for y, codes in classes.items()
+        ],
+    )
+
+
+@router.post("/query/points", response_model=PointBatchResponse)
+async def query_points(body: PointBatchRequest, engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
+    """
+    Class under each of many [lon, lat] points for every (or the given) year. Points
+    become pixel indices in one vectorized step and each year is read with a single
+    fancy-index into its memory-mapped band (one ST_Value query for all years in PostGIS).
+    """
+    if not body.points:
+        raise HTTPException(status_code=400, detail="No points given")
+    if len(body.points) > settings.POINT_QUERY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.POINT_QUERY_MAX_POINTS} points per request")
+    if any(len(p) != 2 for p in body.points):
+        raise HTTPException(status_code=400, detail="Each point must be [lon, lat]")
+    lons, lats = np.array(body.points, dtype=np.float64).T
+    if np.any(np.abs(lons) > 180) or np.any(np.abs(lats) > 90):
+        raise HTTPException(status_code=400, detail="Coordinates must be lon/lat in EPSG:4326")
+
+    classes = await db.call(ANALYTICS, _point_classes, engine, lons, lats, body.years)
+    present = {c for codes in classes.values() for c in codes if c is not None}
+    return PointBatchResponse(
+        count=len(body.points),
+        years=list(classes),
+        classes=classes,
+        labels={c: CLASS_LABELS.get(c, f"Class {c}") for c in sorted(present)},
+    )
+
+
+def _point_classes(engine, lons, lats, years: Optional[List[str]]) -> dict:
+    """year -> class code per point (None where -1: outside the raster or nodata)"""
+    try:
+        values = engine.point_classes(lons, lats, years)
+        if years and not values:
+            raise HTTPException(status_code=404, detail=f"No raster table found for years {', '.join(years)}")
+        return {y: [None if v < 0 else v for v in codes.tolist()] for y, codes in sorted(values.items())}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying points: {str(e)}")
+
+
+@router.get("/boundaries/{layer}/class-areas", response_model=BoundaryClassAreasResponse)
+async def get_boundary_class_areas(
+    layer: str,
+    year: Optional[List[str]] = Query(None, description="Only these years (repeatable)"),
+    feature_id: Optional[List[int]] = Query(None, description="Only these features (repeatable)"),
+    db=Depends(get_postgis_executor),
+):
+    """
+    Precomputed class areas per feature of an imported boundary layer (shapefile table)
+    and raster year. Pairs whose shapefile or raster changed since they were computed
+    are flagged stale and queued for recomputation; 202 while nothing is computed yet.
+    """
+    return await db.run(METADATA, _boundary_class_areas, layer, year, feature_id)
+
+
+def _boundary_class_areas(conn, layer: str, years: Optional[List[str]], feature_ids: Optional[List[int]]):
+    try:
+        layers = boundary_layers(conn)
+        if layer not in layers:
+            raise HTTPException(status_code=404, detail=f"No imported boundary layer {layer}")
+
+        entries = raster_catalog.entries(conn)
+        stale = {entry.year for _, entry in stale_pairs(conn, entries, {layer: layers[layer]}, years)}
+        job = None
+        if stale:
+            job = enqueue_job(conn, BOUNDARY_HISTOGRAMS, layer)
+            conn.commit()
+
+        sources = computed_sources(conn, layer)
+        statuses = [
+            BoundaryYearStatus(
+                year=y,
+                computed_at=sources.get((layer, y), {}).get("computed_at"),
+                features=sources.get((layer, y), {}).get("features", 0),
+                stale=y in stale,
+            )
+            for y in sorted(entries) if not years or y in years
+        ]
+        if job is not None and not any((layer, s.year) in sources for s in statuses):
+            return JSONResponse(
+                status_code=202,
+                headers={"Retry-After": str(settings.JOB_RETRY_AFTER), "Location": f"/raster/jobs/{job['id']}"},
+                content={
+                    "detail": f"Class areas of {layer} are being computed",
+                    "job": jsonable_encoder(JobResponse(**job)),
+                },
+            )
+
+        rows = [
+            BoundaryClassArea(
+                feature_id=r["feature_id"],
+                year=r["year"],
+                class_code=r["class_code"],
+                label=CLASS_LABELS.get(r["class_code"], f"Class {r['class_code']}"),
+                pixel_count=r["pixel_count"],
+                area_m2=r["area_m2"],
+                area_km2=r["area_m2"] / 1e6,
+            )
+            for r in load_boundary_histograms(conn, layer, years, feature_ids)
+        ]
+        return BoundaryClassAreasResponse(
+            layer=layer,
+            shapefile_checksum=layers[layer],
+            years=statuses,
+            rows=rows,
+            job=JobResponse(**job) if job is not None else None,
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching class areas of {layer}: {str(e)}")
+
+
+@router.post("/analysis", response_model=MultiYearAnalysisResponse)
+async def analyse_years(body: AnalysisRequest, engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
+    """
+    Vegetation / built-up areas of many years at once, with change percentages against
+    `reference_year`. Every year's class histogram is read in one batch (a single query
+    over the stored histograms in PostGIS), never per year.
+    """
+    return await db.call(ANALYTICS, _analyse_years, engine, body)
+
+
+def _area_units(area_m2: float) -> dict:
+    return {"m2": area_m2, "km2": area_m2 / 1e6, "hectares": area_m2 / 1e4}
+
+
+def _change_percentage(value: float, reference: Optional[float]) -> Optional[float]:
+    if not reference:
+        return None
+    return round((value - reference) / reference * 100, 2)
+
+
+def _analyse_years(engine, body: AnalysisRequest) -> MultiYearAnalysisResponse:
+    try:
+        years = list(dict.fromkeys(body.years or ([body.year] if body.year else [])))
+        wanted = years + [body.reference_year] if body.reference_year and years else years
+        histograms = engine.class_histograms(wanted or None)
+        if not years:
+            years = sorted(histograms)
+        if body.reference_year and body.reference_year not in histograms:
+            raise HTTPException(status_code=404, detail=f"No raster table found for reference year {body.reference_year}")
+
+        veg_codes, builtup_codes = set(body.veg_codes), set(body.builtup_codes)
+
+        def totals(histogram):
+            veg = sum(a for code, a in histogram.areas_m2.items() if code in veg_codes)
+            builtup = sum(a for code, a in histogram.areas_m2.items() if code in builtup_codes)
+            return veg, builtup
+
+        reference_veg = reference_builtup = None
+        if body.reference_year:
+            reference_veg, reference_builtup = totals(histograms[body.reference_year])
+
+        results = []
+        for year in years:
+            histogram = histograms.get(year)
+            if histogram is None:
+                continue
+            veg_m2, builtup_m2 = totals(histogram)
+            total_pixels = histogram.total_pixels
+            total_area_m2 = sum(histogram.areas_m2.values())
+            results.append(AnalysisResponse(
+                year=year,
+                table_name=histogram.dataset or "",
+                total_pixels=total_pixels,
+                pixel_size_m2=total_area_m2 / total_pixels if total_pixels else 0.0,
+                class_breakdown=[
+                    ClassPixelCount(
+                        class_code=code,
+                        pixel_count=count,
+                        area_m2=histogram.areas_m2.get(code, 0.0),
+                        area_km2=histogram.areas_m2.get(code, 0.0) / 1e6,
+                        area_hectares=histogram.areas_m2.get(code, 0.0) / 1e4,
+                    )
+                    for code, count in sorted(histogram.counts.items())
+                ],
+                vegetation_total=_area_units(veg_m2),
+                builtup_total=_area_units(builtup_m2),
+                total_area_m2=total_area_m2,
+                total_area_km2=total_area_m2 / 1e6,
+                total_area_hectares=total_area_m2 / 1e4,
+                reference_year=body.reference_year,
+                vegetation_change_percentage=_change_percentage(veg_m2, reference_veg),
+                builtup_change_percentage=_change_percentage(builtup_m2, reference_builtup),
+            ))
+
+        return MultiYearAnalysisResponse(
+            reference_year=body.reference_year,
+            veg_codes=body.veg_codes,
+            builtup_codes=body.builtup_codes,
+            results=results,
+            missing_years=[y for y in years if y not in histograms],
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analysing years: {str(e)}")
 
 
 @router.get("/{year}/class-counts", response_model=DBClassCountsResponse)
-async def get_class_counts(year: str):
+async def get_class_counts(request: Request, year: str, engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
     """
-    Given a year, dynamically fetch raster table from Postgres/PostGIS,
+    Given a year, dynamically fetch the raster from the configured engine,
     return raw raster metadata, pixel counts per class code,
     and unmapped values (if any).
     Nothing is hardcoded.
     """
+    return await _serve_cached_year(
+        request, "class-counts", year, engine, db,
+        lambda: db.call(ANALYTICS, _class_counts, engine, year),
+    )
+
+
+def _class_counts(engine, year: str):
 
-    conn = None
     try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        # 1. Find raster table by year
-        cur.execute(
-            """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-              AND table_name LIKE %s
-            ORDER BY table_name;
-            """,
-            (f"%{year}",),
-        )
-        table_row = cur.fetchone()
-        if not table_row:
+        # 1. Raster grid for the year (raw metadata)
+        dataset = engine.describe(year, include_bands=False)
+        if dataset is None:
             raise HTTPException(status_code=404, detail=f"No raster table found for year {year}")
-        table = table_row["table_name"]
+        grid = dataset.grid
+        meta = {"width": grid.width, "height": grid.height, "srid": grid.srid, "bands": grid.num_bands}
+        total_pixels = int(grid.width * grid.height)
 
-        # 2. Get raster dimensions (raw metadata)
-        cur.execute(
-            f"""
-            SELECT ST_Width(rast) AS width,
-                   ST_Height(rast) AS height,
-                   ST_SRID(rast) AS srid,
-                   ST_NumBands(rast) AS bands
+        # 2. Pixel counts by class code (precomputed histogram where available)
+        histogram = engine.class_histogram(year)
 
-            FROM {table}
-            LIMIT 1;
-            """
-        )
-        meta = cur.fetchone()
-        if not meta:
-            raise HTTPException(status_code=500, detail=f"Could not retrieve raster metadata for {table}")
-        total_pixels = int(meta["width"] * meta["height"])
-
-        # 3. Compute pixel counts by class code
-        cur.execute(
-            f"""
-            WITH value_counts AS (
-                SELECT (ST_ValueCount(rast)).*
-                FROM {table}
-            )
-            SELECT value AS class_code, SUM(count) AS pixel_count
-            FROM value_counts
-            WHERE value IS NOT NULL
-            GROUP BY value
-            ORDER BY value;
-            """
-        )
-        rows = cur.fetchall()
-
-        # 4. Build response with class codes only (no hardcoded labels)
+        # 3. Build response with class codes only (no hardcoded labels)
         class_counts = [
             DBClassCount(
-                value=int(r["class_code"]),
-                label=str(r["class_code"]),
-                pixel_count=int(r["pixel_count"]),
-                percentage=round((int(r["pixel_count"]) / total_pixels) * 100, 2)  # 👈 comma fixed
+                value=code,
+                label=str(code),
+                pixel_count=count,
+                percentage=round((count / total_pixels) * 100, 2)
             )
-            for r in rows if r["class_code"] is not None
+            for code, count in sorted(histogram.counts.items())
         ]
 
 
         return DBClassCountsResponse(
             year=year,
-            table_name=table,
+            table_name=dataset.name,
             total_pixels=total_pixels,
             raster_metadata=meta,   # extra raw metadata included
             class_counts=class_counts,
@@ -217,120 +606,68 @@ async def get_class_counts(year: str):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error computing class counts for year {year}: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+
 
 
 
 @router.get("/{year}", response_model=RasterInfo)
-async def get_raster_by_year(year: str):
+async def get_raster_by_year(request: Request, year: str, engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
     """
     Get detailed information about a specific raster dataset by year
     """
-    conn = None
+    return await _serve_cached_year(
+        request, "raster", year, engine, db,
+        lambda: db.call(METADATA, _raster_by_year, engine, year),
+    )
+
+
+def _raster_by_year(engine, year: str):
     try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Find the table for the given year
-        cur.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name LIKE %s
-            ORDER BY table_name;
-        """, (f"%{year}",))
-        
-        table_row = cur.fetchone()
-        if not table_row:
+        dataset = engine.describe(year)
+        if dataset is None:
             raise HTTPException(status_code=404, detail=f"No raster data found for year {year}")
-        
-        table = table_row['table_name']
-        
-        # Get basic table info
-        cur.execute(f"SELECT COUNT(*) as tile_count FROM {table};")
-        tile_count = cur.fetchone()['tile_count']
-        
-        # Get raster metadata using ST_MetaData
-        cur.execute(f"""
-            SELECT (md).width, (md).height, (md).numbands, (md).srid,
-                   (md).upperleftx, (md).upperlefty,
-                   (md).scalex, (md).scaley, (md).skewx, (md).skewy
-            FROM (
-                SELECT ST_MetaData(rast) AS md
-                FROM {table}
-                LIMIT 1
-            ) foo;
-        """)
-        
-        metadata_row = cur.fetchone()
-        if not metadata_row:
-            raise HTTPException(status_code=500, detail=f"Could not retrieve metadata for {table}")
+        grid = dataset.grid
             
         # Map to RasterMetadata (pixel_width/height derived from scalex/scaley)
         metadata = RasterMetadata(
-            width=metadata_row['width'],
-            height=metadata_row['height'],
-            num_bands=metadata_row['numbands'],
-            srid=metadata_row['srid'],
-            upper_left_x=metadata_row['upperleftx'],
-            upper_left_y=metadata_row['upperlefty'],
-            scale_x=metadata_row['scalex'],
-            scale_y=metadata_row['scaley'],
-            skew_x=metadata_row['skewx'],
-            skew_y=metadata_row['skewy'],
-            pixel_width=metadata_row['scalex'],
-            pixel_height=metadata_row['scaley']
+            width=grid.width,
+            height=grid.height,
+            num_bands=grid.num_bands,
+            srid=grid.srid,
+            upper_left_x=grid.upper_left_x,
+            upper_left_y=grid.upper_left_y,
+            scale_x=grid.scale_x,
+            scale_y=grid.scale_y,
+            skew_x=grid.skew_x,
+            skew_y=grid.skew_y,
+            pixel_width=grid.scale_x,
+            pixel_height=grid.scale_y
         )
         
-        # Get band information
-        bands = []
-        for band_num in range(1, metadata.num_bands + 1):
-            cur.execute(f"""
-                SELECT 
-                    ST_BandPixelType(rast, {band_num}) as pixel_type,
-                    ST_BandNoDataValue(rast, {band_num}) as nodata_value,
-                    ST_SummaryStats(rast, {band_num}) as stats
-                FROM {table}
-                LIMIT 1;
-            """)
-            
-            band_row = cur.fetchone()
-            if band_row and band_row['stats']:
-                stats_str = band_row['stats'].strip('()')
-                stats = [float(x.strip()) for x in stats_str.split(',')]
-                band_info = RasterBandInfo(
-                    band_number=band_num,
-                    pixel_type=band_row['pixel_type'],
-                    nodata_value=band_row['nodata_value'],
-                    min_value=stats[4] if len(stats) > 4 else None,  # min
-                    max_value=stats[5] if len(stats) > 5 else None,  # max
-                    mean_value=stats[2] if len(stats) > 2 else None,  # mean
-                    std_dev=stats[3] if len(stats) > 3 else None     # stddev
-                )
-                bands.append(band_info)
-        
-        # Get spatial extent
-        cur.execute(f"""
-            SELECT ST_AsText(ST_Envelope(rast)) as envelope_wkt
-            FROM {table}
-            LIMIT 1;
-        """)
+        bands = [
+            RasterBandInfo(
+                band_number=b.band_number,
+                pixel_type=b.pixel_type,
+                nodata_value=b.nodata_value,
+                min_value=b.min_value,
+                max_value=b.max_value,
+                mean_value=b.mean_value,
+                std_dev=b.std_dev
+            )
+            for b in dataset.bands
+        ]
         
-        extent_row = cur.fetchone()
-        if extent_row:
+        spatial_extent = None
+        if dataset.envelope_wkt:
             spatial_extent = RasterSpatialExtent(
-                extent=extent_row['envelope_wkt'],
-                envelope_wkt=extent_row['envelope_wkt']
+                extent=dataset.envelope_wkt,
+                envelope_wkt=dataset.envelope_wkt
             )
-        else:
-            spatial_extent = None
         
         return RasterInfo(
-            table_name=table,
+            table_name=dataset.name,
             year=year,
-            tile_count=tile_count,
+            tile_count=dataset.tile_count,
             metadata=metadata,
             bands=bands,
             spatial_extent=spatial_extent
@@ -340,119 +677,130 @@ async def get_raster_by_year(year: str):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching raster data for year {year}: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
 
 
-async def _get_reference_year_totals(conn, reference_year: str, veg_codes: list, builtup_codes: list):
+
+def _check_tile_coords(z: int, x: int, y: int) -> None:
+    if not 0 <= z <= 22 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail=f"Invalid tile {z}/{x}/{y}")
+
+
+@router.get("/{year}/tiles/{z}/{x}/{y}.mvt")
+async def get_lulc_vector_tile(year: str, z: int, x: int, y: int, db=Depends(get_postgis_executor)):
     """
-    Helper function to get vegetation and built-up totals for a reference year
+    Mapbox Vector Tile of a year's class polygons (layer `lulc_classes`, attribute `code`)
+    from `lulc_classes_{year}` (the polygons `classes-geojson` serves), simplified for the
+    zoom level and cached on disk. Years only in `lulc_classes_all_years` are served from it.
     """
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
+    _check_tile_coords(z, x, y)
+    return await db.run(ANALYTICS, _lulc_vector_tile, year, z, x, y)
+
+
+def _lulc_vector_tile(conn, year: str, z: int, x: int, y: int):
     try:
-        # Find the table for the reference year
-        cur.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_name LIKE %s
-            ORDER BY table_name;
-        """, (f"%{reference_year}",))
-        
-        table_row = cur.fetchone()
-        if not table_row:
-            return None, None
-        
-        table = table_row['table_name']
-        
-        # Get pixel size in meters after reprojection to UTM (EPSG:32643)
-        cur.execute(f"""
-            SELECT 
-                ST_PixelWidth(ST_Transform(rast, 32643)) as pixel_width_m,
-                ST_PixelHeight(ST_Transform(rast, 32643)) as pixel_height_m
-            FROM {table} 
-            LIMIT 1;
-        """)
-        
-        pixel_info = cur.fetchone()
-        if not pixel_info:
-            return None, None
-        
-        pixel_size_m2 = pixel_info['pixel_width_m'] * pixel_info['pixel_height_m']
-        
-        # Count pixels per class using ST_ValueCount on reprojected raster
-        cur.execute(f"""
-            WITH reprojected AS (
-                SELECT ST_Transform(rast, 32643) as rast_utm
-                FROM {table}
-            ),
-            value_counts AS (
-                SELECT (ST_ValueCount(rast_utm)).*
-                FROM reprojected
-            )
-            SELECT 
-                value as class_code,
-                count as pixel_count
-            FROM value_counts
-            WHERE value IS NOT NULL
-            ORDER BY value;
-        """)
-        
-        class_counts = cur.fetchall()
-        
-        # Calculate totals for reference year
-        reference_vegetation_m2 = 0.0
-        reference_builtup_m2 = 0.0
-        
-        for row in class_counts:
-            class_code = int(row['class_code'])
-            pixel_count = int(row['pixel_count'])
-            area_m2 = pixel_count * pixel_size_m2
-            
-            # Add to vegetation or built-up totals
-            if class_code in veg_codes:
-                reference_vegetation_m2 += area_m2
-            elif class_code in builtup_codes:
-                reference_builtup_m2 += area_m2
-        
-        return reference_vegetation_m2, reference_builtup_m2
-        
+        entry = _get_catalog_entry(conn, year)
+        if entry.vector_table or "classes_all_years" not in entry.precomputed_tables:
+            # Same table and version as classes-geojson; queues a build (202) when missing
+            source = _lulc_classes_source(conn, entry.year)
+            if isinstance(source, Response):
+                return source
+            table, version, _ = source
+            year_filter = None
+        else:
+            # Polygonized before per-year tables existed
+            table, version, year_filter = ALL_YEARS_TABLE, f"{ALL_YEARS_TABLE}:{entry.checksum or entry.raster_table}", entry.year
+
+        # Tiles are cached per import and table, so a re-imported or rebuilt year never serves old tiles
+        data = tile_cache.get("mvt", entry.year, version, z, x, y, "mvt")
+        if data is None:
+            data = render_vector_tile(conn, table, z, x, y, year_filter)
+            tile_cache.put("mvt", entry.year, version, z, x, y, "mvt", data)
+
+        headers = {"Cache-Control": "public, max-age=3600"}
+        if not data:
+            return Response(status_code=204, headers=headers)
+        return Response(content=data, media_type=MVT_MEDIA_TYPE, headers=headers)
+
+    except HTTPException:
+        raise
     except Exception as e:
-        # If there's an error getting reference data, return None
-        return None, None
+        raise HTTPException(status_code=500, detail=f"Error rendering tile {year}/{z}/{x}/{y}: {str(e)}")
+
+
+@router.get("/{year}/tiles/{z}/{x}/{y}.png")
+async def get_lulc_raster_tile(
+    year: str,
+    z: int,
+    x: int,
+    y: int,
+    if_none_match: Optional[str] = Header(None),
+    geotiffs=Depends(get_geotiff_source),
+    db=Depends(get_postgis_executor),
+):
+    """
+    256px PNG of a year's classes straight from its GeoTIFF, colored with LULC_COLORS.
+    ETags are derived from the file signature, so revalidation never renders the tile.
+    """
+    _check_tile_coords(z, x, y)
+    path = geotiffs.read_path_for(year)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No GeoTIFF found for year {year}")
+    signature = file_signature(path)
+    headers = {"ETag": tile_etag(signature, z, x, y), "Cache-Control": "public, max-age=3600"}
+    if if_none_match and headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    data = await db.call(METADATA, cached_png_tile, signature, z, x, y)
+    return Response(content=data, media_type="image/png", headers=headers)
+
+
+@router.get("/{year}/preview.png")
+async def get_raster_preview(
+    year: str,
+    size: int = Query(1024, ge=16, le=4096, description="Longer side of the image in pixels"),
+    engine=Depends(get_raster_engine),
+    db=Depends(get_postgis_executor),
+):
+    """
+    Whole-raster PNG preview of a year's classes, read from the overview level
+    matching the requested size (COG overviews / raster2pgsql -l tables)
+    """
+    return await db.call(ANALYTICS, _raster_preview, engine, year, size)
 
 
+def _raster_preview(engine, year: str, size: int):
+    try:
+        preview = engine.preview(year, size)
+        if preview is None:
+            raise HTTPException(status_code=404, detail=f"No raster found for year {year}")
+        return Response(
+            content=encode_png(colorize(preview.values, preview.nodata)),
+            media_type="image/png",
+            headers={
+                "Cache-Control": "public, max-age=3600",
+                "X-Overview-Factor": str(preview.overview_factor),
+            },
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error rendering preview for year {year}: {str(e)}")
 
 
 @router.get("/{year}/ST_ValueCount")
-async def get_ST_ValueCount(year: str):
+async def get_ST_ValueCount(year: str, engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
+    return await db.call(ANALYTICS, _st_value_count, engine, year)
+
+
+def _st_value_count(engine, year: str):
    
-    conn = None
     try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        # 1. Find raster table for the given year
-        cur.execute(
-            """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-              AND table_name LIKE %s
-            ORDER BY table_name;
-            """,
-            (f"%{year}",),
-        )
-        table_row = cur.fetchone()
-        if not table_row:
+        histogram = engine.class_histogram(year)
+        if histogram is None:
             raise HTTPException(status_code=404, detail=f"No raster table found for year {year}")
-        table = table_row["table_name"]
-
 
-        cur.execute(f"SELECT DISTINCT (pvc).value FROM {table}, ST_ValueCount(rast,1) As pvc ORDER BY (pvc).value;")  
-        rows = cur.fetchall()
+        rows = [{"value": float(code)} for code in sorted(histogram.counts)]
 
         return {
             "Rows" : rows
@@ -462,9 +810,7 @@ async def get_ST_ValueCount(year: str):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching raw data for year {year}: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+
 
 
 #Display the shapefile on the frontend 
@@ -476,31 +822,27 @@ async def get_ST_ValueCount(year: str):
 
 
 @router.get("/{year}/overlay.geojson")
-async def get_raster_overlay_geojson(year: str):
+async def get_raster_overlay_geojson(year: str, db=Depends(get_postgis_executor)):
     """
     Get vectorized overlay as GeoJSON for web display
     Useful for Leaflet choropleths
     """
-    conn = None
-    try:
-        conn = get_postgres_connection()
-        cur = conn.cursor()
+    query = await db.run(METADATA, _raster_overlay_query, year)
+    return await _stream_geojson(db, query, None, headers={
+        "Content-Disposition": f"inline; filename=overlay_{year}.geojson",
+        "Cache-Control": "public, max-age=3600",
+        "Access-Control-Allow-Origin": "*"
+    })
 
-        # 1. Find raster/vector table
-        cur.execute("""
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-              AND table_name LIKE %s
-            ORDER BY table_name
-            LIMIT 1;
-        """, (f"%{year}%",))
 
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail=f"No table found for year {year}")
+def _raster_overlay_query(conn, year: str):
+    try:
+        cur = conn.cursor()
 
-        table = row[0]
+        # 1. Look up the class polygon table for the year in the catalog
+        table = _get_catalog_entry(conn, year).vector_table
+        if not table:
+            raise HTTPException(status_code=404, detail=f"No vector table found for year {year}")
 
         # 2. Find geometry column
         cur.execute("""
@@ -515,36 +857,15 @@ async def get_raster_overlay_geojson(year: str):
             raise HTTPException(status_code=404, detail=f"No geometry column found in {table}")
         geom_col = geom_row[0]
 
-        # 3. Build GeoJSON FeatureCollection
-        cur.execute(sql.SQL("""
-            SELECT jsonb_build_object(
-                'type',     'FeatureCollection',
-                'features', jsonb_agg(features.feature)
-            )
-            FROM (
-              SELECT jsonb_build_object(
-                  'type',       'Feature',
-                  'geometry',   ST_AsGeoJSON({geom_col})::jsonb,
-                  'properties', to_jsonb(inputs) - {geom_col}
-              ) AS feature
-              FROM (SELECT * FROM {table}) inputs
-            ) features;
+        # 3. Every non-geometry column as properties; geometry as ST_AsGeoJSON text
+        return sql.SQL("""
+            SELECT (to_jsonb(inputs) - {geom_name})::text AS properties,
+                   ST_AsGeoJSON({geom_col}) AS geometry
+            FROM {table} inputs;
         """).format(
             table=sql.Identifier(table),
-            geom_col=sql.Identifier(geom_col)
-        ))
-
-        geojson = cur.fetchone()[0]
-        if not geojson:
-            raise HTTPException(status_code=500, detail="GeoJSON generation failed")
-
-        return JSONResponse(
-            content=geojson,
-            headers={
-                "Content-Disposition": f"inline; filename=overlay_{year}.geojson",
-                "Cache-Control": "public, max-age=3600",
-                "Access-Control-Allow-Origin": "*"
-            }
+            geom_col=sql.Identifier(geom_col),
+            geom_name=sql.Literal(geom_col),
         )
 
     except HTTPException:
@@ -552,9 +873,7 @@ async def get_raster_overlay_geojson(year: str):
     except Exception as e:
         logging.error(f"Error generating GeoJSON overlay for {year}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating GeoJSON: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+
 
 
 
@@ -577,72 +896,39 @@ CLASS_LABELS = {
 }
 
 @router.get("/{year}/summary")
-async def get_lulc_summary(year: str):
+async def get_lulc_summary(request: Request, year: str, engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
     """
     Combined endpoint: returns AOI geometry, class distribution, and meta info
     """
+    return await _serve_cached_year(
+        request, "summary", year, engine, db,
+        lambda: db.call(ANALYTICS, _lulc_summary, engine, year),
+        # v2: geodesic areas per class
+        response_version="v2",
+    )
+
+
+def _lulc_summary(engine, year: str):
 
-    conn = None
     try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        # 1. Find raster table by year
-        cur.execute(
-            """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-              AND table_name LIKE %s
-            ORDER BY table_name;
-            """,
-            (f"%{year}",),
-        )
-        table_row = cur.fetchone()
-        if not table_row:
+        # 1. Raster metadata (dimensions + pixel size + extent)
+        dataset = engine.describe(year, include_bands=False)
+        if dataset is None:
             raise HTTPException(status_code=404, detail=f"No raster table found for year {year}")
-        table = table_row["table_name"]
+        md = dataset.grid
 
-        # 2. Get raster metadata (dimensions + pixel size + extent)
-        cur.execute(f"""
-            SELECT (md).width, (md).height, (md).numbands, (md).srid,
-                   (md).upperleftx, (md).upperlefty,
-                   (md).scalex, (md).scaley
-            FROM (
-                SELECT ST_MetaData(rast) AS md
-                FROM {table}
-                LIMIT 1
-            ) foo;
-        """)
-        md = cur.fetchone()
-        if not md:
-            raise HTTPException(status_code=500, detail=f"Could not retrieve metadata for {table}")
-
-        width, height = md["width"], md["height"]
+        width, height = md.width, md.height
         total_pixels = int(width * height)
 
-        # Get extent polygon as GeoJSON
-        cur.execute(f"""
-            SELECT ST_AsGeoJSON(ST_Envelope(rast)) as geojson
-            FROM {table}
-            LIMIT 1;
-        """)
-        extent_row = cur.fetchone()
-        aoi_geometry = extent_row["geojson"]
+        # 2. Extent polygon as GeoJSON
+        aoi_geometry = dataset.envelope_geojson
 
-        # 3. Compute pixel counts by class
-        cur.execute(f"""
-            WITH value_counts AS (
-                SELECT (ST_ValueCount(rast)).*
-                FROM {table}
-            )
-            SELECT value AS class_code, SUM(count) AS pixel_count
-            FROM value_counts
-            WHERE value IS NOT NULL
-            GROUP BY value
-            ORDER BY value;
-        """)
-        class_rows = cur.fetchall()
+        # 3. Pixel counts and areas by class (precomputed histogram where available)
+        histogram = engine.class_histogram(year)
+        class_rows = [
+            {"class_code": code, "pixel_count": count, "area_m2": histogram.areas_m2.get(code)}
+            for code, count in sorted(histogram.counts.items())
+        ]
 
         # 4. Prepare classes with labels + percentages
         classes = []
@@ -655,12 +941,15 @@ async def get_lulc_summary(year: str):
                 "code": code,
                 "label": label,
                 "count": count,
-                "percent": percent
+                "percent": percent,
+                "area_km2": round(r["area_m2"] / 1e6, 4) if r["area_m2"] is not None else None,
             })
 
-        # 5. Compute pixel area (rough, based on scale in degrees)
-        pixel_area_m2 = abs(md["scalex"] * md["scaley"]) * (111_320**2)  # deg → m² approx
-        est_area_km2 = round((total_pixels * pixel_area_m2) / 1e6, 2)
+        # 5. Pixel area: per-row geodesic areas of the grid (pixels shrink towards the poles)
+        row_areas = row_pixel_areas(grid_signature(md))
+        total_area_m2 = float(row_areas.sum()) * width
+        pixel_area_m2 = total_area_m2 / total_pixels  # mean over the grid
+        est_area_km2 = round(total_area_m2 / 1e6, 2)
 
         return {
     "type": "FeatureCollection",
@@ -676,7 +965,7 @@ async def get_lulc_summary(year: str):
                     "estimated_area_km2": est_area_km2
                 }
             },
-            "geometry": aoi_geometry and eval(aoi_geometry),
+            "geometry": aoi_geometry,
         }
     ]
 }
@@ -686,9 +975,82 @@ async def get_lulc_summary(year: str):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating summary for year {year}: {str(e)}")
-    finally:
-        if conn:
-            conn.close()
+
+
+ZONE_GEOMETRY_TYPES = {"Polygon", "MultiPolygon"}
+
+
+def _parse_zones(zones: List[dict]) -> List[tuple]:
+    """(geometry, feature id, properties) per zone; a FeatureCollection counts as its features"""
+    items = []
+    for item in zones:
+        if item.get("type") == "FeatureCollection":
+            items.extend(item.get("features") or [])
+        else:
+            items.append(item)
+
+    parsed = []
+    for i, item in enumerate(items):
+        if item.get("type") == "Feature":
+            geometry, feature_id, properties = item.get("geometry") or {}, item.get("id"), item.get("properties")
+        else:
+            geometry, feature_id, properties = item, None, None
+        if geometry.get("type") not in ZONE_GEOMETRY_TYPES or not geometry.get("coordinates"):
+            raise HTTPException(status_code=400, detail=f"Zone {i}: expected a Polygon or MultiPolygon geometry")
+        parsed.append((geometry, feature_id, properties))
+    return parsed
+
+
+@router.post("/{year}/zonal-stats", response_model=ZonalStatsResponse)
+async def get_zonal_stats(year: str, body: ZonalStatsRequest, engine=Depends(get_raster_engine), db=Depends(get_postgis_executor)):
+    """
+    Pixel count and area per class inside each zone (sector, union council, drawn
+    polygon) for one year. All zones are computed in one pass: PostGIS pre-filters
+    tiles with the tile index and clips only intersecting tiles; the local engine
+    reads each zone's window and masks it.
+    """
+    zones = _parse_zones(body.zones)
+    if not zones:
+        raise HTTPException(status_code=400, detail="No zones given")
+    if len(zones) > settings.ZONAL_STATS_MAX_ZONES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.ZONAL_STATS_MAX_ZONES} zones per request")
+    return await db.call(ANALYTICS, _zonal_stats, engine, year, zones)
+
+
+def _zonal_stats(engine, year: str, zones: List[tuple]) -> ZonalStatsResponse:
+    try:
+        histograms = engine.zonal_histograms(year, [geometry for geometry, _, _ in zones])
+        if histograms is None:
+            raise HTTPException(status_code=404, detail=f"No raster table found for year {year}")
+
+        results = []
+        for (_, feature_id, properties), h in zip(zones, histograms):
+            total_area_m2 = sum(h.areas_m2.values())
+            results.append(ZoneStats(
+                zone=h.zone,
+                id=feature_id,
+                properties=properties,
+                total_pixels=h.total_pixels,
+                total_area_m2=total_area_m2,
+                total_area_km2=total_area_m2 / 1e6,
+                classes=[
+                    ClassPixelCount(
+                        class_code=code,
+                        pixel_count=count,
+                        area_m2=h.areas_m2.get(code, 0.0),
+                        area_km2=h.areas_m2.get(code, 0.0) / 1e6,
+                        area_hectares=h.areas_m2.get(code, 0.0) / 1e4,
+                    )
+                    for code, count in sorted(h.counts.items())
+                ],
+            ))
+        return ZonalStatsResponse(year=str(year), zone_count=len(results), zones=results)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing zonal statistics for year {year}: {str(e)}")
+
 
 
 
@@ -697,37 +1059,75 @@ async def get_lulc_summary(year: str):
 
 #this
 @router.get("/all-years/classes-geojson")
-async def get_lulc_classes_all_years(tolerance: float = 0.0001):
-    conn = None
-    try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+async def get_lulc_classes_all_years(
+    zoom: Optional[float] = Query(None, ge=0, le=22),
+    resolution: Optional[float] = Query(None, gt=0, description="Ground resolution in metres per screen pixel"),
+    tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees (snapped to a tier)"),
+    db=Depends(get_postgis_executor),
+):
+    return await db.run(VECTORIZE, _lulc_classes_all_years, snap_zoom(zoom, resolution, tolerance))
 
-        # Query directly from the combined table
-        cur.execute("""
-            SELECT year, jsonb_build_object(
-                'type', 'FeatureCollection',
-                'features', jsonb_agg(
-                    jsonb_build_object(
-                        'type', 'Feature',
-                        'geometry', ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, %s))::jsonb,
-                        'properties', jsonb_build_object(
-                            'code', class_code,
-                            'year', year
-                        )
+
+def _class_geoms_all_years(conn, zoom: int):
+    """
+    (SQL, params) selecting year, class_code, class_name, geom of every year at a
+    simplification tier, decided per year: pre-simplified rows from `lulc_class_tiers`
+    for years that have tiers, `lulc_classes_all_years` simplified at the tier's
+    tolerance for the others (polygons built before the tiers existed).
+    """
+    fallback = f"""
+        SELECT a.year::text AS year, a.class_code, a.class_name, ST_SimplifyPreserveTopology(a.geom, %s) AS geom
+        FROM {ALL_YEARS_TABLE} a
+    """
+    if not has_tiers(conn):
+        return fallback, [simplify_tolerance(zoom)]
+
+    codes = sorted(CLASS_LABELS)
+    tiered = f"""
+        SELECT t.year, t.class_code, COALESCE(l.label, 'Class ' || t.class_code) AS class_name, t.geom
+        FROM {TIERS_TABLE} t
+        LEFT JOIN unnest(%s::int[], %s::text[]) AS l(code, label) ON l.code = t.class_code
+        WHERE t.zoom = %s
+    """
+    params = [codes, [CLASS_LABELS[c] for c in codes], zoom]
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"public.{ALL_YEARS_TABLE}",))
+    if not cur.fetchone()[0]:
+        return tiered, params
+    return f"""
+        {tiered}
+        UNION ALL
+        {fallback}
+        WHERE NOT EXISTS (SELECT 1 FROM {TIERS_TABLE} t WHERE t.year = a.year::text)
+    """, params + [simplify_tolerance(zoom)]
+
+
+def _lulc_classes_all_years(conn, zoom: int):
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    source, params = _class_geoms_all_years(conn, zoom)
+    cur.execute(f"""
+        SELECT year, jsonb_build_object(
+            'type', 'FeatureCollection',
+            'features', jsonb_agg(
+                jsonb_build_object(
+                    'type', 'Feature',
+                    'geometry', ST_AsGeoJSON(geom)::jsonb,
+                    'properties', jsonb_build_object(
+                        'code', class_code,
+                        'year', year
                     )
                 )
-            ) AS geojson
-            FROM lulc_classes_all_years
-            GROUP BY year
-            ORDER BY year
-        """, (tolerance,))
+            )
+        ) AS geojson
+        FROM ({source}) src
+        GROUP BY year
+        ORDER BY year
+    """, params)
+
+    rows = cur.fetchall()
+    return {row["year"]: row["geojson"] for row in rows}
 
-        rows = cur.fetchall()
-        return {row["year"]: row["geojson"] for row in rows}
-    finally:
-        if conn:
-            conn.close()
 
 
 
@@ -759,92 +1159,75 @@ CLASS_LABELS = {
 }
 
 @router.get("/{year}/classes-geojson")
-async def get_lulc_classes_geojson(year: str, tolerance: float = 0.0001):
-    
-    conn = None
+async def get_lulc_classes_geojson(
+    request: Request,
+    year: str,
+    zoom: Optional[float] = Query(None, ge=0, le=22),
+    resolution: Optional[float] = Query(None, gt=0, description="Ground resolution in metres per screen pixel"),
+    tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees (snapped to a tier)"),
+    db=Depends(get_postgis_executor),
+):
+    source = await db.run(METADATA, _lulc_classes_source, year)
+    if isinstance(source, Response):
+        return source
+    table, version, tiered = source
+
+    # Any zoom / resolution / tolerance snaps to a precomputed tier, so requests share ETags
+    tier = snap_zoom(zoom, resolution, tolerance)
+    # The body is streamed, not cached: revalidate against the polygon table's version
+    etag = version_etag("classes-geojson", year, {"zoom": tier}, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Simplify-Zoom": str(tier)}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    codes = sorted(CLASS_LABELS)
+    labels = [CLASS_LABELS[c] for c in codes]
+    if tiered:
+        geometry, source_sql, params = "c.geom", f"{TIERS_TABLE} c", (codes, labels, year, tier)
+        where = "c.year = %s AND c.zoom = %s"
+    else:
+        # Tiers not built for this year yet: simplify on the fly at the tier's tolerance
+        geometry, source_sql, params = "ST_SimplifyPreserveTopology(c.geom, %s)", f"{table} c", (simplify_tolerance(tier), codes, labels)
+        where = "c.geom IS NOT NULL"
+    query = f"""
+        SELECT json_build_object(
+                   'code', c.class_code,
+                   'label', COALESCE(l.label, 'Class ' || c.class_code)
+               )::text AS properties,
+               ST_AsGeoJSON({geometry}) AS geometry
+        FROM {source_sql}
+        LEFT JOIN unnest(%s::int[], %s::text[]) AS l(code, label) ON l.code = c.class_code
+        WHERE {where};
+    """
+    return await _stream_geojson(db, query, params, headers=headers)
+
+
+def _lulc_classes_source(conn, year: str):
+    """
+    (polygon table, version, tiers built) of a year's class polygons; the version combines
+    the import checksum with the table's identity (a rebuild swaps in a new relation)
+    """
     try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        precomputed_table = f"lulc_classes_{year}"
-
-        # Check if precomputed table exists
-        cur.execute(
-            """
-            SELECT EXISTS (
-              SELECT 1 FROM information_schema.tables
-              WHERE table_schema = 'public'
-              AND table_name = %s
-            );
-            """,
-            (precomputed_table,),
-        )
-        exists = cur.fetchone()["exists"]
-
-        # If not exists → preprocess and create the table
-        if not exists:
-            # Find raster table
-            cur.execute(
-                """
-                SELECT table_name
-                FROM information_schema.tables
-                WHERE table_schema = 'public'
-                  AND table_name LIKE %s
-                ORDER BY table_name;
-                """,
-                (f"%{year}",),
-            )
-            raster_table_row = cur.fetchone()
-            if not raster_table_row:
-                raise HTTPException(status_code=404, detail=f"No raster table found for {year}")
-            raster_table = raster_table_row["table_name"]
-
-            # Precompute polygons + store in permanent table
-            cur.execute(f"""
-                CREATE TABLE {precomputed_table} AS
-                WITH polys AS (
-                  SELECT
-                    (gv).val AS class_code,
-                    ST_MakeValid(ST_Union((gv).geom))::geometry(MultiPolygon, 4326) AS geom
-                  FROM (
-                    SELECT ST_DumpAsPolygons(rast) AS gv
-                    FROM {raster_table}
-                  ) foo
-                  GROUP BY (gv).val
-                )
-                SELECT class_code, geom
-                FROM polys
-                WHERE geom IS NOT NULL;
-            """)
-            conn.commit()
+        entry = _get_catalog_entry(conn, year)
+        precomputed_table = entry.vector_table
 
-        # Query from precomputed table with simplification
-        cur.execute(f"""
-            SELECT class_code,
-                   ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, %s)) AS geom
-            FROM {precomputed_table}
-            WHERE geom IS NOT NULL;
-        """, (tolerance,))
-        rows = cur.fetchall()
-
-        # Build GeoJSON
-        features = []
-        for r in rows:
-            code = int(r["class_code"])
-            label = CLASS_LABELS.get(code, f"Class {code}")
-            features.append({
-                "type": "Feature",
-                "properties": {
-                    "code": code,
-                    "label": label
+        # Not built yet → make sure a background build is queued and tell the caller to come back
+        if not precomputed_table:
+            job = enqueue_job(conn, VECTORIZE_CLASSES, entry.year)
+            conn.commit()
+            return JSONResponse(
+                status_code=202,
+                headers={"Retry-After": str(settings.JOB_RETRY_AFTER), "Location": f"/raster/jobs/{job['id']}"},
+                content={
+                    "detail": f"Class polygons for {entry.year} are being built",
+                    "job": jsonable_encoder(JobResponse(**job)),
                 },
-                "geometry": json.loads(r["geom"])  
-            })
+            )
 
-        return {
-            "type": "FeatureCollection",
-            "features": features
-        }
+        cur = conn.cursor()
+        cur.execute("SELECT to_regclass(%s)::oid;", (f"public.{precomputed_table}",))
+        oid = cur.fetchone()[0]
+        return precomputed_table, f"{entry.raster_table}:{entry.checksum}:{oid}", has_tiers(conn, entry.year)
 
     except HTTPException:
         raise
@@ -853,9 +1236,82 @@ async def get_lulc_classes_geojson(year: str, tolerance: float = 0.0001):
             status_code=500,
             detail=f"Error generating polygons for {year}: {str(e)}"
         )
-    finally:
-        if conn:
-            conn.close()
+
+
+@router.get("/{year}/classes.fgb")
+async def get_lulc_classes_flatgeobuf(
+    request: Request,
+    year: str,
+    bbox: Optional[str] = Query(None, description="minx,miny,maxx,maxy in EPSG:4326"),
+    zoom: Optional[float] = Query(None, ge=0, le=22),
+    resolution: Optional[float] = Query(None, gt=0, description="Ground resolution in metres per screen pixel"),
+    db=Depends(get_postgis_executor),
+):
+    """
+    FlatGeobuf (with spatial index) of a year's class polygons, one feature per polygon,
+    limited to the polygons intersecting `bbox`. Whole-layer downloads are better served
+    by the exported `/geojson/lulc_classes_{year}.<hash>.fgb`, which clients can read
+    by bbox with Range requests.
+    """
+    envelope = None
+    if bbox is not None:
+        try:
+            envelope = [float(v) for v in bbox.split(",")]
+        except ValueError:
+            envelope = []
+        if len(envelope) != 4 or envelope[0] >= envelope[2] or envelope[1] >= envelope[3]:
+            raise HTTPException(status_code=400, detail="bbox must be minx,miny,maxx,maxy")
+
+    source = await db.run(METADATA, _lulc_classes_source, year)
+    if isinstance(source, Response):
+        return source
+    table, version, tiered = source
+
+    tier = snap_zoom(zoom, resolution)
+    etag = version_etag("classes-fgb", year, {"zoom": tier, "bbox": envelope}, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Simplify-Zoom": str(tier)}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    data = await db.run(VECTORIZE, _lulc_classes_flatgeobuf, year, table, tiered, tier, envelope)
+    if not data:
+        return Response(status_code=204, headers=headers)
+    return Response(content=data, media_type="application/flatgeobuf", headers=headers)
+
+
+def _lulc_classes_flatgeobuf(conn, year: str, table: str, tiered: bool, tier: int, envelope):
+    try:
+        cur = conn.cursor()
+        if tiered:
+            source_sql, where, params = TIERS_TABLE, "year = %(year)s AND zoom = %(zoom)s", {"year": year, "zoom": tier}
+            geometry = "geom"
+        else:
+            source_sql, where, params = table, "geom IS NOT NULL", {"tolerance": simplify_tolerance(tier)}
+            geometry = "ST_SimplifyPreserveTopology(geom, %(tolerance)s)"
+        bbox_filter = ""
+        if envelope is not None:
+            params.update(dict(zip(("xmin", "ymin", "xmax", "ymax"), envelope)))
+            bbox_filter = "AND geom && ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 4326)"
+        cur.execute(f"""
+            SELECT ST_AsFlatGeobuf(q, true, 'geom')
+            FROM (
+                SELECT class_code AS code, geom
+                FROM (
+                    SELECT class_code, (ST_Dump({geometry})).geom::geometry(Polygon, 4326) AS geom
+                    FROM {source_sql}
+                    WHERE {where} AND class_code <> 0 {bbox_filter}
+                ) polygons
+                WHERE TRUE {bbox_filter}
+            ) q;
+        """, params)
+        row = cur.fetchone()
+        return bytes(row[0]) if row and row[0] is not None else b""
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating FlatGeobuf for {year}: {str(e)}")
+
 
 
 
@@ -864,41 +1320,44 @@ async def get_lulc_classes_geojson(year: str, tolerance: float = 0.0001):
 
 
 @router.get("/all-years/classes-geojson")
-async def get_lulc_classes_all_years(tolerance: float = 0.0001):
-    conn = None
-    try:
-        conn = get_postgres_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+async def get_lulc_classes_all_years(
+    zoom: Optional[float] = Query(None, ge=0, le=22),
+    resolution: Optional[float] = Query(None, gt=0, description="Ground resolution in metres per screen pixel"),
+    tolerance: Optional[float] = Query(None, ge=0, description="Simplification tolerance in degrees (snapped to a tier)"),
+    db=Depends(get_postgis_executor),
+):
+    return await db.run(VECTORIZE, _lulc_classes_all_years_labelled, snap_zoom(zoom, resolution, tolerance))
 
-        cur.execute("""
-            SELECT year,
-                   jsonb_build_object(
-                       'type', 'FeatureCollection',
-                       'features', jsonb_agg(
-                           jsonb_build_object(
-                               'type', 'Feature',
-                               'geometry', ST_AsGeoJSON(
-                                   ST_SimplifyPreserveTopology(geom, %s)
-                               )::jsonb,
-                               'properties', jsonb_build_object(
-                                   'code', class_code,
-                                   'label', class_name,  -- ✅ add label like single-year
-                                   'year', year
-                               )
+
+def _lulc_classes_all_years_labelled(conn, zoom: int):
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    source, params = _class_geoms_all_years(conn, zoom)
+    cur.execute(f"""
+        SELECT year,
+               jsonb_build_object(
+                   'type', 'FeatureCollection',
+                   'features', jsonb_agg(
+                       jsonb_build_object(
+                           'type', 'Feature',
+                           'geometry', ST_AsGeoJSON(geom)::jsonb,
+                           'properties', jsonb_build_object(
+                               'code', class_code,
+                               'label', class_name,  -- ✅ add label like single-year
+                               'year', year
                            )
                        )
-                   ) AS geojson
-            FROM lulc_classes_all_years
-            GROUP BY year
-            ORDER BY year
-        """, (tolerance,))
-
-        rows = cur.fetchall()
-        # { "2020": {FeatureCollection}, "2021": {FeatureCollection}, ... }
-        return {str(row["year"]): row["geojson"] for row in rows}
-    finally:
-        if conn:
-            conn.close()
+                   )
+               ) AS geojson
+        FROM ({source}) src
+        GROUP BY year
+        ORDER BY year
+    """, params)
+
+    rows = cur.fetchall()
+    # { "2020": {FeatureCollection}, "2021": {FeatureCollection}, ... }
+    return {str(row["year"]): row["geojson"] for row in rows}
+
 
 
 
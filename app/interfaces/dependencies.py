@@ -2,6 +2,11 @@ from fastapi import Depends, HTTPException, status
 from jose import JWTError
 from sqlalchemy.orm import Session
 from app.infrastructure.db.session import get_db
+from app.interfaces.postgis_executor import postgis_executor
+from app.application.ports.raster_engine import RasterEngine
+from app.infrastructure.raster.local_engine import LocalRasterEngine
+from app.infrastructure.raster.postgis_engine import PostgisRasterEngine
+from app.config.settings import settings
 from app.infrastructure.db.user_repository_sqlalchemy import SqlAlchemyUserRepository
 from app.infrastructure.security.jwt_token_provider import JoseJWT
 from app.infrastructure.security.passlib_hasher import PasslibPasswordHasher
@@ -14,6 +19,36 @@ def get_user_repo(db: Session = Depends(get_db)):
     return SqlAlchemyUserRepository(db)
 
 
+def get_postgis_executor():
+    """Run PostGIS queries on worker threads with per-endpoint-class concurrency limits"""
+    return postgis_executor
+
+
+_raster_engine: RasterEngine | None = None
+_geotiff_source: LocalRasterEngine | None = None
+
+
+def get_geotiff_source() -> LocalRasterEngine:
+    """Year -> GeoTIFF lookup over `settings.RASTER_DIR`, whatever the analytics engine (e.g. for tiles)"""
+    global _geotiff_source
+    if _geotiff_source is None:
+        _geotiff_source = LocalRasterEngine(settings.RASTER_DIR, settings.COG_DIR, settings.RASTER_ARRAY_DIR)
+    return _geotiff_source
+
+
+def get_raster_engine() -> RasterEngine:
+    """Raster analytics backend selected by `settings.RASTER_ENGINE`"""
+    global _raster_engine
+    if _raster_engine is None:
+        if settings.RASTER_ENGINE == "local":
+            _raster_engine = get_geotiff_source()
+        elif settings.RASTER_ENGINE == "postgis":
+            _raster_engine = PostgisRasterEngine()
+        else:
+            raise RuntimeError(f"Unknown RASTER_ENGINE: {settings.RASTER_ENGINE}")
+    return _raster_engine
+
+
 def get_token_provider():
     return JoseJWT()
 
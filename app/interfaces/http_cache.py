@@ -0,0 +1,72 @@
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from anyio import to_thread
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.infrastructure.cache.response_cache import CachedResponse, cache_key, response_cache
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def version_etag(endpoint: str, year: str, params: dict, version: str) -> str:
+    """Weak ETag of a response derived from its data version (for bodies that are streamed, never cached)"""
+    return 'W/"' + cache_key(endpoint, year, params, version)[:32] + '"'
+
+
+def conditional_response(request: Request, entry: CachedResponse, media_type: str = "application/json") -> Response:
+    """200 with the cached body, or 304 when the client's validators still match"""
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+        # Same URL, new data after a re-import: clients must revalidate (cheap 304s)
+        "Cache-Control": "no-cache",
+    }
+    if request.headers.get("if-none-match") is not None:
+        if etag_matches(request, entry.etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+            if int(entry.last_modified) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return Response(content=entry.body, media_type=media_type, headers=headers)
+
+
+async def serve_cached(
+    request: Request,
+    endpoint: str,
+    year: str,
+    version: str,
+    compute: Callable[[], Awaitable[Any]],
+    params: Optional[dict] = None,
+) -> Response:
+    """
+    Serve a per-year JSON result from the response cache, keyed by (endpoint, year,
+    `params`, data version); on a miss, await `compute()` and cache its result.
+    `params` are only the query parameters the endpoint reads, so unknown ones in the
+    URL never create new entries. Results that already are Responses (e.g. 202 while
+    a job runs) pass through uncached.
+    """
+    key = cache_key(endpoint, year, params or {}, version)
+    entry = await to_thread.run_sync(response_cache.get, key)
+    if entry is None:
+        result = await compute()
+        if isinstance(result, Response):
+            return result
+        body = json.dumps(
+            jsonable_encoder(result), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+        entry = await to_thread.run_sync(response_cache.put, key, body)
+    return conditional_response(request, entry)
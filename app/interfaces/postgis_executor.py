@@ -0,0 +1,119 @@
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Iterator, TypeVar
+
+from anyio import CancelScope, CapacityLimiter, to_thread
+from fastapi import HTTPException, status
+
+from app.config.settings import settings
+from app.infrastructure.db.postgis_pool import get_postgis_pool, PoolTimeout
+
+
+T = TypeVar("T")
+
+# Endpoint classes: each gets its own concurrency budget so a handful of slow
+# ST_DumpAsPolygons requests cannot occupy every worker thread / pooled connection
+# and stall the cheap metadata endpoints.
+METADATA = "metadata"
+ANALYTICS = "analytics"
+VECTORIZE = "vectorize"
+
+ENDPOINT_CLASS_LIMITS: Dict[str, int] = {
+    METADATA: settings.RASTER_METADATA_CONCURRENCY,
+    ANALYTICS: settings.RASTER_ANALYTICS_CONCURRENCY,
+    VECTORIZE: settings.RASTER_VECTORIZE_CONCURRENCY,
+}
+
+
+class PostgisExecutor:
+    """
+    Runs synchronous raster work (psycopg2 queries, rasterio reads) off the event loop.
+
+    `run(kind, fn, *args)` waits for a slot in the endpoint class limiter, then on a
+    worker thread borrows a pooled connection and calls `fn(conn, *args)`.
+    The connection is only checked out once the slot is granted, so queued
+    requests never hold connections.
+    """
+
+    def __init__(self, limits: Dict[str, int]) -> None:
+        self._limits = limits
+        self._limiters: Dict[str, CapacityLimiter] = {}
+
+    def limiter(self, kind: str) -> CapacityLimiter:
+        # Created lazily: anyio limiters must be instantiated inside the running event loop
+        if kind not in self._limiters:
+            self._limiters[kind] = CapacityLimiter(self._limits[kind])
+        return self._limiters[kind]
+
+    async def run(self, kind: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await to_thread.run_sync(
+            partial(self._call, fn, *args, **kwargs), limiter=self.limiter(kind)
+        )
+
+    async def call(self, kind: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Like `run`, for callables that manage their own connections (e.g. a RasterEngine)"""
+        return await to_thread.run_sync(
+            partial(self._call_unbound, fn, *args, **kwargs), limiter=self.limiter(kind)
+        )
+
+    async def stream(self, kind: str, fn: Callable[..., Iterator[T]], *args, **kwargs) -> AsyncIterator[T]:
+        """
+        Iterate the blocking generator `fn(*args)` (which manages its own connection) on
+        worker threads, holding one slot of the endpoint class until it is exhausted or
+        closed. Pull the first item before building the response so pool timeouts still
+        surface as 503 rather than a truncated body.
+
+        The slot is borrowed on behalf of a per-stream token rather than the calling
+        task: the request handler pulls the first item and the response pulls the rest
+        from another task, so a task-bound borrow could never be released.
+        """
+        done = object()
+        limiter = self.limiter(kind)
+        token = object()
+        await limiter.acquire_on_behalf_of(token)
+        try:
+            iterator = fn(*args, **kwargs)
+            try:
+                while True:
+                    item = await to_thread.run_sync(partial(self._call_unbound, next, iterator, done))
+                    if item is done:
+                        break
+                    yield item
+            finally:
+                with CancelScope(shield=True):
+                    await to_thread.run_sync(iterator.close)
+        finally:
+            limiter.release_on_behalf_of(token)
+
+    @staticmethod
+    def _call_unbound(fn: Callable[..., T], *args, **kwargs) -> T:
+        try:
+            return fn(*args, **kwargs)
+        except PoolTimeout as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    @staticmethod
+    def _call(fn: Callable[..., T], *args, **kwargs) -> T:
+        pool = get_postgis_pool()
+        try:
+            conn = pool.getconn()
+        except PoolTimeout as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+        try:
+            return fn(conn, *args, **kwargs)
+        finally:
+            pool.putconn(conn)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            kind: {
+                "limit": limit,
+                "in_use": self._limiters[kind].borrowed_tokens if kind in self._limiters else 0,
+                "waiting": self._limiters[kind].statistics().tasks_waiting if kind in self._limiters else 0,
+            }
+            for kind, limit in self._limits.items()
+        }
+
+
+postgis_executor = PostgisExecutor(ENDPOINT_CLASS_LIMITS)
@@ -65,7 +65,8 @@ class ClassPixelCount(BaseModel):
 
 
 class AnalysisRequest(BaseModel):
-    year: str
+    years: List[str] = []  # Years to analyse; empty with no `year`: every available year
+    year: Optional[str] = None  # Single-year form, same as years=[year]
     reference_year: Optional[str] = None  # Reference year for percentage calculations
     veg_codes: List[int] = [1, 2, 3, 4, 5]  # Default vegetation codes
     builtup_codes: List[int] = [6, 7, 8, 9, 10, 11]  # Default built-up codes
@@ -86,6 +87,36 @@ class AnalysisResponse(BaseModel):
     vegetation_change_percentage: Optional[float] = None  # Percentage change from reference year
     builtup_change_percentage: Optional[float] = None     # Percentage change from reference year
 
+
+class MultiYearAnalysisResponse(BaseModel):
+    reference_year: Optional[str] = None
+    veg_codes: List[int]
+    builtup_codes: List[int]
+    results: List[AnalysisResponse]
+    missing_years: List[str] = []  # Requested years with no raster
+
+
+
+class ZonalStatsRequest(BaseModel):
+    # GeoJSON Polygon / MultiPolygon geometries or Features (EPSG:4326), or one FeatureCollection
+    zones: List[Dict[str, Any]]
+
+
+class ZoneStats(BaseModel):
+    zone: int  # Position in the request
+    id: Optional[Any] = None  # Feature id, when the zone was a Feature with one
+    properties: Optional[Dict[str, Any]] = None
+    total_pixels: int
+    total_area_m2: float
+    total_area_km2: float
+    classes: List[ClassPixelCount]
+
+
+class ZonalStatsResponse(BaseModel):
+    year: str
+    zone_count: int
+    zones: List[ZoneStats]
+
     
 class FileClassCount(BaseModel):
     value: int
@@ -125,4 +156,105 @@ class RasterOverlayResponse(BaseModel):
 
 class AvailableYearsResponse(BaseModel):
     years: List[str]
-    total_datasets: int
\ No newline at end of file
+    total_datasets: int
+
+class ClassTransition(BaseModel):
+    from_class: int
+    to_class: int
+    pixel_count: int
+    area_km2: float
+
+
+class TransitionMatrixResponse(BaseModel):
+    from_year: str
+    to_year: str
+    classes: List[int]                 # row (from_year) / column (to_year) class codes
+    pixel_counts: List[List[int]]
+    area_km2: List[List[float]]
+    transitions: List[ClassTransition]  # non-zero cells, largest first
+    changed_pixels: int
+    changed_area_km2: float
+
+
+class FirstChangeBucket(BaseModel):
+    year: Optional[str]                # None: class never changed
+    pixel_count: int
+    area_km2: float
+
+
+class ChangeCountBucket(BaseModel):
+    changes: int
+    pixel_count: int
+    area_km2: float
+
+
+class ChangeCubeResponse(BaseModel):
+    years: List[str]
+    built_at: Optional[datetime] = None
+    stale: bool                        # source GeoTIFFs changed since the cube was built
+    pairs: List[TransitionMatrixResponse]
+    first_change_year: List[FirstChangeBucket]
+    change_count: List[ChangeCountBucket]
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    key: str
+    params: Dict[str, Any] = {}
+    status: str                        # queued | running | done | failed
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class BoundaryClassArea(BaseModel):
+    feature_id: int
+    year: str
+    class_code: int
+    label: str
+    pixel_count: int
+    area_m2: float
+    area_km2: float
+
+
+class BoundaryYearStatus(BaseModel):
+    year: str
+    computed_at: Optional[datetime] = None
+    features: int = 0
+    stale: bool  # Never computed, or computed from another shapefile / raster version
+
+
+class BoundaryClassAreasResponse(BaseModel):
+    layer: str
+    shapefile_checksum: str
+    years: List[BoundaryYearStatus]
+    rows: List[BoundaryClassArea]
+    job: Optional[JobResponse] = None  # Recomputation queued for the stale years
+
+
+class PointClass(BaseModel):
+    year: str
+    class_code: Optional[int] = None  # None outside the raster or on nodata
+    label: Optional[str] = None
+
+
+class PointQueryResponse(BaseModel):
+    lon: float
+    lat: float
+    classes: List[PointClass]
+
+
+class PointBatchRequest(BaseModel):
+    points: List[List[float]]  # [lon, lat] pairs in EPSG:4326
+    years: Optional[List[str]] = None  # Default: every available year
+
+
+class PointBatchResponse(BaseModel):
+    count: int
+    years: List[str]
+    # year -> class code per point, in request order (None outside the raster or on nodata)
+    classes: Dict[str, List[Optional[int]]]
+    labels: Dict[int, str]
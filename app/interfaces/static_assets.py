@@ -0,0 +1,92 @@
+import os
+from mimetypes import guess_type
+from typing import Set
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from app.config.settings import settings
+from app.infrastructure.exports.assets import MANIFEST_NAME, PRECOMPRESSED, asset_hash
+
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Not in the mimetypes registry
+MEDIA_TYPES = {
+    ".fgb": "application/flatgeobuf",
+    ".parquet": "application/vnd.apache.parquet",
+}
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content codings of an Accept-Encoding header that are not refused with q=0"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class AssetStaticFiles(StaticFiles):
+    """
+    Static files with per-file caching policy:
+    - content-hashed assets (`name.<hash>.ext`) never change: cached for a year as immutable,
+      with the content hash as strong ETag;
+    - the manifest is cached for GEOJSON_MANIFEST_MAX_AGE seconds, then revalidated;
+    - any other file (plain aliases) is revalidated on every use.
+    When the client accepts it and the export wrote one, the precompressed `.br` / `.gz`
+    sibling is sent as is with `Content-Encoding` (nothing is compressed per request).
+    ETag / Last-Modified revalidation (304) and Range requests are handled by FileResponse.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        media_type = MEDIA_TYPES.get(os.path.splitext(name)[1]) or guess_type(name)[0] or "text/plain"
+
+        encoding, path = None, full_path
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for candidate, ext in PRECOMPRESSED.items():
+            if candidate in accepted:
+                try:
+                    stat_result = os.stat(f"{full_path}{ext}")
+                except OSError:
+                    continue
+                encoding, path = candidate, f"{full_path}{ext}"
+                break
+
+        response = FileResponse(path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        digest = asset_hash(name)
+        if digest is not None:
+            response.headers["etag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+            response.headers["cache-control"] = IMMUTABLE
+        elif name == MANIFEST_NAME:
+            response.headers["cache-control"] = f"public, max-age={settings.GEOJSON_MANIFEST_MAX_AGE}, must-revalidate"
+        else:
+            response.headers["cache-control"] = "no-cache"
+        if encoding:
+            response.headers["content-encoding"] = encoding
+        if any(os.path.exists(f"{full_path}{ext}") for ext in PRECOMPRESSED.values()):
+            response.headers["vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
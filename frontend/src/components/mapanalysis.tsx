@@ -239,7 +239,7 @@ function CustomZoomControls() {
 export default function MapAnalysis() {
   const [geoDataByYear, setGeoDataByYear] = useState<Record<number, any>>({})
   const [pakistanData, setPakistanData] = useState<any | null>(null)
-  const [classChangesData, setClassChangesData] = useState<any | null>(null)
+  const [transitionsData, setTransitionsData] = useState<any | null>(null)
   const [years, setYears] = useState<number[]>([])
   const [currentYear, setCurrentYear] = useState<number | null>(null)
   const [loading, setLoading] = useState(false)
@@ -256,11 +256,18 @@ export default function MapAnalysis() {
     setCurrentYear(availableYears[availableYears.length - 1])
     setLoading(true)
     setError(null)
-    const bust = Date.now()
+
+    // Exports are content-hashed and cached by the browser as immutable; the short-lived
+    // manifest maps each logical file name to its current hashed file
+    const assetUrls = fetch(`${apiBase}/geojson/manifest.json`)
+      .then((res) => (res.ok ? res.json() : { assets: {} }))
+      .catch(() => ({ assets: {} }))
+      .then((manifest) => (name: string) => `${apiBase}/geojson/${manifest?.assets?.[name]?.file ?? name}`)
 
     Promise.all([
       ...availableYears.map((year) =>
-        fetch(`${apiBase}/geojson/lulc_classes_${year}.geojson?bust=${bust}`, { cache: "no-store" as RequestCache })
+        assetUrls
+          .then((assetUrl) => fetch(assetUrl(`lulc_classes_${year}.geojson`)))
           .then((res) => {
             if (!res.ok) throw new Error(`Failed to fetch data for year ${year}`)
             return res.json()
@@ -270,26 +277,33 @@ export default function MapAnalysis() {
             return [year, data] as [number, any]
           }),
       ),
-      fetch(`${apiBase}/geojson/pakistan.geojson?bust=${bust}`, { cache: "no-store" as RequestCache })
+      assetUrls
+        .then((assetUrl) => fetch(assetUrl("pakistan.geojson")))
         .then((res) => {
           if (!res.ok) throw new Error("Failed to fetch Pakistan boundary data")
           return res.json()
         })
         .then((data) => ["pakistan", data] as [string, any]),
-      fetch(`${apiBase}/geojson/class_changes.geojson?bust=${bust}`, { cache: "no-store" as RequestCache })
+      // Consecutive-year transitions from the persisted change cube; first -> last year if it is not built
+      fetch(`${apiBase}/raster/change-cube`)
         .then((res) => {
-          if (!res.ok) throw new Error("Failed to fetch class changes data")
-          return res.json()
+          if (res.ok) return res.json()
+          return fetch(`${apiBase}/raster/transitions?from=${availableYears[0]}&to=${availableYears[availableYears.length - 1]}`)
+            .then((fallback) => {
+              if (!fallback.ok) throw new Error("Failed to fetch class transitions")
+              return fallback.json()
+            })
+            .then((matrix) => ({ pairs: [matrix] }))
         })
-        .then((data) => ["class_changes", data] as [string, any]),
+        .then((data) => ["transitions", data] as [string, any]),
     ])
       .then((entries) => {
         const yearly = entries.filter((e): e is [number, any] => typeof e[0] === "number")
         const pakistan = entries.find((e) => e[0] === "pakistan")?.[1]
-        const classChanges = entries.find((e) => e[0] === "class_changes")?.[1]
+        const transitions = entries.find((e) => e[0] === "transitions")?.[1]
         setGeoDataByYear(Object.fromEntries(yearly))
         setPakistanData(pakistan)
-        setClassChangesData(classChanges)
+        setTransitionsData(transitions)
         setLoading(false)
       })
       .catch((err) => {
@@ -300,80 +314,41 @@ export default function MapAnalysis() {
   }, [apiBase])
 
   // ---------------- Sankey data ----------------
-  const sankeyData = classChangesData
+  const sankeyData = transitionsData
     ? (() => {
         try {
-          // Aggregate raw counts of transitions (excluding self-links)
-          const counts: Record<string, number> = {}
-
-          console.log("Processing class changes data:", classChangesData?.features?.length, "features")
-
-          classChangesData.features.forEach((ft: any) => {
-            const from = ft.properties.from_class_code
-            const to = ft.properties.to_class_code
-            if (!from || !to || from === to) return
-            const key = `${from}-${to}`
-            counts[key] = (counts[key] || 0) + 1
+          // Changed area (km²) per class pair and year step (excluding self-links and No Data).
+          // Nodes are "year:code", so links always point forward in time and the graph is acyclic.
+          const links: { source: string; target: string; value: number; percentage: number }[] = []
+
+          transitionsData.pairs.forEach((pair: any) => {
+            pair.transitions.forEach((t: any) => {
+              const from = t.from_class
+              const to = t.to_class
+              if (!from || !to || from === to) return
+              links.push({
+                source: `${pair.from_year}:${from}`,
+                target: `${pair.to_year}:${to}`,
+                value: Number(t.area_km2.toFixed(2)),
+                percentage: 0,
+              })
+            })
           })
 
-          // Calculate total transitions for percentage calculation
-          const totalTransitions = Object.values(counts).reduce((sum, count) => sum + count, 0)
+          // Calculate total changed area for percentage calculation
+          const totalTransitions = links.reduce((sum, link) => sum + link.value, 0)
+          links.forEach((link) => {
+            link.percentage = parseFloat(((link.value / totalTransitions) * 100).toFixed(1))
+          })
 
-          // Turn counts into a list of candidate edges with percentages
-          const candidateEdges: { source: string; target: string; value: number; percentage: number }[] = Object.entries(counts)
-            .map(([key, value]) => {
-              const [source, target] = key.split("-")
-              const percentage = ((value / totalTransitions) * 100).toFixed(1)
-              return { source, target, value, percentage: parseFloat(percentage) }
-            })
-            // Keep stronger links first so pruning removes weakest cycles if needed
-            .sort((a, b) => b.value - a.value)
-
-          // Build an acyclic set of edges by skipping those that would introduce a cycle
-          const adjacency = new Map<string, Set<string>>()
-          const acyclicEdges: { source: string; target: string; value: number; percentage: number }[] = []
-
-          const hasPath = (start: string, goal: string): boolean => {
-            // DFS from start to see if goal is reachable
-            const stack = [start]
-            const visited = new Set<string>()
-            while (stack.length) {
-              const node = stack.pop() as string
-              if (node === goal) return true
-              if (visited.has(node)) continue
-              visited.add(node)
-              const neighbors = adjacency.get(node)
-              if (neighbors) {
-                neighbors.forEach((neighborId: string) => {
-                  if (!visited.has(neighborId)) stack.push(neighborId)
-                })
-              }
-            }
-            return false
-          }
-
-          for (const edge of candidateEdges) {
-            // If there is already a path from target to source, adding this edge creates a cycle
-            if (hasPath(edge.target, edge.source)) {
-              // Skip this edge to keep the graph acyclic
-              continue
-            }
-            // Accept edge and update adjacency
-            acyclicEdges.push(edge)
-            if (!adjacency.has(edge.source)) adjacency.set(edge.source, new Set<string>())
-            adjacency.get(edge.source)!.add(edge.target)
-          }
-
-          // Build nodes from accepted edges only
           const nodeIds = new Set<string>()
-          acyclicEdges.forEach((e) => {
+          links.forEach((e) => {
             nodeIds.add(e.source)
             nodeIds.add(e.target)
           })
           const nodes = Array.from(nodeIds).map((id) => ({ id }))
 
-          console.log("Sankey data generated:", { nodes: nodes.length, links: acyclicEdges.length, totalTransitions })
-          return { nodes, links: acyclicEdges, totalTransitions }
+          return { nodes, links, totalTransitions }
         } catch (err) {
           console.error("Error processing Sankey data:", err)
           return null
@@ -381,6 +356,14 @@ export default function MapAnalysis() {
       })()
     : null
 
+  // "year:code" Sankey node id -> class code / readable label
+  const sankeyNodeCode = (id: string | number) => Number(String(id).split(":").pop())
+  const sankeyNodeLabel = (id: string | number) => {
+    const [year, code] = String(id).split(":")
+    const label = LULC_CLASSES.find(c => c.code === Number(code))?.label || `Class ${code}`
+    return `${label} (${year})`
+  }
+
   return (
     <div className="min-h-screen w-full bg-background overflow-x-hidden">
       {/* Header */}
@@ -540,14 +523,14 @@ export default function MapAnalysis() {
 
       {/* Card 2: Year-to-Year Comparison */}
       <div className="px-3 sm:px-4 mt-4">
-        {classChangesData && years.length > 0 && (
+        {years.length > 0 && (
           <Card>
             <CardHeader className="pb-2">
               <CardTitle className="text-sm sm:text-base font-semibold text-foreground">Yearly Delta Stats</CardTitle>
             </CardHeader>
             <CardContent className="p-3">
               <YearDeltaStats
-                classChangesData={classChangesData}
+                apiBase={apiBase}
                 years={years}
                 defaultFrom={years[0]}
                 defaultTo={years[years.length - 1]}
@@ -560,7 +543,7 @@ export default function MapAnalysis() {
 
       {/* Card 3: Sankey Chart */}
       <div className="px-3 sm:px-4 mt-4 pb-6">
-        {classChangesData && (
+        {transitionsData && (
           <Card>
             <CardHeader className="pb-2 flex items-center justify-between">
               <CardTitle className="text-sm sm:text-base font-semibold text-foreground">Land Use Class Changes Flow</CardTitle>
@@ -580,7 +563,8 @@ export default function MapAnalysis() {
                       data={sankeyData}
                       margin={{ top: 10, right: 20, bottom: 10, left: 20 }}
                       align="justify"
-                      colors={({ id }) => getColor(Number(id))}
+                      colors={({ id }) => getColor(sankeyNodeCode(id))}
+                      label={(node: any) => sankeyNodeLabel(node.id)}
                       nodeOpacity={1}
                       nodeThickness={window.innerWidth < 640 ? 15 : 20}
                       nodeBorderColor={{ from: "color", modifiers: [["darker", 0.8]] }}
@@ -593,16 +577,16 @@ export default function MapAnalysis() {
                       labelTextColor={{ from: "color", modifiers: [["darker", 1.2]] }}
                       theme={sankeyTheme}
                       linkTooltip={({ link }: any) => {
-                        const sourceClass = LULC_CLASSES.find(c => c.code === Number(link.source.id))?.label || `Class ${link.source.id}`
-                        const targetClass = LULC_CLASSES.find(c => c.code === Number(link.target.id))?.label || `Class ${link.target.id}`
+                        const sourceClass = sankeyNodeLabel(link.source.id)
+                        const targetClass = sankeyNodeLabel(link.target.id)
                         const percentage = link.percentage || 0
                         return (
                           <div className="bg-background border border-border rounded-lg p-2 shadow-lg min-w-[200px] max-w-[300px]">
                             <div className="font-semibold text-sm">
-                              {targetClass} → {sourceClass}
+                              {sourceClass} → {targetClass}
                             </div>
                             <div className="text-xs text-muted-foreground">
-                              {link.value} transitions ({percentage}% of total)
+                              {link.value} km² ({percentage}% of changed area)
                             </div>
                           </div>
                         )
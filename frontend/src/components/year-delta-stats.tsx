@@ -1,21 +1,11 @@
 "use client"
 
-import { useMemo, useState } from "react"
+import { useEffect, useMemo, useState } from "react"
 import * as turf from "@turf/turf"
-import type { Geometry } from "geojson"
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card"
 import { Select, SelectTrigger, SelectValue, SelectContent, SelectItem } from "@/components/ui/select"
 import { Badge } from "@/components/ui/badge"
 
-type FC = {
-  type: "FeatureCollection"
-  features: Array<{
-    type: "Feature"
-    geometry: Geometry | null
-    properties: Record<string, any>
-  }>
-}
-
 const LULC_CLASSES = [
   { code: 1, label: "Water", color: "#419bdf" },
   { code: 2, label: "Trees", color: "#397d49" },
@@ -40,41 +30,33 @@ function readAreaKm2(props: Record<string, any>, geom: any): number {
   }
 }
 
-// Try a few common property names for years and class codes
-function readYears(props: Record<string, any>): { from?: number; to?: number } {
-  const from = props.from_year ?? props.year_from ?? props.start_year ?? props.y1
-  const to = props.to_year ?? props.year_to ?? props.end_year ?? props.y2
-  return { from: from != null ? Number(from) : undefined, to: to != null ? Number(to) : undefined }
-}
-function readClassCodes(props: Record<string, any>): { from?: number; to?: number } {
-  const from = props.from_class_code ?? props.class_from ?? props.source ?? props.c1
-  const to = props.to_class_code ?? props.class_to ?? props.target ?? props.c2
-  return { from: from != null ? Number(from) : undefined, to: to != null ? Number(to) : undefined }
+type TransitionMatrix = {
+  from_year: string
+  to_year: string
+  classes: number[]
+  area_km2: number[][]
 }
 
-// Build per-year totals by class using transitions:
-// - For each feature, add its area to the "to" year for class "to_class_code"
-// - If needed, you can also add to the "from" year for class "from_class_code" (uncomment below)
-function buildYearClassAreas(classChangesData: FC | null) {
+// Per-year class areas from a transition matrix: row sums are the "from" year, column sums the "to" year
+function yearClassAreasFromMatrix(matrix: TransitionMatrix | null) {
   const byYear: Record<number, Record<number, number>> = {}
-  if (!classChangesData?.features?.length) return byYear
-
-  for (const ft of classChangesData.features) {
-    const props = ft.properties || {}
-    const geom = ft.geometry
-    const { from: yFrom, to: yTo } = readYears(props)
-    const { from: cFrom, to: cTo } = readClassCodes(props)
-    if (!yTo || !cTo) continue
+  if (!matrix?.classes?.length) return byYear
 
-    const a = readAreaKm2(props, geom)
-    if (!byYear[yTo]) byYear[yTo] = {}
-    byYear[yTo][cTo] = (byYear[yTo][cTo] || 0) + a
-
-    // Optional: also accumulate source-year composition
-    // if (yFrom && cFrom) {
-    //   if (!byYear[yFrom]) byYear[yFrom] = {}
-    //   byYear[yFrom][cFrom] = (byYear[yFrom][cFrom] || 0) + a
-    // }
+  const fromYear = Number(matrix.from_year)
+  const toYear = Number(matrix.to_year)
+  byYear[fromYear] = {}
+  byYear[toYear] = byYear[toYear] || {}
+  matrix.classes.forEach((fromCode, i) => {
+    matrix.classes.forEach((toCode, j) => {
+      const a = matrix.area_km2[i][j]
+      // Class 0 is No Data
+      if (fromCode) byYear[fromYear][fromCode] = (byYear[fromYear][fromCode] || 0) + a
+      if (toCode) byYear[toYear][toCode] = (byYear[toYear][toCode] || 0) + a
+    })
+  })
+  // Same year on both sides: every pixel was counted twice
+  if (fromYear === toYear) {
+    for (const code of Object.keys(byYear[fromYear])) byYear[fromYear][Number(code)] /= 2
   }
   return byYear
 }
@@ -93,13 +75,13 @@ function compareYearAreas(a: Record<number, number> | undefined, b: Record<numbe
 }
 
 export default function YearDeltaStats({
-  classChangesData,
+  apiBase,
   years,
   defaultFrom,
   defaultTo,
   geoDataByYear,
 }: {
-  classChangesData: FC
+  apiBase: string
   years: number[]
   defaultFrom: number
   defaultTo: number
@@ -108,9 +90,28 @@ export default function YearDeltaStats({
   const [fromYear, setFromYear] = useState<string>(defaultFrom?.toString() ?? years[0]?.toString() ?? "")
   const [toYear, setToYear] = useState<string>(defaultTo?.toString() ?? years.at(-1)?.toString() ?? "")
 
+  const [matrix, setMatrix] = useState<TransitionMatrix | null>(null)
+
+  useEffect(() => {
+    if (!fromYear || !toYear) return
+    const controller = new AbortController()
+    fetch(`${apiBase}/raster/transitions?from=${fromYear}&to=${toYear}`, { signal: controller.signal })
+      .then((res) => {
+        if (!res.ok) throw new Error(`Failed to fetch transitions ${fromYear} -> ${toYear}`)
+        return res.json()
+      })
+      .then(setMatrix)
+      .catch((err) => {
+        if (err.name === "AbortError") return
+        console.error(err)
+        setMatrix(null)
+      })
+    return () => controller.abort()
+  }, [apiBase, fromYear, toYear])
+
   const yearClassAreas = useMemo(() => {
-    const built = buildYearClassAreas(classChangesData)
-    // If we detected no years in class_changes, fall back to computing from per-year GeoJSONs
+    const built = yearClassAreasFromMatrix(matrix)
+    // If the transition matrix is unavailable, fall back to computing from per-year GeoJSONs
     const hasAnyYear = Object.keys(built).length > 0
     if (hasAnyYear || !geoDataByYear) return built
     const byYear: Record<number, Record<number, number>> = {}
@@ -126,7 +127,7 @@ export default function YearDeltaStats({
       }
     }
     return byYear
-  }, [classChangesData, geoDataByYear, years])
+  }, [matrix, geoDataByYear, years])
   const deltas = useMemo(
     () => compareYearAreas(yearClassAreas[Number(fromYear)], yearClassAreas[Number(toYear)]),
     [yearClassAreas, fromYear, toYear],
@@ -0,0 +1,65 @@
+"""
+Backfill the `lulc_class_histograms` table for rasters imported before it existed
+(or recompute stale ones after a re-import).
+
+    python scripts/backfill_histograms.py            # years without an up-to-date histogram
+    python scripts/backfill_histograms.py --year 2020 --force
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import psycopg2
+
+# Reuse project settings for DB credentials
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.config.settings import settings  # noqa: E402
+from app.infrastructure.raster.catalog import RasterCatalog  # noqa: E402
+from app.infrastructure.raster.histograms import (  # noqa: E402
+    ensure_histogram_table,
+    compute_histogram,
+    load_histogram,
+)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compute per-year LULC class histograms from the PostGIS rasters.")
+    ap.add_argument("--year", action="append", help="Only this year (repeatable); default: all catalogued years")
+    ap.add_argument("--force", action="store_true", help="Recompute even if an up-to-date histogram exists")
+    args = ap.parse_args()
+
+    conn = psycopg2.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+    )
+    try:
+        ensure_histogram_table(conn)
+        conn.commit()
+
+        entries = RasterCatalog(ttl=0).entries(conn)
+        years = args.year or sorted(entries)
+        computed = 0
+        for year in years:
+            entry = entries.get(year)
+            if entry is None:
+                print(f"Skip {year}: no raster table in catalog")
+                continue
+            if not args.force and load_histogram(conn, year, entry.checksum) is not None:
+                print(f"Skip {year}: histogram up to date")
+                continue
+            classes = compute_histogram(conn, year, entry.raster_table, entry.checksum)
+            conn.commit()
+            computed += 1
+            print(f"{year}: {classes} classes from public.{entry.raster_table}")
+
+        print(f"Done. Histograms computed: {computed}. Years considered: {len(years)}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
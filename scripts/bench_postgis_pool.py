@@ -0,0 +1,112 @@
+"""
+Benchmark raster-style PostGIS requests with a fresh connection per request
+(the old `get_postgres_connection()` behaviour) versus the shared connection pool.
+
+Each simulated request runs the same catalog lookup + tile count the raster
+router does. Run against a local PostGIS with the rasters seeded:
+
+    python scripts/bench_postgis_pool.py --requests 500 --concurrency 16
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import psycopg2
+
+# Reuse project settings for DB credentials
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.config.settings import settings  # noqa: E402
+from app.infrastructure.db.postgis_pool import PostgisConnectionPool  # noqa: E402
+
+
+def connect_kwargs():
+    return dict(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+    )
+
+
+def simulated_request(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = 'public'
+              AND (table_name LIKE '%islamabad%' OR table_name LIKE '%lulc%')
+            ORDER BY table_name;
+            """
+        )
+        tables = [row[0] for row in cur.fetchall()]
+        if tables:
+            cur.execute(f'SELECT COUNT(*) FROM "{tables[0]}";')
+            cur.fetchone()
+    conn.rollback()
+
+
+def fresh_connection_request() -> None:
+    conn = psycopg2.connect(**connect_kwargs())
+    try:
+        simulated_request(conn)
+    finally:
+        conn.close()
+
+
+def run(label: str, fn, requests: int, concurrency: int) -> float:
+    latencies = []
+
+    def timed(_):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    rps = requests / elapsed
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label:<18} {rps:9.1f} req/s   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms")
+    return rps
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare per-request connections with the PostGIS pool.")
+    ap.add_argument("--requests", type=int, default=500, help="Requests per scenario (default: 500)")
+    ap.add_argument("--concurrency", type=int, default=16, help="Concurrent client threads (default: 16)")
+    ap.add_argument("--pool-max", type=int, default=settings.POSTGIS_POOL_MAX_SIZE, help="Pool max size")
+    args = ap.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, pool max {args.pool_max}")
+    before = run("connect/request", fresh_connection_request, args.requests, args.concurrency)
+
+    pool = PostgisConnectionPool(
+        min_size=min(settings.POSTGIS_POOL_MIN_SIZE, args.pool_max),
+        max_size=args.pool_max,
+        timeout=settings.POSTGIS_POOL_TIMEOUT,
+        max_idle=settings.POSTGIS_POOL_MAX_IDLE,
+        **connect_kwargs(),
+    )
+
+    def pooled_request():
+        with pool.connection() as conn:
+            simulated_request(conn)
+
+    try:
+        after = run("pooled", pooled_request, args.requests, args.concurrency)
+        print(f"Speedup: {after / before:.2f}x")
+        print(f"Pool stats: {pool.stats()}")
+    finally:
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
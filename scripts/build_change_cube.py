@@ -0,0 +1,53 @@
+"""
+Build the multi-year LULC change cube from the GeoTIFFs in RASTER_DIR: every
+consecutive transition matrix plus per-pixel first-change year and number of
+changes, persisted to CHANGE_CUBE_DIR and served by GET /raster/change-cube.
+
+    python scripts/build_change_cube.py
+    python scripts/build_change_cube.py --year 2017 --year 2020 --year 2024 --block-rows 512
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Reuse project settings for raster paths
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.config.settings import settings  # noqa: E402
+from app.infrastructure.raster.change_cube import build_change_cube, load_change_cube, is_stale  # noqa: E402
+from app.infrastructure.raster.local_engine import LocalRasterEngine  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compute consecutive-year LULC transitions and per-pixel change layers in one pass.")
+    ap.add_argument("--year", action="append", help="Only these years (repeatable); default: every GeoTIFF in RASTER_DIR")
+    ap.add_argument("--raster-dir", default=settings.RASTER_DIR)
+    ap.add_argument("--out-dir", default=settings.CHANGE_CUBE_DIR)
+    ap.add_argument("--block-rows", type=int, default=256, help="Raster rows stacked per pass step")
+    ap.add_argument("--force", action="store_true", help="Rebuild even if the persisted cube is up to date")
+    args = ap.parse_args()
+
+    files = LocalRasterEngine(args.raster_dir).files()
+    missing = [y for y in (args.year or []) if y not in files]
+    if missing:
+        print(f"No GeoTIFF for year(s): {', '.join(missing)}")
+        return 1
+    paths = {y: files[y] for y in (args.year or files)}
+
+    existing = load_change_cube(args.out_dir)
+    if existing is not None and not args.force and not is_stale(existing, paths):
+        print(f"Change cube in {args.out_dir} is up to date (built {existing.built_at})")
+        return 0
+
+    started = time.perf_counter()
+    cube = build_change_cube(paths, Path(args.out_dir), block_rows=args.block_rows)
+    changed = sum(c for n, c in cube.change_count_counts.items() if n > 0)
+    print(
+        f"Built change cube for {', '.join(cube.years)} in {time.perf_counter() - started:.1f}s: "
+        f"{len(cube.transitions)} transition matrices, {changed} pixels changed at least once -> {args.out_dir}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Build the pre-simplified class polygons (`lulc_class_tiers`, one copy per zoom tier) for
+years whose polygons were built before the tiers existed, or were loaded straight into
+`lulc_classes_all_years`. New builds (`run_job_worker.py`) write their tiers themselves.
+
+    python scripts/build_class_tiers.py              # years without tiers
+    python scripts/build_class_tiers.py --year 2020 --force
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import psycopg2
+
+# Reuse project settings for DB credentials
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.config.settings import settings  # noqa: E402
+from app.infrastructure.raster.catalog import RasterCatalog, ALL_YEARS_TABLE  # noqa: E402
+from app.infrastructure.raster.class_tiers import TIER_ZOOMS, build_class_tiers, has_tiers  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Precompute simplified LULC class polygons per zoom tier.")
+    ap.add_argument("--year", action="append", help="Only this year (repeatable); default: all catalogued years")
+    ap.add_argument("--force", action="store_true", help="Rebuild even if the year already has tiers")
+    args = ap.parse_args()
+
+    conn = psycopg2.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+    )
+    try:
+        entries = RasterCatalog(ttl=0).entries(conn)
+        years = args.year or sorted(entries)
+        built = 0
+        for year in years:
+            entry = entries.get(year)
+            if entry is None:
+                print(f"Skip {year}: no raster table in catalog")
+                continue
+            if not args.force and has_tiers(conn, year):
+                print(f"Skip {year}: tiers already built")
+                continue
+            if entry.vector_table:
+                source, year_column = entry.vector_table, None
+            elif "classes_all_years" in entry.precomputed_tables:
+                source, year_column = ALL_YEARS_TABLE, "year"
+            else:
+                print(f"Skip {year}: no class polygons yet (run scripts/run_job_worker.py --enqueue-missing)")
+                continue
+            rows = build_class_tiers(conn, year, source, year_column)
+            conn.commit()
+            built += 1
+            print(f"{year}: {rows} rows ({len(TIER_ZOOMS)} tiers) from public.{source}")
+
+        print(f"Done. Years built: {built}. Years considered: {len(years)}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""
+Write Cloud-Optimized GeoTIFF copies (internal MODE overviews) of the rasters in
+RASTER_DIR to COG_DIR. `seed_rasters_auto.py` does this on ingest; this script is
+for deployments running the local raster engine without PostGIS.
+
+    python scripts/build_cogs.py            # missing or outdated copies only
+    python scripts/build_cogs.py --force
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Reuse project settings for raster paths
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.config.settings import settings  # noqa: E402
+from app.infrastructure.raster.cog import cog_path, ensure_cog, make_cog  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Build COG copies with overviews of the LULC GeoTIFFs.")
+    ap.add_argument("--raster-dir", default=settings.RASTER_DIR)
+    ap.add_argument("--cog-dir", default=settings.COG_DIR)
+    ap.add_argument("--force", action="store_true", help="Rebuild even if the copy is up to date")
+    args = ap.parse_args()
+
+    tif_files = sorted(Path(args.raster_dir).glob("*.tif"))
+    if not tif_files:
+        print(f"No .tif files found in {args.raster_dir}")
+        return 1
+
+    built = 0
+    for tif in tif_files:
+        started = time.perf_counter()
+        if args.force:
+            out = make_cog(tif, cog_path(Path(args.cog_dir), tif))
+        else:
+            out = ensure_cog(tif, Path(args.cog_dir))
+        if out is None:
+            print(f"Skip (up to date): {tif.name}")
+            continue
+        built += 1
+        print(f"{tif.name} -> {out} ({time.perf_counter() - started:.1f}s)")
+
+    print(f"Done. COGs built: {built}. Files scanned: {len(tif_files)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
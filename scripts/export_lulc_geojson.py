@@ -1,6 +1,9 @@
 import os
 import sys
 import json
+import argparse
+import subprocess
+import tempfile
 from urllib.parse import urlparse
 import psycopg2
 
@@ -10,6 +13,7 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from app.config.settings import settings
+from app.infrastructure.exports.assets import publish_asset, publish_existing
 
 
 def get_connection_params():
@@ -46,7 +50,49 @@ def get_connection_params():
     }
 
 
-def export_geojson(output_dir: str = "geojson_exports") -> None:
+# Binary formats: ogr2ogr driver and layer creation options. Both get one row per polygon
+# (not per class multipolygon) so bbox reads only touch the features they need:
+# FlatGeobuf through its packed R-tree, GeoParquet through per-row bbox covering columns
+# and small row groups sorted by bbox (GDAL >= 3.9).
+BINARY_FORMATS = {
+    "fgb": ("FlatGeobuf", ["SPATIAL_INDEX=YES"]),
+    "parquet": ("Parquet", ["COMPRESSION=ZSTD", "WRITE_COVERING_BBOX=YES", "SORT_BY_BBOX=YES", "ROW_GROUP_SIZE=4096"]),
+}
+
+
+def pg_datasource() -> str:
+    params = get_connection_params()
+    return (
+        f"PG:host={params['host']} port={params['port']} dbname={params['dbname']} "
+        f"user={params['user']} password={params['password']}"
+    )
+
+
+def export_binary(year, fmt: str, output_dir: str, tolerance: float) -> dict:
+    """ogr2ogr one year's class polygons to FlatGeobuf / GeoParquet and publish it content-hashed"""
+    driver, creation_options = BINARY_FORMATS[fmt]
+    query = (
+        "SELECT class_code AS code, year::int AS year, "
+        f"(ST_Dump(ST_SimplifyPreserveTopology(geom, {float(tolerance)}))).geom::geometry(Polygon, 4326) AS geom "
+        f"FROM lulc_classes_all_years WHERE year::text = '{int(year)}' AND class_code <> 0"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, f"lulc_classes_{year}.{fmt}")
+        cmd = ["ogr2ogr", "-f", driver, out_path, pg_datasource(), "-sql", query, "-nln", f"lulc_classes_{year}"]
+        for option in creation_options:
+            cmd.extend(["-lco", option])
+        subprocess.check_call(cmd)
+        with open(out_path, "rb") as f:
+            body = f.read()
+    # Binary formats are read with Range requests: served as is, never precompressed
+    return publish_asset(output_dir, f"lulc_classes_{year}.{fmt}", body, precompress=False)
+
+
+def export_geojson(
+    output_dir: str = settings.GEOJSON_DIR,
+    formats=("geojson",),
+    tolerance: float = 0.001,
+) -> None:
     os.makedirs(output_dir, exist_ok=True)
 
     conn = psycopg2.connect(**get_connection_params())
@@ -58,6 +104,17 @@ def export_geojson(output_dir: str = "geojson_exports") -> None:
 
         for year in years:
             print(f"Exporting {year}...")
+            for fmt in formats:
+                if fmt in BINARY_FORMATS:
+                    try:
+                        asset = export_binary(year, fmt, output_dir, tolerance)
+                    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                        # ogr2ogr missing, or GDAL built without the driver: keep the other formats going
+                        print(f"Skipped {fmt} for {year}: {e}", file=sys.stderr)
+                        continue
+                    print(f"Saved: {os.path.join(output_dir, asset['file'])}")
+            if "geojson" not in formats:
+                continue
             cur.execute(
                 """
                 SELECT jsonb_build_object(
@@ -65,7 +122,7 @@ def export_geojson(output_dir: str = "geojson_exports") -> None:
                     'features', jsonb_agg(
                         jsonb_build_object(
                             'type', 'Feature',
-                            'geometry', ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, 0.001))::jsonb,
+                            'geometry', ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, %s))::jsonb,
                             'properties', jsonb_build_object(
                                 'code', class_code,
                                 'year', year
@@ -76,21 +133,49 @@ def export_geojson(output_dir: str = "geojson_exports") -> None:
                 FROM lulc_classes_all_years
                 WHERE year = %s AND class_code <> 0;
                 """,
-                (year,),
+                (tolerance, year),
             )
             geojson = cur.fetchone()[0]
 
-            out_path = os.path.join(output_dir, f"lulc_classes_{year}.geojson")
-            with open(out_path, "w", encoding="utf-8") as f:
-                json.dump(geojson, f, ensure_ascii=False)
+            # Content-hashed file + manifest entry; lulc_classes_{year}.geojson stays as an alias
+            body = json.dumps(geojson, ensure_ascii=False).encode("utf-8")
+            asset = publish_asset(output_dir, f"lulc_classes_{year}.geojson", body)
 
-            print(f"Saved: {out_path}")
+            print(f"Saved: {os.path.join(output_dir, asset['file'])}")
     finally:
         cur.close()
         conn.close()
 
+    # Other GeoJSON in the directory (e.g. the pakistan.geojson boundary) gets hashed too
+    publish_existing(output_dir)
+
 
 if __name__ == "__main__":
-    export_geojson()
+    parser = argparse.ArgumentParser(
+        description="Export per-year LULC class polygons as content-hashed GeoJSON, FlatGeobuf and GeoParquet"
+    )
+    parser.add_argument("--output-dir", default=settings.GEOJSON_DIR)
+    parser.add_argument(
+        "--formats",
+        default="geojson",
+        help="Comma-separated subset of geojson, fgb, parquet (default geojson; binary formats need ogr2ogr, "
+        "GeoParquet needs GDAL built with Arrow)",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.001, help="Simplification tolerance in degrees")
+    parser.add_argument(
+        "--publish-existing",
+        action="store_true",
+        help="Only hash the GeoJSON files already in the output directory and write the manifest (no database)",
+    )
+    args = parser.parse_args()
+    if args.publish_existing:
+        for name, asset in publish_existing(args.output_dir).items():
+            print(f"{name} -> {asset['file']}")
+    else:
+        formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+        unknown = set(formats) - {"geojson", *BINARY_FORMATS}
+        if unknown:
+            parser.error(f"Unknown format(s): {', '.join(sorted(unknown))}")
+        export_geojson(args.output_dir, formats, args.tolerance)
 
 
@@ -0,0 +1,82 @@
+"""
+Load test: does a slow vectorization request stall `/raster/summary`?
+
+Measures `/raster/summary` latency on an idle server, then again while
+`--slow-clients` concurrent requests hammer a slow vectorization endpoint
+(`/raster/{year}/classes-geojson` by default). With raster SQL running on
+bounded worker threads the two latency distributions should stay close;
+with blocking queries on the event loop the second one explodes.
+
+    uvicorn main:app --port 8000
+    python scripts/loadtest_raster_latency.py --base-url http://127.0.0.1:8000 --year 2024
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def sample_latency(client: httpx.AsyncClient, path: str, samples: int, interval: float) -> list:
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        res = await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        res.raise_for_status()
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def hammer(client: httpx.AsyncClient, path: str, stop: asyncio.Event) -> int:
+    done = 0
+    while not stop.is_set():
+        await client.get(path, timeout=None)
+        done += 1
+    return done
+
+
+def describe(label: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+    print(
+        f"{label:<28} n={len(latencies):<4} p50 {statistics.median(latencies):8.1f} ms"
+        f"   p95 {p95:8.1f} ms   max {latencies[-1]:8.1f} ms"
+    )
+
+
+async def main(args) -> None:
+    fast_path = "/raster/summary"
+    slow_path = args.slow_path.format(year=args.year)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        # Warm up the connection pool and any precomputed tables
+        await client.get(fast_path)
+        await client.get(slow_path, timeout=None)
+
+        idle = await sample_latency(client, fast_path, args.samples, args.interval)
+
+        stop = asyncio.Event()
+        slow_tasks = [asyncio.create_task(hammer(client, slow_path, stop)) for _ in range(args.slow_clients)]
+        await asyncio.sleep(0.5)
+        loaded = await sample_latency(client, fast_path, args.samples, args.interval)
+        stop.set()
+        slow_done = sum(await asyncio.gather(*slow_tasks))
+
+    describe(f"{fast_path} (idle)", idle)
+    describe(f"{fast_path} (under load)", loaded)
+    print(f"Slow requests completed meanwhile: {slow_done} x {slow_path}")
+    ratio = statistics.median(loaded) / statistics.median(idle)
+    print(f"Median slowdown under load: {ratio:.2f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Check that slow raster requests do not stall /raster/summary.")
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000", help="API base URL")
+    ap.add_argument("--year", default="2024", help="Year used by the slow endpoint")
+    ap.add_argument("--slow-path", default="/raster/{year}/classes-geojson", help="Slow endpoint path template")
+    ap.add_argument("--slow-clients", type=int, default=8, help="Concurrent slow requests (default: 8)")
+    ap.add_argument("--samples", type=int, default=50, help="Latency samples per phase (default: 50)")
+    ap.add_argument("--interval", type=float, default=0.05, help="Seconds between samples (default: 0.05)")
+    asyncio.run(main(ap.parse_args()))
@@ -1,22 +1,14 @@
 #!/usr/bin/env python3
 import argparse
+import sys
 from pathlib import Path
 
 import geopandas as gpd
 import matplotlib.pyplot as plt
 
-# LULC colors (same as mapanalysis), EXCLUDING class 0
-LULC_COLORS = {
-  1: "#419bdf",  # Water
-  2: "#397d49",  # Trees
-  4: "#7a87c6",  # Flooded Vegetation
-  5: "#e49635",  # Crops
-  7: "#c4281b",  # Built Area
-  8: "#a59b8f",  # Bare Ground
-  9: "#a8ebff",  # Snow/Ice
-  10: "#616161", # Clouds
-  11: "#e3e2c3", # Rangeland
-}
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.domain.value_objects.lulc_palette import LULC_COLORS, UNKNOWN_CLASS_COLOR  # noqa: E402
+
 
 def main():
   ap = argparse.ArgumentParser(description="Render lulc_classes_2024.geojson to a JPG with app colors (excluding class 0).")
@@ -43,7 +35,7 @@ def main():
 
   # Prepare color column
   def color_for(code: int) -> str:
-    return LULC_COLORS.get(int(code), "#d9d9d9")
+    return LULC_COLORS.get(int(code), UNKNOWN_CLASS_COLOR)
 
   gdf = gdf.assign(_color=gdf["code"].apply(color_for))
 
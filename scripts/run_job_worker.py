@@ -0,0 +1,111 @@
+"""
+Background worker for the `raster_jobs` queue (e.g. per-year class polygon builds
+queued after ingest or by GET /raster/{year}/classes-geojson, per-feature class
+histograms of imported boundary layers). Several workers may run side by side:
+jobs are claimed with FOR UPDATE SKIP LOCKED.
+
+    python scripts/run_job_worker.py                   # run until interrupted
+    python scripts/run_job_worker.py --once            # drain the queue, then exit
+    python scripts/run_job_worker.py --enqueue-missing # queue missing polygon builds / boundary histograms
+"""
+import argparse
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import psycopg2
+
+# Reuse project settings for DB credentials
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from app.config.settings import settings  # noqa: E402
+from app.infrastructure.jobs.handlers import BOUNDARY_HISTOGRAMS, JOB_HANDLERS, VECTORIZE_CLASSES  # noqa: E402
+from app.infrastructure.jobs.queue import (  # noqa: E402
+    claim_job,
+    enqueue_job,
+    finish_job,
+    requeue_stale_jobs,
+)
+from app.infrastructure.raster.boundary_stats import boundary_layers, stale_pairs  # noqa: E402
+from app.infrastructure.raster.catalog import RasterCatalog, raster_catalog  # noqa: E402
+
+
+def connect_pg():
+    return psycopg2.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+    )
+
+
+def enqueue_missing(conn) -> int:
+    queued = 0
+    entries = RasterCatalog(ttl=0).entries(conn)
+    for year, entry in sorted(entries.items()):
+        if entry.vector_table is None:
+            job = enqueue_job(conn, VECTORIZE_CLASSES, year)
+            print(f"{year}: job {job['id']} {job['status']}")
+            queued += 1
+    # Boundary layers with a (layer, year) histogram missing or computed from older data
+    for layer in sorted({layer for layer, _ in stale_pairs(conn, entries, boundary_layers(conn))}):
+        job = enqueue_job(conn, BOUNDARY_HISTOGRAMS, layer)
+        print(f"{layer}: job {job['id']} {job['status']}")
+        queued += 1
+    conn.commit()
+    return queued
+
+
+def run_job(conn, job: dict) -> None:
+    handler = JOB_HANDLERS.get(job["kind"])
+    started = time.perf_counter()
+    print(f"Job {job['id']} {job['kind']}:{job['key']} (attempt {job['attempts']}) ...")
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        handler(conn, job)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        traceback.print_exc()
+        finish_job(conn, job["id"], error=f"{type(e).__name__}: {e}")
+        print(f"Job {job['id']} failed after {time.perf_counter() - started:.1f}s")
+        return
+    finish_job(conn, job["id"])
+    raster_catalog.invalidate()
+    print(f"Job {job['id']} done in {time.perf_counter() - started:.1f}s")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Process queued raster jobs.")
+    ap.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    ap.add_argument("--kind", action="append", help="Only claim jobs of this kind (repeatable)")
+    ap.add_argument("--enqueue-missing", action="store_true", help="Queue class polygon builds and boundary histograms that are missing or stale, then exit")
+    args = ap.parse_args()
+
+    conn = connect_pg()
+    try:
+        if args.enqueue_missing:
+            print(f"Queued: {enqueue_missing(conn)}")
+            return 0
+
+        while True:
+            stale = requeue_stale_jobs(conn, settings.JOB_STALE_AFTER)
+            if stale:
+                print(f"Requeued {stale} stale job(s)")
+            job = claim_job(conn, args.kind)
+            if job is None:
+                if args.once:
+                    return 0
+                time.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+            run_job(conn, job)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
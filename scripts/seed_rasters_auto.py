@@ -1,21 +1,44 @@
+"""
+Import the GeoTIFFs in raster/ into PostGIS, skipping files already recorded in the
+`raster_imports` ledger.
+
+Checksums are computed in parallel, then up to --workers rasters are imported at once.
+Each worker keeps one connection and loads raster2pgsql's COPY output through it
+(app/infrastructure/raster/raster2pgsql.py). The tables, ledger row, class histogram
+and polygon build job of a file are committed together, so a failed import leaves
+nothing behind. Per-file timings are printed at the end (--timings-json to save them).
+
+    python scripts/seed_rasters_auto.py --workers 4
+"""
+import argparse
+import json
 import os
 import sys
 import hashlib
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
+from typing import Dict, List, Optional
 import psycopg2
-from psycopg2.extras import RealDictCursor
 
 # Reuse project settings for DB credentials
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from app.config.settings import settings  # noqa: E402
+from app.infrastructure.raster.catalog import raster_catalog, YEAR_SUFFIX  # noqa: E402
+from app.infrastructure.raster.histograms import ensure_histogram_table, compute_histogram  # noqa: E402
+from app.infrastructure.jobs.handlers import BOUNDARY_HISTOGRAMS, VECTORIZE_CLASSES  # noqa: E402
+from app.infrastructure.raster.boundary_stats import boundary_layers  # noqa: E402
+from app.infrastructure.jobs.queue import enqueue_job, ensure_job_table  # noqa: E402
+from app.infrastructure.raster.cog import OVERVIEW_FACTORS, ensure_cog  # noqa: E402
+from app.infrastructure.raster.raster2pgsql import load_raster2pgsql, raster2pgsql_command  # noqa: E402
+from app.infrastructure.cache.checksum_cache import ChecksumCache  # noqa: E402
 
 
 RASTER_DIR = Path(__file__).resolve().parents[1] / "raster"
 
-# Allow overriding paths via env vars; otherwise assume tools are on PATH
-PSQL_PATH = os.getenv("PSQL_PATH", "psql")
-RASTER2PGSQL_PATH = os.getenv("RASTER2PGSQL_PATH", "raster2pgsql")
 
 
 def get_pg_env():
@@ -26,19 +49,6 @@ def get_pg_env():
     return env
 
 
-def get_psql_base_args():
-    return [
-        "-h",
-        str(settings.POSTGRES_HOST or "localhost"),
-        "-p",
-        str(settings.POSTGRES_PORT or 5432),
-        "-U",
-        str(settings.POSTGRES_USER or "postgres"),
-        "-d",
-        str(settings.POSTGRES_DB or "postgres"),
-    ]
-
-
 def connect_pg():
     return psycopg2.connect(
         host=settings.POSTGRES_HOST,
@@ -49,36 +59,27 @@ def connect_pg():
     )
 
 
-def enable_postgis():
-    conn = connect_pg()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
-            cur.execute("CREATE EXTENSION IF NOT EXISTS postgis_raster;")
-        conn.commit()
-    finally:
-        conn.close()
-
-
-def ensure_tracking_table():
-    conn = connect_pg()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS raster_imports (
-                    id SERIAL PRIMARY KEY,
-                    filename TEXT NOT NULL,
-                    checksum TEXT NOT NULL,
-                    table_name TEXT NOT NULL,
-                    created_at TIMESTAMPTZ DEFAULT NOW(),
-                    UNIQUE(filename, checksum)
-                );
-                """
-            )
-        conn.commit()
-    finally:
-        conn.close()
+def prepare_database(conn) -> None:
+    """Extensions and bookkeeping tables (committed)"""
+    with conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
+        cur.execute("CREATE EXTENSION IF NOT EXISTS postgis_raster;")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS raster_imports (
+                id SERIAL PRIMARY KEY,
+                filename TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT NOW(),
+                UNIQUE(filename, checksum)
+            );
+            """
+        )
+    ensure_histogram_table(conn)
+    conn.commit()
+    # Commits itself; done up front so it never ends an import transaction early
+    ensure_job_table(conn)
 
 
 def file_checksum(path: Path, chunk_size: int = 1024 * 1024) -> str:
@@ -92,52 +93,38 @@ def file_checksum(path: Path, chunk_size: int = 1024 * 1024) -> str:
     return sha.hexdigest()
 
 
-def table_exists(table_name: str) -> bool:
-    conn = connect_pg()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT EXISTS (
-                    SELECT 1 FROM information_schema.tables
-                    WHERE table_schema = 'public' AND table_name = %s
-                );
-                """,
-                (table_name,),
-            )
-            return cur.fetchone()[0]
-    finally:
-        conn.close()
+@dataclass
+class FileResult:
+    filename: str
+    table_name: str
+    status: str = "pending"  # imported | skipped | failed
+    detail: str = ""
+    # Seconds per stage: checksum, cog, load (raster2pgsql + COPY), histogram, total
+    timings: Dict[str, float] = field(default_factory=dict)
 
 
-def has_been_imported(filename: str, checksum: str) -> bool:
-    conn = connect_pg()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT 1 FROM raster_imports WHERE filename = %s AND checksum = %s LIMIT 1;",
-                (filename, checksum),
-            )
-            return cur.fetchone() is not None
-    finally:
-        conn.close()
+class WorkerConnections:
+    """One connection per worker thread, reused for every file that worker imports"""
 
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List = []
 
-def record_import(filename: str, checksum: str, table_name: str) -> None:
-    conn = connect_pg()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO raster_imports (filename, checksum, table_name)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (filename, checksum) DO NOTHING;
-                """,
-                (filename, checksum, table_name),
-            )
-        conn.commit()
-    finally:
-        conn.close()
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = connect_pg()
+            self._local.conn = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
 
 
 def sanitize_table_name(stem: str) -> str:
@@ -149,58 +136,187 @@ def sanitize_table_name(stem: str) -> str:
     return safe
 
 
-def import_raster(tif_path: Path) -> bool:
-    """Run raster2pgsql -> psql pipeline. Returns True if imported, False if skipped."""
-    filename = tif_path.name
-    checksum = file_checksum(tif_path)
-    table_name = sanitize_table_name(tif_path.stem)
-
-    if has_been_imported(filename, checksum):
-        print(f"Skip (already imported): {filename}")
-        return False
+def already_imported(cur, filename: str, checksum: str, table_name: str) -> Optional[str]:
+    """Why the file needs no import (ledger row or existing table), or None"""
+    cur.execute(
+        """
+        SELECT
+            EXISTS (SELECT 1 FROM raster_imports WHERE filename = %s AND checksum = %s),
+            to_regclass(%s) IS NOT NULL;
+        """,
+        (filename, checksum, f"public.{table_name}"),
+    )
+    in_ledger, table_exists = cur.fetchone()
+    if in_ledger:
+        return "already imported"
+    if table_exists:
+        return f"table public.{table_name} exists"
+    return None
+
+
+def import_raster(conn, tif_path: Path, checksum: str, result: FileResult, build_cog: bool = True) -> None:
+    """
+    Import one GeoTIFF in a single transaction: raster + overview tables (COPY), ledger
+    row, class histogram and the queued polygon build are committed together.
+    """
+    filename, table_name = tif_path.name, result.table_name
+
+    if build_cog:
+        started = time.perf_counter()
+        if ensure_cog(tif_path, Path(settings.COG_DIR)):
+            result.detail = f"COG: {Path(settings.COG_DIR) / tif_path.name}; "
+        result.timings["cog"] = time.perf_counter() - started
 
-    if table_exists(table_name):
-        print(f"Skip (table exists): public.{table_name}")
-        return False
+    try:
+        with conn.cursor() as cur:
+            # Serialize concurrent seeders on the same table, then re-check under the lock
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (f"raster_import:{table_name}",))
+            reason = already_imported(cur, filename, checksum, table_name)
+            if reason:
+                conn.rollback()
+                result.status, result.detail = "skipped", result.detail + reason
+                return
+
+            started = time.perf_counter()
+            # -l: overview tables (o_<factor>_<table>) for zoomed-out reads
+            cmd = raster2pgsql_command(tif_path, f"public.{table_name}", overview_factors=OVERVIEW_FACTORS)
+            copies = load_raster2pgsql(conn, cmd, env=get_pg_env())
+            result.timings["load"] = time.perf_counter() - started
 
-    # Build command; on Windows the pipe is easier through shell
-    psql_args = " ".join(get_psql_base_args())
-    cmd = (
-        f'"{RASTER2PGSQL_PATH}" -s 4326 -I -C -M "{tif_path}" public.{table_name} '
-        f'| "{PSQL_PATH}" {psql_args}'
-    )
+            cur.execute(
+                """
+                INSERT INTO raster_imports (filename, checksum, table_name)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (filename, checksum) DO NOTHING;
+                """,
+                (filename, checksum, table_name),
+            )
 
-    print(f"Importing {filename} -> public.{table_name} ...")
-    subprocess.run(cmd, shell=True, check=True, env=get_pg_env())
-    record_import(filename, checksum, table_name)
-    print(f"Imported: {filename}")
-    return True
+            match = YEAR_SUFFIX.search(table_name)
+            if match:
+                started = time.perf_counter()
+                classes = compute_histogram(conn, match.group(1), table_name, checksum)
+                result.timings["histogram"] = time.perf_counter() - started
+                job = enqueue_job(conn, VECTORIZE_CLASSES, match.group(1), {"rebuild": True})
+                # The year's boundary histograms are now stale: the jobs recompute only changed pairs
+                for layer in boundary_layers(conn):
+                    enqueue_job(conn, BOUNDARY_HISTOGRAMS, layer)
+                result.detail += f"{copies} COPY blocks, {classes} classes, polygon job {job['id']}"
+            else:
+                result.detail += f"{copies} COPY blocks (no year in table name: no histogram)"
+        conn.commit()
+        result.status = "imported"
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def checksum_files(
+    paths: List[Path], workers: int, results: Dict[Path, FileResult], cache: Optional[ChecksumCache] = None
+) -> Dict[Path, str]:
+    """
+    sha256 of every file, `workers` files at a time (hashlib releases the GIL);
+    files unchanged since the last run come from the checksum cache without being read
+    """
+    def timed(path: Path):
+        started = time.perf_counter()
+        digest = cache.digest(path) if cache is not None else file_checksum(path)
+        results[path].timings["checksum"] = time.perf_counter() - started
+        return path, digest
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(pool.map(timed, paths))
+
+
+def print_report(results: List[FileResult]) -> None:
+    stages = ["checksum", "cog", "load", "histogram", "total"]
+    print()
+    print(f"{'file':<40} {'status':<9} " + " ".join(f"{s:>9}" for s in stages))
+    for r in results:
+        cells = " ".join(f"{r.timings[s]:>8.2f}s" if s in r.timings else f"{'-':>9}" for s in stages)
+        print(f"{r.filename:<40} {r.status:<9} {cells}")
+        if r.status == "failed":
+            print(f"    {r.detail}")
 
 
 def main():
-    if not RASTER_DIR.exists():
-        print(f"Raster directory not found: {RASTER_DIR}")
-        sys.exit(1)
+    ap = argparse.ArgumentParser(description="Import GeoTIFFs into PostGIS (parallel, incremental).")
+    ap.add_argument("--dir", default=str(RASTER_DIR), help="Directory of .tif files")
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Rasters imported concurrently")
+    ap.add_argument("--checksum-workers", type=int, default=os.cpu_count() or 1, help="Files hashed concurrently")
+    ap.add_argument("--no-cog", action="store_true", help="Do not build the COG copies")
+    ap.add_argument("--no-checksum-cache", action="store_true", help="Re-hash every file (ignore <dir>/.checksums.json)")
+    ap.add_argument(
+        "--fast-prefilter",
+        action="store_true",
+        help="When a file's stat changed but not its size, confirm it with a fast hash before re-hashing with SHA-256",
+    )
+    ap.add_argument("--timings-json", help="Also write the per-file results and timings to this file")
+    args = ap.parse_args()
 
-    enable_postgis()
-    ensure_tracking_table()
+    raster_dir = Path(args.dir)
+    if not raster_dir.exists():
+        print(f"Raster directory not found: {raster_dir}")
+        sys.exit(1)
 
-    tif_files = sorted(RASTER_DIR.glob("*.tif"))
+    tif_files = sorted(raster_dir.glob("*.tif"))
     if not tif_files:
         print("No .tif files found in raster directory.")
         return
 
-    imported = 0
-    for tif in tif_files:
+    conn = connect_pg()
+    try:
+        prepare_database(conn)
+    finally:
+        conn.close()
+
+    run_started = time.perf_counter()
+    results = {tif: FileResult(filename=tif.name, table_name=sanitize_table_name(tif.stem)) for tif in tif_files}
+    cache = None if args.no_checksum_cache else ChecksumCache.for_directory(raster_dir, prefilter=args.fast_prefilter)
+    checksums = checksum_files(tif_files, max(1, args.checksum_workers), results, cache)
+    if cache is not None:
+        cache.save()
+        print(f"Checksums: {cache.stats()}")
+
+    connections = WorkerConnections()
+
+    def work(tif: Path) -> FileResult:
+        result = results[tif]
+        started = time.perf_counter()
         try:
-            if import_raster(tif):
-                imported += 1
+            import_raster(connections.get(), tif, checksums[tif], result, build_cog=not args.no_cog)
         except subprocess.CalledProcessError as e:
-            print(f"Failed to import {tif.name}: {e}")
+            result.status, result.detail = "failed", f"raster2pgsql failed: {(e.stderr or str(e)).strip()}"
         except Exception as e:
-            print(f"Error processing {tif.name}: {e}")
+            result.status, result.detail = "failed", str(e)
+        result.timings["total"] = time.perf_counter() - started + result.timings.get("checksum", 0.0)
+        print(f"{result.status.capitalize()}: {tif.name} -> public.{result.table_name} ({result.detail})")
+        return result
 
-    print(f"Done. Newly imported: {imported}. Total files scanned: {len(tif_files)}")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for future in as_completed([pool.submit(work, tif) for tif in tif_files]):
+                future.result()
+    finally:
+        connections.close()
+
+    # Running API processes notice the new ledger rows through the catalog fingerprint;
+    # also drop the catalog cached in this process (e.g. when imported from a worker)
+    raster_catalog.invalidate()
+
+    ordered = [results[tif] for tif in tif_files]
+    print_report(ordered)
+    if args.timings_json:
+        Path(args.timings_json).write_text(json.dumps([asdict(r) for r in ordered], indent=2))
+
+    imported = sum(r.status == "imported" for r in ordered)
+    failed = sum(r.status == "failed" for r in ordered)
+    print(
+        f"Done. Newly imported: {imported}. Failed: {failed}. Total files scanned: {len(tif_files)} "
+        f"in {time.perf_counter() - run_started:.1f}s"
+    )
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,33 @@
+"""
+Import the shapefiles under a directory into PostGIS, skipping sets already recorded in
+the `shapefile_imports` ledger.
+
+Shapefiles are read in-process (app/infrastructure/shapefiles/reader.py) and streamed
+into their table with COPY, up to --workers sets at once, one connection per worker.
+Each set's table, GIST index and ledger row are committed together, so a failed
+import leaves nothing behind.
+
+    python scripts/seed_shapefiles.py --dir islamabad_shapefiles --workers 4
+"""
 import hashlib
 import os
-import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable, List
 import argparse
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+import psycopg2
 
 from app.config.settings import settings
-from app.infrastructure.db.models import ShapefileImport
-from app.infrastructure.db.session import SessionLocal
+from app.infrastructure.cache.checksum_cache import ChecksumCache
+from app.infrastructure.jobs.handlers import BOUNDARY_HISTOGRAMS
+from app.infrastructure.jobs.queue import enqueue_job, ensure_job_table
+from app.infrastructure.shapefiles.loader import COPY_BATCH_SIZE, import_shapefile
+from app.infrastructure.shapefiles.reader import ShapefileReader, srid_from_prj
 
 
 SUPPORTED_EXTENSIONS = {'.shp'}
@@ -64,27 +79,6 @@ def find_shapefile_sets(directory: Path) -> List[ShapefileSet]:
     return list(sets.values())
 
 
-def ogr2ogr_import(shapefile: Path, table_name: str, srid: int | None = None) -> None:
-    pg_conn = (
-        f"PG:host={settings.POSTGRES_HOST} port={settings.POSTGRES_PORT} "
-        f"dbname={settings.POSTGRES_DB} user={settings.POSTGRES_USER} password={settings.POSTGRES_PASSWORD}"
-    )
-    cmd = [
-        'ogr2ogr',
-        '-f', 'PostgreSQL',
-        pg_conn,
-        str(shapefile),
-        '-nln', table_name,
-        '-nlt', 'PROMOTE_TO_MULTI',
-        '-lco', 'GEOMETRY_NAME=geom',
-        '-lco', 'FID=id',
-        '-overwrite'
-    ]
-    if srid:
-        cmd.extend(['-a_srs', f'EPSG:{srid}'])
-    subprocess.check_call(cmd)
-
-
 def to_safe_table_name(name: str) -> str:
     cleaned = ''.join(ch if (ch.isalnum() or ch == '_') else '_' for ch in name)
     cleaned = cleaned.lower()
@@ -93,9 +87,50 @@ def to_safe_table_name(name: str) -> str:
     return cleaned.strip('_')
 
 
+def connect_pg():
+    return psycopg2.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+    )
+
+
+class WorkerConnections:
+    """One connection per worker thread, reused for every set that worker imports"""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: list = []
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = connect_pg()
+            self._local.conn = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description='Seed shapefiles into PostGIS, skipping duplicates.')
     parser.add_argument('--dir', dest='directory', default=None, help='Directory to scan for shapefiles')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='Shapefile sets imported concurrently')
+    parser.add_argument('--batch-size', type=int, default=COPY_BATCH_SIZE, help='Features encoded per COPY chunk')
+    parser.add_argument('--srid', type=int, default=None,
+                        help='SRID for sets whose .prj is missing or not recognised (default: 4326)')
+    parser.add_argument('--no-checksum-cache', action='store_true', help='Re-hash every file (ignore <dir>/.checksums.json)')
+    parser.add_argument('--fast-prefilter', action='store_true',
+                        help="When a file's stat changed but not its size, confirm it with a fast hash before re-hashing")
     args = parser.parse_args()
 
     default_dir = Path(os.getcwd()) / 'islamabad_shapefiles'
@@ -113,38 +148,49 @@ def main() -> int:
         print("No shapefiles found.")
         return 0
 
-    db: Session = SessionLocal()
+    # Same digest as compute_checksum (files hashed in sorted order), cached by file stat
+    cache = None if args.no_checksum_cache else ChecksumCache.for_directory(base_dir, prefilter=args.fast_prefilter)
+    connections = WorkerConnections()
+    # Commits itself; done up front so workers never race to create the queue table
+    ensure_job_table(connections.get())
+
+    def work(sset: ShapefileSet) -> str:
+        started = time.perf_counter()
+        table_name = to_safe_table_name(sset.shp.stem)
+        parts = [sset.shp, sset.shx, sset.dbf, sset.prj] if sset.prj.exists() else [sset.shp, sset.shx, sset.dbf]
+        checksum = cache.digest(*sorted(parts)) if cache is not None else compute_checksum(parts)
+
+        srid = srid_from_prj(sset.prj) or args.srid or 4326
+        reader = ShapefileReader(sset.shp, srid)
+        conn = connections.get()
+        rows = import_shapefile(conn, reader, table_name, checksum, batch_size=args.batch_size)
+        if rows is None:
+            return f"Skipping already imported: {sset.shp.name}"
+        # Per-feature class histograms for every raster year (scripts/run_job_worker.py)
+        job = enqueue_job(conn, BOUNDARY_HISTOGRAMS, table_name)
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        return (
+            f"Imported {sset.shp} -> public.{table_name} ({rows} features, {reader.pg_geometry_type}, "
+            f"EPSG:{srid}, {elapsed:.2f}s); histogram job {job['id']}"
+        )
+
+    failed = 0
     try:
-        for sset in shapefile_sets:
-            layer_name = sset.shp.stem
-            table_name = to_safe_table_name(layer_name)
-            checksum = compute_checksum([sset.shp, sset.shx, sset.dbf, sset.prj] if sset.prj.exists() else [sset.shp, sset.shx, sset.dbf])
-
-            exists_stmt = select(ShapefileImport).where(
-                ShapefileImport.filename == sset.shp.name,
-                ShapefileImport.checksum == checksum,
-            )
-            if db.execute(exists_stmt).scalar_one_or_none() is not None:
-                print(f"Skipping already imported: {sset.shp.name}")
-                continue
-
-            print(f"Importing {sset.shp} -> {table_name}")
-            ogr2ogr_import(sset.shp, table_name)
-
-            db.add(ShapefileImport(
-                filename=sset.shp.name,
-                checksum=checksum,
-                layer_name=layer_name,
-                table_name=table_name,
-            ))
-            db.commit()
-
-        return 0
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = {pool.submit(work, sset): sset for sset in shapefile_sets}
+            for future in as_completed(futures):
+                try:
+                    print(future.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"Failed: {futures[future].shp}: {e}")
+        return 1 if failed else 0
     finally:
-        db.close()
+        if cache is not None:
+            cache.save()
+        connections.close()
 
 
 if __name__ == '__main__':
     sys.exit(main())
-
-
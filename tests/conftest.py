@@ -0,0 +1,29 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.interfaces.api.fastapi_app import app
+from app.interfaces.dependencies import get_postgis_executor
+from app.interfaces.postgis_executor import PostgisExecutor
+
+
+class NoConnectionExecutor(PostgisExecutor):
+    """Executor that hands `run` callables no connection: the tests never reach PostGIS"""
+
+    @staticmethod
+    def _call(fn, *args, **kwargs):
+        return fn(None, *args, **kwargs)
+
+
+@pytest.fixture
+def executor():
+    return NoConnectionExecutor({"metadata": 2, "analytics": 2, "vectorize": 2})
+
+
+@pytest.fixture
+def client(executor):
+    app.dependency_overrides[get_postgis_executor] = lambda: executor
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.pop(get_postgis_executor, None)
@@ -0,0 +1,85 @@
+import pytest
+
+from app.infrastructure.raster.catalog import ALL_YEARS_TABLE
+from app.infrastructure.raster.class_tiers import TIER_ZOOMS, TIERS_TABLE, snap_zoom
+from app.infrastructure.raster.vector_tiles import simplify_tolerance
+from app.interfaces.api.routers import raster
+
+
+class FakeCursor:
+    """Answers the to_regclass / EXISTS checks with queued booleans"""
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return [self.answers.pop(0)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, *answers):
+        self.answers = list(answers)
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self.answers)
+
+
+@pytest.mark.parametrize("zoom, tier", [(0, 6), (6, 6), (7.5, 8), (10, 10), (13, 14), (20, 14)])
+def test_zoom_snaps_to_the_next_finer_tier(zoom, tier):
+    assert snap_zoom(zoom=zoom) == tier
+
+
+def test_resolution_and_tolerance_snap_like_the_matching_zoom():
+    assert snap_zoom() == TIER_ZOOMS[-1]
+    assert snap_zoom(tolerance=simplify_tolerance(10)) == 10
+    # 200 m per screen pixel lies between zoom 9 and 10 at the equator
+    assert snap_zoom(resolution=200) == 10
+
+
+def test_all_years_without_tiers_simplifies_every_year():
+    query, params = raster._class_geoms_all_years(FakeConnection(False), 10)
+    assert ALL_YEARS_TABLE in query and TIERS_TABLE not in query
+    assert params == [simplify_tolerance(10)]
+
+
+def test_all_years_with_some_tiers_falls_back_per_year():
+    # Tiers table exists and so does lulc_classes_all_years
+    query, params = raster._class_geoms_all_years(FakeConnection(True, True), 10)
+    assert "UNION ALL" in query
+    assert f"NOT EXISTS (SELECT 1 FROM {TIERS_TABLE} t WHERE t.year = a.year::text)" in query
+    assert query.count("%s") == len(params)
+    assert params[2:] == [10, simplify_tolerance(10)]
+
+
+def test_all_years_with_tiers_only():
+    query, params = raster._class_geoms_all_years(FakeConnection(True, False), 8)
+    assert TIERS_TABLE in query and ALL_YEARS_TABLE not in query
+    assert params[-1] == 8
+
+
+@pytest.mark.parametrize("tiered, table", [(True, TIERS_TABLE), (False, "lulc_classes_2020")])
+def test_single_year_reads_tiers_only_when_built(client, monkeypatch, tiered, table):
+    queries = []
+
+    def features(query, params=None):
+        queries.append((query, params))
+        yield b'{"type":"FeatureCollection","features":[]}'
+
+    monkeypatch.setattr(raster, "_lulc_classes_source", lambda conn, year: ("lulc_classes_2020", "v1", tiered))
+    monkeypatch.setattr(raster, "stream_feature_collection", features)
+
+    response = client.get("/raster/2020/classes-geojson?zoom=9")
+    assert response.status_code == 200
+    assert response.headers["X-Simplify-Zoom"] == "10"
+    (query, params), = queries
+    assert f"FROM {table} c" in query
+    assert (10 in params) == tiered
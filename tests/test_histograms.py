@@ -0,0 +1,49 @@
+from app.infrastructure.raster.histograms import load_histogram, load_histograms
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def execute(self, query, params):
+        self.params = params
+
+    def fetchall(self):
+        years = self.params[0]
+        years = years if isinstance(years, list) else [years]
+        return [r for r in self.rows if r["year"] in years]
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self.rows)
+
+
+ROWS = [
+    {"year": "2020", "class_code": 1, "pixel_count": 10, "area_m2": 1000.0, "checksum": "a"},
+    {"year": "2020", "class_code": 7, "pixel_count": 5, "area_m2": 500.0, "checksum": "a"},
+    {"year": "2021", "class_code": 1, "pixel_count": 12, "area_m2": 1200.0, "checksum": "old"},
+]
+
+
+def test_stored_histogram_is_returned_while_its_checksum_matches():
+    conn = FakeConnection(ROWS)
+    assert [r["class_code"] for r in load_histogram(conn, "2020", "a")] == [1, 7]
+    # No checksum to compare with: whatever is stored is used
+    assert load_histogram(conn, "2021", None) is not None
+
+
+def test_stale_or_missing_histogram_is_none():
+    conn = FakeConnection(ROWS)
+    assert load_histogram(conn, "2021", "new") is None
+    assert load_histogram(conn, "2019", "a") is None
+
+
+def test_many_years_leave_out_stale_and_missing_ones():
+    stored = load_histograms(FakeConnection(ROWS), {"2020": "a", "2021": "new", "2019": None})
+    assert list(stored) == ["2020"]
+    assert load_histograms(FakeConnection(ROWS), {}) == {}
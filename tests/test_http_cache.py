@@ -0,0 +1,79 @@
+import pytest
+
+from app.domain.entities.raster import RasterDataset, RasterGrid
+from app.infrastructure.cache.response_cache import ResponseCache
+from app.interfaces import http_cache
+from app.interfaces.api.fastapi_app import app
+from app.interfaces.dependencies import get_raster_engine
+
+
+class FakeEngine:
+    """Just enough of a RasterEngine for GET /raster/{year}; counts the computations"""
+
+    def __init__(self):
+        self.version = "lulc_2020:abc"
+        self.describes = 0
+
+    def dataset_version(self, year):
+        return self.version if year == "2020" else None
+
+    def describe(self, year, include_bands=True):
+        self.describes += 1
+        if year != "2020":
+            return None
+        grid = RasterGrid(width=10, height=10, num_bands=1, srid=4326, upper_left_x=73.0, upper_left_y=34.0,
+                          scale_x=0.1, scale_y=-0.1)
+        return RasterDataset(year=year, name="lulc_2020", tile_count=len(self.version), num_bands=1, srid=4326, grid=grid,
+                             envelope_wkt="POLYGON((73 33,74 33,74 34,73 34,73 33))")
+
+
+@pytest.fixture
+def engine(client, monkeypatch):
+    monkeypatch.setattr(http_cache, "response_cache", ResponseCache(16))
+    fake = FakeEngine()
+    app.dependency_overrides[get_raster_engine] = lambda: fake
+    yield fake
+    app.dependency_overrides.pop(get_raster_engine, None)
+
+
+def test_if_none_match_revalidates_with_304(client, engine):
+    first = client.get("/raster/2020")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    again = client.get("/raster/2020", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
+    # Weak comparison, as for any If-None-Match
+    assert client.get("/raster/2020", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/raster/2020", headers={"If-None-Match": '"other"'}).status_code == 200
+    assert engine.describes == 1
+
+
+def test_unknown_query_params_share_the_cached_response(client, engine):
+    etag = client.get("/raster/2020").headers["ETag"]
+    for junk in range(5):
+        assert client.get(f"/raster/2020?junk={junk}").headers["ETag"] == etag
+    assert engine.describes == 1
+    assert http_cache.response_cache.stats()["entries"] == 1
+
+
+def test_new_dataset_version_is_recomputed(client, engine):
+    etag = client.get("/raster/2020").headers["ETag"]
+    engine.version = "lulc_2020:defg"
+
+    response = client.get("/raster/2020", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert engine.describes == 2
+
+
+def test_disk_tier_evicts_least_recently_used_bodies(tmp_path):
+    cache = ResponseCache(max_entries=1, disk_dir=tmp_path, max_disk_bytes=3000)
+    for i in range(5):
+        cache.put(f"{i:02d}" + "0" * 62, b"x" * 1000)
+
+    bodies = list(tmp_path.glob("*/*.body"))
+    assert sum(p.stat().st_size for p in bodies) <= 3000
+    # The newest body survives eviction
+    assert cache.get("04" + "0" * 62) is not None
@@ -0,0 +1,81 @@
+import pytest
+
+from app.infrastructure.jobs import queue
+
+
+class FakeJobsCursor:
+    """Answers enqueue_job's INSERT ... ON CONFLICT and active_job's SELECT from a list of jobs"""
+
+    def __init__(self, db):
+        self.db = db
+        self.result = None
+
+    def execute(self, query, params):
+        if query.lstrip().startswith("INSERT"):
+            kind, key, job_params = params
+            if self.db.active(kind, key):
+                self.result = None
+            else:
+                job = {"id": len(self.db.jobs) + 1, "kind": kind, "key": key, "params": job_params, "status": queue.QUEUED}
+                self.db.jobs.append(job)
+                self.result = job
+        else:
+            kind, key = params
+            if self.db.finish_before_select:
+                # The conflicting job finishes between the INSERT and the SELECT
+                self.db.finish_before_select = False
+                for job in self.db.jobs:
+                    job["status"] = queue.DONE
+            self.result = self.db.active(kind, key)
+
+    def fetchone(self):
+        return self.result
+
+
+class FakeJobsConnection:
+    def __init__(self):
+        self.jobs = []
+        self.finish_before_select = False
+
+    def active(self, kind, key):
+        return next(
+            (j for j in self.jobs if (j["kind"], j["key"]) == (kind, key) and j["status"] in (queue.QUEUED, queue.RUNNING)),
+            None,
+        )
+
+    def cursor(self, cursor_factory=None):
+        return FakeJobsCursor(self)
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    monkeypatch.setattr(queue, "_table_ready", True)
+    return FakeJobsConnection()
+
+
+def test_enqueue_returns_the_active_job_for_the_same_key(conn):
+    first = queue.enqueue_job(conn, "vectorize_classes", "2020")
+    again = queue.enqueue_job(conn, "vectorize_classes", "2020")
+    other = queue.enqueue_job(conn, "vectorize_classes", "2021")
+
+    assert again["id"] == first["id"]
+    assert other["id"] != first["id"]
+    assert len(conn.jobs) == 2
+
+
+def test_enqueue_queues_again_once_the_job_is_done(conn):
+    first = queue.enqueue_job(conn, "vectorize_classes", "2020")
+    first["status"] = queue.DONE
+
+    assert queue.enqueue_job(conn, "vectorize_classes", "2020")["id"] != first["id"]
+
+
+def test_enqueue_retries_when_the_conflicting_job_finishes_meanwhile(conn):
+    first = queue.enqueue_job(conn, "vectorize_classes", "2020")
+    conn.finish_before_select = True
+
+    job = queue.enqueue_job(conn, "vectorize_classes", "2020")
+
+    assert job is not None
+    assert job["id"] != first["id"]
+    assert job["status"] == queue.QUEUED
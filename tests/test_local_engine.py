@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+from app.infrastructure.raster.local_engine import LocalRasterEngine, band_histogram, file_signature
+from app.infrastructure.raster.pixel_area import row_pixel_areas, transform_signature
+
+
+SIZE = 300  # More than one 256 px block each way
+
+
+def write_classes(path, values, crs="EPSG:4326", transform=from_origin(73.0, 34.0, 1e-4, 1e-4), nodata=None):
+    with rasterio.open(
+        path, "w", driver="GTiff", width=values.shape[1], height=values.shape[0], count=1, dtype="uint8",
+        crs=crs, transform=transform, nodata=nodata, tiled=True, blockxsize=256, blockysize=256, compress="lzw",
+    ) as dst:
+        dst.write(values, 1)
+    return path
+
+
+@pytest.fixture
+def classes():
+    rng = np.random.default_rng(42)
+    return rng.choice(np.array([1, 2, 5, 7, 11], dtype=np.uint8), size=(SIZE, SIZE))
+
+
+def test_histogram_counts_every_pixel_by_class(tmp_path, classes):
+    path = write_classes(tmp_path / "lulc_2020.tif", classes)
+    histogram = LocalRasterEngine(tmp_path).class_histogram("2020")
+
+    codes, expected = np.unique(classes, return_counts=True)
+    assert histogram.counts == {int(c): int(n) for c, n in zip(codes, expected)}
+    assert histogram.total_pixels == SIZE * SIZE
+    assert histogram.dataset == path.stem
+
+
+def test_histogram_areas_follow_the_rows_latitude(tmp_path, classes):
+    path = write_classes(tmp_path / "lulc_2020.tif", classes)
+    with rasterio.open(path) as src:
+        row_areas = row_pixel_areas(transform_signature(src.transform, src.height, True))
+    counts, areas = band_histogram(file_signature(path))
+
+    for code in (1, 7):
+        expected = ((classes == code) * row_areas[:, None]).sum()
+        assert areas[code] == pytest.approx(expected, rel=1e-9)
+    assert areas.sum() == pytest.approx(row_areas.sum() * SIZE, rel=1e-9)
+
+
+def test_histogram_of_a_projected_grid_uses_the_pixel_size(tmp_path, classes):
+    path = write_classes(tmp_path / "lulc_2020.tif", classes, crs="EPSG:32643", transform=from_origin(300000, 3700000, 10, 10))
+    histogram = LocalRasterEngine(tmp_path).class_histogram("2020")
+
+    assert histogram.areas_m2[5] == pytest.approx(histogram.counts[5] * 100.0)
+
+
+def test_histogram_leaves_nodata_out(tmp_path, classes):
+    classes[:20] = 255
+    write_classes(tmp_path / "lulc_2020.tif", classes, nodata=255)
+    histogram = LocalRasterEngine(tmp_path).class_histogram("2020")
+
+    assert 255 not in histogram.counts
+    assert histogram.total_pixels == (SIZE - 20) * SIZE
+
+
+def test_unknown_year_has_no_histogram(tmp_path, classes):
+    write_classes(tmp_path / "lulc_2020.tif", classes)
+    assert LocalRasterEngine(tmp_path).class_histogram("1999") is None
+
+
+def crosstab(a, b, valid):
+    k = int(max(a[valid].max(), b[valid].max())) + 1
+    return np.bincount(a[valid].astype(np.int64) * k + b[valid], minlength=k * k).reshape(k, k)
+
+
+def test_transitions_match_a_pixel_crosstab(tmp_path, classes):
+    later = classes.copy()
+    later[100:150] = 7  # some pixels become built area
+    write_classes(tmp_path / "lulc_2020.tif", classes)
+    write_classes(tmp_path / "lulc_2021.tif", later)
+
+    matrix = LocalRasterEngine(tmp_path).transition_matrix("2020", "2021")
+    expected = crosstab(classes, later, np.ones(classes.shape, dtype=bool))
+
+    assert matrix.classes == [1, 2, 5, 7, 11]
+    assert matrix.counts == expected[np.ix_(matrix.classes, matrix.classes)].tolist()
+    assert sum(map(sum, matrix.areas_m2)) == pytest.approx(
+        sum(LocalRasterEngine(tmp_path).class_histogram("2020").areas_m2.values())
+    )
+
+
+def test_transitions_skip_nodata_above_the_highest_class(tmp_path, classes):
+    later = classes.copy()
+    later[:, :10] = 2
+    classes[:5] = 255
+    later[-5:] = 255
+    write_classes(tmp_path / "lulc_2020.tif", classes, nodata=255)
+    write_classes(tmp_path / "lulc_2021.tif", later, nodata=255)
+
+    matrix = LocalRasterEngine(tmp_path).transition_matrix("2020", "2021")
+    valid = (classes != 255) & (later != 255)
+
+    assert 255 not in matrix.classes
+    assert sum(map(sum, matrix.counts)) == int(valid.sum())
+    assert matrix.counts == crosstab(classes, later, valid)[np.ix_(matrix.classes, matrix.classes)].tolist()
+
+
+def test_transitions_need_a_shared_grid(tmp_path, classes):
+    write_classes(tmp_path / "lulc_2020.tif", classes)
+    write_classes(tmp_path / "lulc_2021.tif", classes[:200])
+
+    with pytest.raises(ValueError, match="same pixel grid"):
+        LocalRasterEngine(tmp_path).transition_matrix("2020", "2021")
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import anyio
+import pytest
+from fastapi import HTTPException
+
+from app.infrastructure.db.postgis_pool import PoolTimeout
+from app.interfaces.api.routers import raster
+from app.interfaces.postgis_executor import ANALYTICS, METADATA, VECTORIZE
+
+
+def _fake_features(query, params=None):
+    yield b'{"type":"FeatureCollection","features":['
+    yield b'{"type":"Feature","properties":{"code":1},"geometry":null}'
+    yield b"]}"
+
+
+def _failing_features(query, params=None):
+    yield b'{"type":"FeatureCollection","features":['
+    raise RuntimeError("connection lost")
+
+
+def _stream_source(monkeypatch, features):
+    monkeypatch.setattr(raster, "_lulc_classes_source", lambda conn, year: ("lulc_classes_2020", "v1", True))
+    monkeypatch.setattr(raster, "stream_feature_collection", features)
+
+
+def test_streamed_responses_release_their_limiter_slot(client, executor, monkeypatch):
+    _stream_source(monkeypatch, _fake_features)
+    limit = executor.stats()[VECTORIZE]["limit"]
+
+    for _ in range(limit + 3):
+        response = client.get("/raster/2020/classes-geojson")
+        assert response.status_code == 200
+        assert response.json()["features"][0]["properties"] == {"code": 1}
+
+    stats = client.get("/raster/pool/stats").json()["limiters"][VECTORIZE]
+    assert stats["in_use"] == 0
+    assert stats["waiting"] == 0
+
+
+def test_failed_stream_releases_its_limiter_slot(client, executor, monkeypatch):
+    _stream_source(monkeypatch, _failing_features)
+
+    for _ in range(executor.stats()[VECTORIZE]["limit"] + 1):
+        try:
+            client.get("/raster/2020/classes-geojson")
+        except RuntimeError:
+            pass
+
+    assert client.get("/raster/pool/stats").json()["limiters"][VECTORIZE]["in_use"] == 0
+
+
+def test_run_never_exceeds_the_endpoint_class_limit(executor):
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def query(conn):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.02)
+        with lock:
+            running["now"] -= 1
+        return conn
+
+    async def main():
+        async with anyio.create_task_group() as tg:
+            for _ in range(6):
+                tg.start_soon(executor.run, ANALYTICS, query)
+
+    anyio.run(main)
+    assert running["max"] == executor.stats()[ANALYTICS]["limit"]
+    assert executor.stats()[ANALYTICS]["in_use"] == 0
+
+
+def test_pool_timeout_surfaces_as_503(executor):
+    def query():
+        raise PoolTimeout("no connection")
+
+    with pytest.raises(HTTPException) as error:
+        anyio.run(executor.call, METADATA, query)
+    assert error.value.status_code == 503
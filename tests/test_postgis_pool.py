@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+from psycopg2 import extensions
+
+from app.infrastructure.db.postgis_pool import PoolTimeout, PostgisConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakePool(PostgisConnectionPool):
+    """Pool whose connections are fakes; `fail_connects` makes the next connects raise"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_connects = 0
+
+    def _connect(self):
+        if self.fail_connects:
+            self.fail_connects -= 1
+            raise OSError("database unavailable")
+        with self._cond:
+            self._opened += 1
+        return FakeConnection()
+
+
+def test_checkout_reuses_returned_connections():
+    pool = FakePool(min_size=1, max_size=2, timeout=0.1)
+    conn = pool.getconn()
+    pool.putconn(conn)
+
+    assert pool.getconn() is conn
+    assert pool.stats()["opened"] == 1
+
+
+def test_checkout_times_out_when_every_connection_is_in_use():
+    pool = FakePool(min_size=0, max_size=2, timeout=0.05)
+    held = [pool.getconn(), pool.getconn()]
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 2
+
+    pool.putconn(held.pop())
+    assert pool.getconn() is not None
+
+
+def test_waiting_checkout_gets_the_next_returned_connection():
+    pool = FakePool(min_size=0, max_size=1, timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+
+    assert pool.getconn() is conn
+    assert pool.stats()["waits"] == 1
+
+
+def test_closed_connection_is_replaced_on_return():
+    pool = FakePool(min_size=0, max_size=1, timeout=0.1)
+    conn = pool.getconn()
+    conn.closed = 1
+    pool.putconn(conn)
+
+    assert pool.stats()["open"] == 0
+    assert pool.getconn() is not conn
+
+
+def test_failed_warm_up_releases_every_reserved_slot():
+    pool = FakePool(min_size=3, max_size=3, timeout=0.05)
+    pool.fail_connects = 1
+
+    with pytest.raises(OSError):
+        pool.getconn()
+    assert pool.stats()["open"] == 0
+
+    # Warm-up runs again on the next checkout and the pool keeps its full capacity
+    held = [pool.getconn() for _ in range(3)]
+    assert len({id(c) for c in held}) == 3
+    assert pool.stats()["open"] == 3
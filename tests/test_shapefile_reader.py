@@ -0,0 +1,115 @@
+import struct
+from pathlib import Path
+
+import pytest
+
+from app.infrastructure.shapefiles.reader import EWKB_SRID, EWKB_Z, WKB_TYPES, ShapefileReader, launder, srid_from_prj
+
+
+ISLAMABAD = Path(__file__).resolve().parents[1] / "islamabad_shapefiles" / "Islamabad.shp"
+
+
+def decode_multipolygon(ewkb: bytes):
+    """(srid, polygons as lists of rings of (x, y) points) of a little-endian EWKB MultiPolygon (Z dropped)"""
+    order, code, srid, n_polygons = struct.unpack_from("<BIII", ewkb, 0)
+    assert order == 1
+    assert code & ~EWKB_Z == WKB_TYPES["MultiPolygon"] | EWKB_SRID
+    z = code & EWKB_Z
+    dims = 3 if z else 2
+    pos = 13
+    polygons = []
+    for _ in range(n_polygons):
+        order, code, n_rings = struct.unpack_from("<BII", ewkb, pos)
+        assert (order, code) == (1, WKB_TYPES["Polygon"] | z)
+        pos += 9
+        rings = []
+        for _ in range(n_rings):
+            (n_points,) = struct.unpack_from("<I", ewkb, pos)
+            values = struct.unpack_from(f"<{dims * n_points}d", ewkb, pos + 4)
+            rings.append(list(zip(values[0::dims], values[1::dims])))
+            pos += 4 + 8 * dims * n_points
+        polygons.append(rings)
+    assert pos == len(ewkb)
+    return srid, polygons
+
+
+def square(x0, y0, size, clockwise):
+    ring = [(x0, y0), (x0, y0 + size), (x0 + size, y0 + size), (x0 + size, y0), (x0, y0)]
+    return ring if clockwise else ring[::-1]
+
+
+def write_polygon_shapefile(path: Path, rings) -> Path:
+    """One-record polygon shapefile (.shp + .dbf with a `name` field) holding `rings` in order"""
+    points = [p for ring in rings for p in ring]
+    starts, offset = [], 0
+    for ring in rings:
+        starts.append(offset)
+        offset += len(ring)
+    xs, ys = [x for x, _ in points], [y for _, y in points]
+    bbox = (min(xs), min(ys), max(xs), max(ys))
+    content = (
+        struct.pack("<i4d2i", 5, *bbox, len(rings), len(points))
+        + struct.pack(f"<{len(rings)}i", *starts)
+        + b"".join(struct.pack("<2d", x, y) for x, y in points)
+    )
+    record = struct.pack(">2i", 1, len(content) // 2) + content
+    header = struct.pack(">7i", 9994, 0, 0, 0, 0, 0, (100 + len(record)) // 2) + struct.pack("<2i4d4d", 1000, 5, *bbox, 0, 0, 0, 0)
+    shp = path.with_suffix(".shp")
+    shp.write_bytes(header + record)
+
+    field = b"NAME".ljust(11, b"\x00") + b"C" + b"\x00" * 4 + bytes([10, 0]) + b"\x00" * 14
+    dbf_header = struct.pack("<B3BIHH", 3, 124, 1, 1, 1, 32 + 32 + 1, 1 + 10) + b"\x00" * 20
+    path.with_suffix(".dbf").write_bytes(dbf_header + field + b"\x0d" + b" " + b"zone".ljust(10) + b"\x1a")
+    return shp
+
+
+def test_islamabad_boundary_reads_as_valid_ewkb():
+    reader = ShapefileReader(ISLAMABAD, srid_from_prj(ISLAMABAD.with_suffix(".prj")) or 4326)
+    assert reader.pg_geometry_type == "MultiPolygonZ"
+    assert [f.name for f in reader.fields] == ["name", "descriptio"]
+
+    records = list(reader.records())
+    assert len(records) == reader.num_records == 1
+    values, ewkb = records[0]
+    assert values[0] == "Islamabad plygon"
+
+    srid, polygons = decode_multipolygon(ewkb)
+    assert srid == 4326
+    with open(ISLAMABAD, "rb") as f:
+        xmin, ymin, xmax, ymax = struct.unpack("<4d", f.read(100)[36:68])
+    coords = [p for rings in polygons for ring in rings for p in ring]
+    assert min(x for x, _ in coords) == pytest.approx(xmin)
+    assert max(y for _, y in coords) == pytest.approx(ymax)
+    for rings in polygons:
+        for ring in rings:
+            assert len(ring) >= 4 and ring[0] == ring[-1]
+
+
+def test_holes_are_assigned_to_the_outer_ring_containing_them(tmp_path):
+    west, east = square(0, 0, 10, True), square(20, 0, 10, True)
+    west_hole, east_hole = square(2, 2, 2, False), square(22, 2, 2, False)
+    # Holes listed out of order: the east hole follows the west outer ring
+    shp = write_polygon_shapefile(tmp_path / "zones", [west, east_hole, east, west_hole])
+
+    (values, ewkb), = ShapefileReader(shp, 4326).records()
+    assert values == ["zone"]
+    srid, polygons = decode_multipolygon(ewkb)
+
+    assert srid == 4326
+    assert polygons == [[west, west_hole], [east, east_hole]]
+
+
+def test_island_inside_a_hole_gets_its_own_polygon(tmp_path):
+    outer, hole = square(0, 0, 10, True), square(2, 2, 6, False)
+    island, lake = square(4, 4, 2, True), square(4.5, 4.5, 1, False)
+    shp = write_polygon_shapefile(tmp_path / "island", [lake, outer, island, hole])
+
+    (_, ewkb), = ShapefileReader(shp, 4326).records()
+    _, polygons = decode_multipolygon(ewkb)
+
+    assert polygons == [[outer, hole], [island, lake]]
+
+
+def test_launder_matches_ogr2ogr_column_names():
+    assert launder("Area (km2)") == "area__km2_"
+    assert launder("  ") == "field"